@@ -1,3 +1,4 @@
+import fnmatch
 import glob
 import json
 import os
@@ -5,13 +6,20 @@ from logging import warning
 from pathlib import Path
 from warnings import warn as warning
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pprint import pprint
 import pandas as pd
-import requests
 from tabulate import tabulate
+from tqdm import tqdm
 
+from . import cache
+from . import client
+from . import flight
+from . import lineage
+from . import memo
 from . import utilities
 from . import reports
+from . import scanner
 
 
 def is_primary(hubmap_id: str, token: str, instance: str = "prod") -> bool:
@@ -61,10 +69,7 @@ def __compute_number_of_files(directory: str) -> int:
     :rtype: int
     """
 
-    pathname = directory + "/**/*"
-    files = glob.glob(pathname, recursive=True)
-
-    return len(files)
+    return scanner.count_files(directory)
 
 
 def __check_if_folder_is_empty(directory: str) -> bool:
@@ -113,6 +118,307 @@ def __get_instance(instance: str) -> str:
         return ".test"
 
 
+def __fetch(
+    kind: str,
+    hubmap_id: str,
+    query,
+    instance: str = "prod",
+    overwrite: bool = False,
+    last_modified_timestamp: int = None,
+    debug: bool = False,
+):
+    """
+    Helper method that loads a payload from the metadata store or queries the API and stores the response.
+    """
+
+    if not overwrite:
+        j = cache.get(
+            kind,
+            hubmap_id,
+            instance=instance,
+            last_modified_timestamp=last_modified_timestamp,
+        )
+        if j is not None:
+            if debug:
+                print(f"Loading {kind} information for {hubmap_id} from local cache.")
+            return j
+
+    if debug:
+        print(f"Get {kind} information for {hubmap_id} via the API.")
+    r = query()
+    if r is None:
+        warning("JSON object is empty.")
+        return None
+
+    if not r.ok:
+        warning(
+            f"Request for {kind} information of {hubmap_id} failed with status {r.status_code}."
+        )
+        return None
+
+    try:
+        j = json.loads(r.text)
+    except ValueError:
+        warning(f"Response for {kind} information of {hubmap_id} is not JSON.")
+        return None
+
+    if j is None:
+        warning("JSON object is empty.")
+        return j
+    elif isinstance(j, dict) and ("message" in j or "error" in j):
+        warning("Request response is empty. Not populating dataframe.")
+        print(j.get("message", j.get("error")))
+        return None
+
+    # only complete answers are cached, so a transient failure is retried on the next call
+    if r.status_code == 200:
+        cache.put(kind, hubmap_id, j, instance=instance)
+        lineage.record(kind, hubmap_id, j, instance=instance)
+
+    return j
+
+
+def __load_or_query(
+    kind: str,
+    hubmap_id: str,
+    query,
+    instance: str = "prod",
+    overwrite: bool = False,
+    last_modified_timestamp: int = None,
+    debug: bool = False,
+):
+    """
+    Load a payload from the run-scoped memo, the metadata store or the API, in that order.
+
+    Inside a `memo.scope()` the first lookup of a payload wins and later lookups of the same
+    payload are served from memory, even if they ask to overwrite the cache. Concurrent lookups
+    of the same payload, from threads or processes, wait on a single fetch.
+
+    :param kind: The kind of payload in the metadata store (e.g. "entity", "provenance").
+    :type kind: str
+
+    :param hubmap_id: The HuBMAP ID the payload belongs to.
+    :type hubmap_id: str
+
+    :param query: A function without arguments that returns the API response.
+    :type query: callable
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+
+    :param overwrite: If True, ignore the metadata store and query the API. Default is False.
+    :type overwrite: bool, optional
+
+    :param last_modified_timestamp: If given, a payload stored before this timestamp is refreshed.
+    :type last_modified_timestamp: int, optional
+
+    :param debug: If True, will print additional debug information. Default is False.
+    :type debug: bool, optional
+
+    :return: The payload, or None if the API returned an error.
+    """
+
+    key = (kind, hubmap_id, instance)
+
+    return memo.lookup(
+        key,
+        lambda: flight.once(
+            key,
+            lambda: __fetch(
+                kind,
+                hubmap_id,
+                query,
+                instance=instance,
+                overwrite=overwrite,
+                last_modified_timestamp=last_modified_timestamp,
+                debug=debug,
+            ),
+        ),
+    )
+
+
+def __project(document: dict, fields: list) -> dict:
+    """
+    Helper method that keeps only the top-level properties named in `fields`.
+
+    Dotted fields (e.g. "direct_ancestors.uuid") keep their whole top-level property.
+    """
+
+    keys = {field.split(".")[0] for field in fields}
+    return {key: value for key, value in document.items() if key in keys}
+
+
+def __search_entity(
+    hubmap_id: str, fields: list, token: str, instance: str = "prod"
+) -> dict:
+    """
+    Helper method that retrieves the projected search document of an entity.
+
+    Returns None if the entity is not in the search index or the search API fails.
+    """
+
+    includes = list(fields)
+    for field in fields:
+        if field.split(".")[0] == "direct_ancestors":
+            includes.append(field.replace("direct_ancestors", "immediate_ancestors", 1))
+
+    body = {
+        "_source": {"includes": includes},
+        "size": 1,
+        "query": {
+            "bool": {
+                "should": [
+                    {"term": {"hubmap_id": hubmap_id}},
+                    {"term": {"uuid": hubmap_id}},
+                ],
+                "minimum_should_match": 1,
+            }
+        },
+    }
+
+    if token is None:
+        headers = {"Accept": "application/json"}
+    else:
+        headers = {"Authorization": "Bearer " + token, "accept": "application/json"}
+
+    r = client.post(__get_search_url(instance), headers=headers, json=body)
+    if not r.ok:
+        warning(f"Search request for {hubmap_id} failed with status {r.status_code}.")
+        return None
+
+    try:
+        data = r.json()
+    except ValueError:
+        warning(f"Search response for {hubmap_id} is not JSON.")
+        return None
+
+    if "error" in data or not data.get("hits", {}).get("hits"):
+        return None
+
+    document = data["hits"]["hits"][0]["_source"]
+    if "immediate_ancestors" in document:
+        ancestors = document.pop("immediate_ancestors")
+        document.setdefault("direct_ancestors", ancestors)
+
+    return document
+
+
+def __fetch_projected(
+    hubmap_id: str,
+    fields: list,
+    token: str,
+    instance: str = "prod",
+    overwrite: bool = False,
+    debug: bool = False,
+) -> dict:
+    """
+    Helper method that loads a projected entity from the metadata store or the search API.
+
+    Projections of the same entity accumulate in the store, so asking for a subset of the
+    fields already retrieved never goes to the network.
+    """
+
+    token = utilities.__get_token(token)
+
+    retrieved = []
+    if not overwrite:
+        cached = cache.get("projection", hubmap_id, instance=instance)
+        if cached is not None:
+            retrieved = cached["fields"]
+            if set(fields) <= set(retrieved):
+                return __project(cached["document"], fields)
+
+        document = cache.get("entity", hubmap_id, instance=instance)
+        if document is not None and all(
+            field.split(".")[0] in document for field in fields
+        ):
+            return __project(document, fields)
+
+    wanted = sorted(set(fields) | set(retrieved))
+    if debug:
+        print(f"Get {len(wanted)} properties of {hubmap_id} via the search API.")
+    document = __search_entity(hubmap_id, wanted, token=token, instance=instance)
+
+    if document is None:
+        if debug:
+            print(f"{hubmap_id} not found in the search index. Using the entity-api.")
+        document = get_entity_info(
+            hubmap_id, token=token, instance=instance, overwrite=overwrite
+        )
+
+    # errors are only reported by the full response; a projection would drop them
+    if document is None or "error" in document:
+        if document is not None:
+            warning(document["error"])
+        return None
+
+    cache.put(
+        "projection",
+        hubmap_id,
+        {"fields": wanted, "document": __project(document, wanted)},
+        instance=instance,
+    )
+    lineage.record_entity(document, instance=instance)
+
+    return __project(document, fields)
+
+
+def __get_projected_info(
+    hubmap_id: str,
+    fields: list,
+    token: str,
+    instance: str = "prod",
+    overwrite: bool = False,
+    debug: bool = False,
+) -> dict:
+    """
+    Retrieve only the given properties of an entity.
+
+    Instead of the full entity document, which for datasets includes large metadata blobs,
+    the search API is asked for the `fields` only (`_source` includes).
+
+    :param hubmap_id: The HuBMAP ID of the entity.
+    :type hubmap_id: str
+
+    :param fields: Properties to retrieve. Nested properties can be given with dots (e.g. "direct_ancestors.uuid").
+    :type fields: list
+
+    :param token: Authentication token to access the HuBMAP search API.
+    :type token: str
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+
+    :param overwrite: If True, ignore the metadata store and query the API. Default is False.
+    :type overwrite: bool, optional
+
+    :param debug: If True, will print additional debug information. Default is False.
+    :type debug: bool, optional
+
+    :return: A dictionary with the requested top-level properties that exist on the entity, or None if the entity could not be retrieved.
+    :rtype: dict
+    """
+
+    fields = sorted(set(fields))
+
+    key = ("projection", hubmap_id, instance, tuple(fields))
+
+    return memo.lookup(
+        key,
+        lambda: flight.once(
+            key,
+            lambda: __fetch_projected(
+                hubmap_id,
+                fields,
+                token=token,
+                instance=instance,
+                overwrite=overwrite,
+                debug=debug,
+            ),
+        ),
+    )
+
+
 def __query_ancestors_info(
     hubmap_id: str, token: str, instance: str = "prod", debug: bool = False
 ) -> dict:
@@ -158,7 +464,7 @@ def __query_ancestors_info(
 
     headers = {"Authorization": "Bearer " + token, "accept": "application/json"}
 
-    r = requests.get(URL, headers=headers)
+    r = client.get(URL, headers=headers)
     return r
 
 
@@ -166,15 +472,15 @@ def get_ancestors_info(
     hubmap_id: str,
     token: str,
     instance: str = "prod",
-    overwrite: bool = True,
+    overwrite: bool = False,
     debug: bool = False,
 ) -> dict:
     """
     Retrieve ancestor information for a given HuBMAP ID.
 
     This function fetches the ancestor information of a specified HuBMAP ID.
-    It checks if a cached version exists locally and, if not (or if overwrite is set to True),
-    it queries the HuBMAP entity API to fetch the data.
+    It checks if a fresh cached version exists in the local metadata store and, if not (or if overwrite
+    is set to True), it queries the HuBMAP entity API to fetch the data.
 
     :param hubmap_id: The HuBMAP ID for which ancestor information is needed.
     :type hubmap_id: str
@@ -185,7 +491,7 @@ def get_ancestors_info(
     :param instance: Instance of the HuBMAP service, default is "prod". Acceptable values are "dev", "prod", and "test".
     :type instance: str, optional
 
-    :param overwrite: If set to True, will fetch and overwrite the cached version even if it exists. Default is True.
+    :param overwrite: If set to True, will fetch and overwrite the cached version even if it exists. Default is False.
     :type overwrite: bool, optional
 
     :param debug: If True, will output additional debug information. Default is False.
@@ -199,33 +505,16 @@ def get_ancestors_info(
        - If the API request does not return expected data, a warning is raised with the response message.
     """
 
-    directory = ".ancestors"
-    file = os.path.join(directory, hubmap_id + ".json")
-    if os.path.exists(file) and not overwrite:
-        if debug:
-            print("Loading existing JSON file.")
-        j = json.load(open(file, "r"))
-    else:
-        if debug:
-            print("Get information from ancestors via the entity-api.")
-        r = __query_ancestors_info(
+    return __load_or_query(
+        "ancestors",
+        hubmap_id,
+        lambda: __query_ancestors_info(
             hubmap_id, instance=instance, token=token, debug=debug
-        )
-        j = json.loads(r.text)
-
-    if j is None:
-        warning("JSON object is empty.")
-        return j
-    elif "message" in j:
-        warning("Request response is empty. Not populating dataframe.")
-        print(j["message"])
-        return None
-    else:
-        if not os.path.exists(directory):
-            os.mkdir(directory)
-        with open(file, "w") as outfile:
-            json.dump(j, outfile, indent=4)
-        return j
+        ),
+        instance=instance,
+        overwrite=overwrite,
+        debug=debug,
+    )
 
 
 def __query_provenance_info(
@@ -273,11 +562,13 @@ def __query_provenance_info(
         )
 
     headers = {"Authorization": "Bearer " + token, "accept": "application/json"}
-    r = requests.get(URL, headers=headers)
+    r = client.get(URL, headers=headers)
     return r
 
 
-def __query_dataset_info(hubmap_id: str, token: str, debug: bool = False) -> dict:
+def __query_dataset_info(
+    hubmap_id: str, token: str, instance: str = "prod", debug: bool = False
+) -> dict:
     """
     Query and retrieve dataset information for a given HuBMAP ID.
 
@@ -308,11 +599,19 @@ def __query_dataset_info(hubmap_id: str, token: str, debug: bool = False) -> dic
         warning("Token not set.")
         return None
 
-    URL = f"https://entity.api.hubmapconsortium.org/entities/{hubmap_id}"
+    if __get_instance(instance) == "prod":
+        URL = f"https://entity.api.hubmapconsortium.org/entities/{hubmap_id}"
+    else:
+        URL = (
+            "https://entity-api"
+            + __get_instance(instance)
+            + ".hubmapconsortium.org/entities/"
+            + hubmap_id
+        )
 
     headers = {"Authorization": f"Bearer {token}", "accept": "application/json"}
 
-    r = requests.get(URL, headers=headers)
+    r = client.get(URL, headers=headers)
     return r
 
 
@@ -341,38 +640,80 @@ def get_dataset_display_name(hubmap_id: str) -> str:
         },
     }
 
-    data = requests.post(url=url, headers=headers, json=body).json()
-    return data
+    r = client.post(url, headers=headers, json=body)
+    if not r.ok:
+        warning(f"Search request for {hubmap_id} failed with status {r.status_code}.")
+        return None
+
+    try:
+        return r.json()
+    except ValueError:
+        warning(f"Search response for {hubmap_id} is not JSON.")
+        return None
 
 
 def get_dataset_info(
     hubmap_id: str,
     token: str,
     instance: str = "prod",
-    overwrite: bool = True,
-    debug: bool = True,
+    overwrite: bool = False,
+    last_modified_timestamp: int = None,
+    fields: list = None,
+    debug: bool = False,
 ) -> dict:
-    directory = ".datasets"
-    file = os.path.join(directory, hubmap_id + ".json")
-    if os.path.exists(file) and not overwrite:
-        j = json.load(open(file, "r"))
-    else:
-        r = __query_dataset_info(hubmap_id, token=token, debug=debug)
-        if r is None:
-            warning("JSON object is empty.")
-            return r
-        j = json.loads(r.text)
+    """
+    Retrieve dataset information for a given HuBMAP ID.
 
-    if "message" in j:
-        warning("Request response is empty. Not populating dataframe.")
-        print(j["message"])
-        return None
-    else:
-        if not os.path.exists(directory):
-            os.mkdir(directory)
-        with open(file, "w") as outfile:
-            json.dump(j, outfile, indent=4)
-        return j
+    Fetches the dataset information of a specified HuBMAP ID either from the
+    local metadata store or by querying the HuBMAP entity API.
+
+    :param hubmap_id: The HuBMAP ID for which dataset information is needed.
+    :type hubmap_id: str
+
+    :param token: Authentication token to access the HuBMAP entity API.
+    :type token: str
+
+    :param instance: Instance of the HuBMAP service. Default is "prod". Valid options are "dev", "prod", and "test".
+    :type instance: str, optional
+
+    :param overwrite: If True, it will query the API even if a fresh cached version exists. Default is False.
+    :type overwrite: bool, optional
+
+    :param last_modified_timestamp: Last modified timestamp of the dataset (e.g. from `reports.daily`). If given,
+                                    a cached version older than this timestamp is refreshed.
+    :type last_modified_timestamp: int, optional
+
+    :param fields: If given, retrieve only these properties instead of the full entity document.
+    :type fields: list, optional
+
+    :param debug: If True, will print additional debug information. Default is False.
+    :type debug: bool, optional
+
+    :return: A dictionary containing dataset information. If an error occurs, appropriate warnings are provided.
+    :rtype: dict
+    """
+
+    if fields is not None:
+        return __get_projected_info(
+            hubmap_id,
+            fields,
+            token=token,
+            instance=instance,
+            overwrite=overwrite,
+            debug=debug,
+        )
+
+    return __load_or_query(
+        "entity",
+        hubmap_id,
+        lambda: __query_dataset_info(
+            hubmap_id, instance=instance, token=token, debug=debug
+        ),
+        instance=instance,
+        overwrite=overwrite,
+        last_modified_timestamp=last_modified_timestamp,
+        debug=debug,
+    )
 
 
 def get_provenance_info(
@@ -386,7 +727,7 @@ def get_provenance_info(
     Retrieve provenance information for a given HuBMAP ID.
 
     Fetches the provenance information of a specified HuBMAP ID either
-    from a local JSON file or by querying the HuBMAP entity API.
+    from the local metadata store or by querying the HuBMAP entity API.
 
     :param hubmap_id: The HuBMAP ID for which provenance information is needed.
     :type hubmap_id: str
@@ -397,7 +738,7 @@ def get_provenance_info(
     :param instance: Instance of the HuBMAP service. Default is "prod". Valid options are "dev", "prod", and "test".
     :type instance: str, optional
 
-    :param overwrite: If True, it will overwrite any existing local JSON file with new data from the API. Default is False.
+    :param overwrite: If True, it will overwrite any cached version with new data from the API. Default is False.
     :type overwrite: bool, optional
 
     :param debug: If True, will print additional debug information. Default is False.
@@ -410,49 +751,33 @@ def get_provenance_info(
        - If the request response from the API is empty or an error, a warning is raised and the function might return None.
     """
 
-    directory = ".provenance"
-    file = os.path.join(directory, hubmap_id + ".json")
-    if os.path.exists(file) and not overwrite:
-        if debug:
-            print("Loading existing JSON file")
-        j = json.load(open(file, "r"))
-    else:
-        if debug:
-            print("Get information provenance info via the entity-api.")
-        r = __query_provenance_info(
+    return __load_or_query(
+        "provenance",
+        hubmap_id,
+        lambda: __query_provenance_info(
             hubmap_id, instance=instance, token=token, debug=debug
-        )
-        j = json.loads(r.text)
-
-    if j is None:
-        warning("JSON object is empty.")
-        return j
-    elif "message" in j:
-        warning("Request response is empty. Not populating dataframe.")
-        print(j["message"])
-        return None
-    else:
-        if not os.path.exists(directory):
-            os.mkdir(directory)
-        with open(file, "w") as outfile:
-            json.dump(j, outfile, indent=4)
-        return j
+        ),
+        instance=instance,
+        overwrite=overwrite,
+        debug=debug,
+    )
 
 
 def get_all_ids(token: str, debug: bool = False) -> pd.DataFrame:
     """
-    Retrieve all HuBMAP IDs for given assay types.
+    Retrieve all HuBMAP dataset IDs.
 
-    Fetches all HuBMAP IDs for specified assay types using the HuBMAP entity API
-    and compiles them into a pandas DataFrame.
+    Fetches every dataset document with a single paginated pass over the HuBMAP search API
+    (see `sync_catalog`) and compiles them into a pandas DataFrame. As a side effect the
+    projection cache and the lineage graph are hydrated with the datasets and their donors.
 
-    :param token: Authentication token to access the HuBMAP entity API.
+    :param token: Authentication token to access the HuBMAP search API.
     :type token: str
 
     :param debug: If True, will print additional debug information. Default is False.
     :type debug: bool, optional
 
-    :return: A DataFrame containing all HuBMAP IDs for the given assay types.
+    :return: A DataFrame containing all HuBMAP IDs.
     :rtype: pd.DataFrame
 
     .. warning::
@@ -464,13 +789,7 @@ def get_all_ids(token: str, debug: bool = False) -> pd.DataFrame:
         warning("Token not set.")
         return None
 
-    datasets = []
-    assay_types = get_assay_types(token=token)
-    for assay_type in assay_types:
-        hubmap_ids = get_ids(assay_type, instance="prod", token=token)
-        datasets.extend(hubmap_ids)
-
-    return pd.DataFrame(datasets)
+    return sync_catalog(token=token, instance="prod", debug=debug)
 
 
 def get_ids(assay_name: str, token: str, debug: bool = False) -> dict:
@@ -512,16 +831,17 @@ def get_ids(assay_name: str, token: str, debug: bool = False) -> dict:
 
     data = answer["hits"]["hits"]
 
-    results = []
-    for datum in data:
-        row = pd.DataFrame(
+    results = pd.DataFrame(
+        [
             {
                 "uuid": datum["_source"]["uuid"],
                 "hubmap_id": datum["_source"]["hubmap_id"],
                 "status": datum["_source"]["status"],
             }
-        )
-        results = pd.concat([results, row], ignore_index=True)
+            for datum in data
+        ],
+        columns=["uuid", "hubmap_id", "status"],
+    )
 
     return results
 
@@ -565,34 +885,24 @@ def __query_hubmap_ids(assayname: str, token: str, debug: bool = False) -> dict:
                   an "Authorization" header.
     :type token: str
 
-    :param debug: If True, will print additional debug information. Default is False. Currently unused in the function
-                  but can be utilized for future enhancements.
+    :param debug: If True, will print additional debug information. Default is False.
     :type debug: bool, optional
 
-    :return: A dictionary containing the API response, which includes the search hits and associated metadata.
+    :return: A dictionary with the same shape as a search API response, which includes every search hit.
     :rtype: dict
 
     .. note::
        - The function targets the '/v3/search' endpoint of the HuBMAP search API.
-       - The size parameter in the body of the request is set to 500, which means it will retrieve up to 500 results.
-         Adapt this number if a different number of results is desired.
+       - Results are paginated with `search_after`, so every matching dataset is returned.
 
     .. warning::
        - If the token is not valid or if there's any issue with the request, the API might return an error message
          within the response dictionary.
     """
 
-    url = "https://search.api.hubmapconsortium.org/v3/search"
-
-    if token is None:
-        headers = {"Accept": "application/json"}
-    else:
-        headers = {"Authorization": "Bearer " + token, "accept": "application/json"}
-
     body = {
-        "size": 500,
         "_source": {
-            "include": ["hubmap_id", "uuid", "group_name", "status", "data_types"]
+            "includes": ["hubmap_id", "uuid", "group_name", "status", "data_types"]
         },
         "query": {
             "bool": {
@@ -602,8 +912,16 @@ def __query_hubmap_ids(assayname: str, token: str, debug: bool = False) -> dict:
         },
     }
 
-    data = requests.post(url=url, headers=headers, json=body).json()
-    return data
+    try:
+        hits = list(__search(body, token=token, debug=debug))
+    except RuntimeError as e:
+        return {"error": str(e)}
+
+    return {"hits": {"hits": hits}}
+
+
+# number of bytes of a validation report searched for the success message
+VALIDATION_REPORT_BYTES = 64 * 1024
 
 
 def __is_valid(file: str) -> str:
@@ -625,50 +943,114 @@ def __is_valid(file: str) -> str:
          not be matched.
 
     .. warning::
-       - Do not forget to close the file after reading to release resources.
+       - Only the first `VALIDATION_REPORT_BYTES` bytes of the file are searched.
     """
 
     string1 = "No error"
-    file1 = open(file, "r")
-    readfile = file1.read()
+    with open(file, "r", errors="replace") as file1:
+        readfile = file1.read(VALIDATION_REPORT_BYTES)
 
     answer = "INVALID"
     if string1 in readfile:
         answer = "VALID"
 
-    file1.close()
     return answer
 
 
-def is_protected(hubmap_id: str, token: str, instance: str = "prod") -> bool:
+def __inspect_directory(directory: str) -> dict:
+    """
+    Helper method that classifies the top-level files of an upload directory with a single listing.
     """
-    Check if a given dataset, identified by its hubmap_id, has a protected data access level.
 
-    This function fetches metadata information about a dataset and checks if its data access level is marked as
-    'protected'. If the dataset is protected, the function returns True, otherwise, it returns False.
+    patterns = {
+        "metadata": "*metadata*.tsv",
+        "contributors": "*contributors*.tsv",
+        "antibodies": "*antibodies*.tsv",
+    }
 
-    :param hubmap_id: The unique identifier for the HubMap dataset to be checked.
-    :type hubmap_id: str
+    with os.scandir(directory) as entries:
+        names = sorted(entry.name for entry in entries)
 
-    :param token: The authentication token to access the HubMap API.
-    :type token: str
+    row = {"is_empty": not names}
+    for key, pattern in patterns.items():
+        matches = fnmatch.filter(names, pattern)
+        row[key] = matches[0] if matches else ""
 
-    :param instance: The instance of the HubMap service to target, defaulting to "prod".
-    :type instance: str, optional
+    if "validation_report.txt" in names:
+        row["report"] = __is_valid(os.path.join(directory, "validation_report.txt"))
+    else:
+        row["report"] = "-"
 
-    :return: Returns True if the dataset has a data access level of 'protected', otherwise returns False.
-    :rtype: bool
+    return row
 
-    .. note::
-       - A valid authentication token is required to access the HubMap API.
-       - The function utilizes the utilities module for token validation.
-       - Ensure the provided hubmap_id corresponds to an existing dataset on HubMap.
 
-    .. warning::
-       - This function assumes the HubMap API returns 'data_access_level' in its response. If the response format changes
-         in the future, this function might not work as expected.
+def __triage_directory(directory: str) -> dict:
+    """
+    Helper method that inspects an upload directory unless it did not change since the last run.
 
-    .. example::
+    Results are kept in the metadata store, keyed by the mtimes of the directory and of its
+    validation report. Returns None if the directory does not exist.
+    """
+
+    try:
+        mtime_ns = os.stat(directory).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    try:
+        report_mtime_ns = os.stat(
+            os.path.join(directory, "validation_report.txt")
+        ).st_mtime_ns
+    except FileNotFoundError:
+        report_mtime_ns = None
+
+    cached = cache.get("triage", directory, ttl=None)
+    if (
+        cached is not None
+        and cached["mtime_ns"] == mtime_ns
+        and cached["report_mtime_ns"] == report_mtime_ns
+    ):
+        return cached["row"]
+
+    row = __inspect_directory(directory)
+    cache.put(
+        "triage",
+        directory,
+        {"mtime_ns": mtime_ns, "report_mtime_ns": report_mtime_ns, "row": row},
+    )
+
+    return row
+
+
+def is_protected(hubmap_id: str, token: str, instance: str = "prod") -> bool:
+    """
+    Check if a given dataset, identified by its hubmap_id, has a protected data access level.
+
+    This function fetches metadata information about a dataset and checks if its data access level is marked as
+    'protected'. If the dataset is protected, the function returns True, otherwise, it returns False.
+
+    :param hubmap_id: The unique identifier for the HubMap dataset to be checked.
+    :type hubmap_id: str
+
+    :param token: The authentication token to access the HubMap API.
+    :type token: str
+
+    :param instance: The instance of the HubMap service to target, defaulting to "prod".
+    :type instance: str, optional
+
+    :return: Returns True if the dataset has a data access level of 'protected', otherwise returns False. None if the dataset could not be retrieved.
+    :rtype: bool
+
+    .. note::
+       - A valid authentication token is required to access the HubMap API.
+       - The function utilizes the utilities module for token validation.
+       - Ensure the provided hubmap_id corresponds to an existing dataset on HubMap.
+
+    .. warning::
+       - This function assumes the HubMap API returns 'data_access_level' in its response. If the response format changes
+         in the future, this function might not work as expected.
+
+    .. example::
        >>> is_protected("abcd1234", "sample_token")
        False
     """
@@ -678,7 +1060,13 @@ def is_protected(hubmap_id: str, token: str, instance: str = "prod") -> bool:
         warning("Token not set.")
         return None
 
-    metadata = get_dataset_info(hubmap_id, instance=instance, token=token)
+    metadata = get_dataset_info(
+        hubmap_id, instance=instance, token=token, fields=["data_access_level"]
+    )
+    if metadata is None:
+        warning(f"Unable to retrieve the data access level of {hubmap_id}.")
+        return None
+
     if (
         "data_access_level" in metadata.keys()
         and metadata["data_access_level"] == "protected"
@@ -811,20 +1199,26 @@ def pretty_print_info_about_new_datasets(assay_name: str, debug: bool = False) -
 
 
 def pretty_print_info_about_all_new_datasets(
-    filename: str, debug: bool = False
+    filename: str, max_workers: int = 16, debug: bool = False
 ) -> None:
     """
     Pretty print a tabulated summary of new datasets for all assay types.
 
-    This function fetches datasets of all available assay types using the HubMap API, and then generates a table
+    This function reads the datasets of all assay types from the daily report, and then generates a table
     showcasing specific information about datasets with a status of "New". Information includes UUID, HuBMAP ID,
     assay type, directory location, status, folder emptiness, associated metadata, contributors, antibodies,
     and validation status.
 
+    Upload directories are inspected concurrently with a single listing each, and directories that did not
+    change since the last run are not inspected again.
+
     :param filename: Path to the file where the tabulated information will be saved. If not provided,
                      the table will just be printed to the console.
     :type filename: str
 
+    :param max_workers: Number of directories inspected concurrently. Default is 16.
+    :type max_workers: int, optional
+
     :param debug: If True, debug statements will be printed. Default is False.
     :type debug: bool, optional
 
@@ -850,14 +1244,10 @@ def pretty_print_info_about_all_new_datasets(
     """
 
     if debug:
-        utilities.pprint("Retrieving list of assay types")
-    assay_types = get_assay_types()
-
-    answer = []
-    for assay_type in assay_types:
-        if debug:
-            print("Using search API to retrieve datasets with data type " + assay_type)
-        answer.extend(get_hubmap_ids(assay_type, debug=debug))
+        utilities.pprint("Retrieving list of new datasets")
+    df = reports.daily()
+    df = df[df["status"] == "New"]
+    df = df.rename(columns={"dataset_type": "data_type"})
 
     data = [
         [
@@ -876,70 +1266,45 @@ def pretty_print_info_about_all_new_datasets(
     if debug:
         utilities.pprint("Processings datasets")
 
-    for datum in answer:
-        if debug:
-            print("Processing dataset " + datum["uuid"])
-        if datum["status"] == "New":
-            if Path(
-                "/hive/hubmap/data/consortium/"
-                + datum["group_name"]
-                + "/"
-                + datum["uuid"]
-            ).exists():
-                directory = (
-                    "/hive/hubmap/data/consortium/"
-                    + datum["group_name"]
-                    + "/"
-                    + datum["uuid"]
-                    + "/"
-                )
-                metadata = glob.glob(directory + "*metadata*.tsv")
-                if not metadata:
-                    metadata = ""
-                else:
-                    metadata = metadata[0].replace(directory, "")
-
-                contributors = glob.glob(directory + "*contributors*.tsv")
-                if not contributors:
-                    contributors = ""
-                else:
-                    contributors = contributors[0].replace(directory, "")
+    answer = df.to_dict("records")
+    directories = [
+        "/hive/hubmap/data/consortium/" + datum["group_name"] + "/" + datum["uuid"]
+        for datum in answer
+    ]
 
-                antibodies = glob.glob(directory + "/*antibodies*.tsv")
-                if not antibodies:
-                    antibodies = ""
-                else:
-                    antibodies = antibodies[0].replace(directory, "")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        triage = list(executor.map(__triage_directory, directories))
 
-                report = glob.glob(directory + "validation_report.txt")
-                if not report:
-                    report = "-"
-                else:
-                    report = __is_valid(directory + "validation_report.txt")
+    for datum, directory, row in zip(answer, directories, triage):
+        if debug:
+            print("Processing dataset " + datum["uuid"])
 
-                is_empty = __check_if_folder_is_empty(directory)
-            else:
-                directory = "NOT AVAILABLE"
-                is_empty = ""
-                number_of_files = "-"
-                metadata = ""
-                contributors = ""
-                antibodies = ""
+        if row is None:
+            directory = "NOT AVAILABLE"
+            row = {
+                "is_empty": "",
+                "metadata": "",
+                "contributors": "",
+                "antibodies": "",
+                "report": "-",
+            }
+        else:
+            directory = directory + "/"
 
-            data.append(
-                [
-                    datum["uuid"],
-                    datum["hubmap_id"],
-                    datum["data_type"],
-                    datum["status"],
-                    directory,
-                    is_empty,
-                    metadata,
-                    contributors,
-                    antibodies,
-                    report,
-                ]
-            )
+        data.append(
+            [
+                datum["uuid"],
+                datum["hubmap_id"],
+                datum["data_type"],
+                datum["status"],
+                directory,
+                row["is_empty"],
+                row["metadata"],
+                row["contributors"],
+                row["antibodies"],
+                row["report"],
+            ]
+        )
 
     if filename:
         df = pd.DataFrame(
@@ -1035,9 +1400,14 @@ def get_directory(hubmap_id: str, token: str, instance: str = "prod") -> str:
 
     """
 
-    metadata = get_dataset_info(hubmap_id, instance=instance, token=token)
-    if "error" in metadata:
-        warning(metadata["error"])
+    metadata = get_dataset_info(
+        hubmap_id,
+        instance=instance,
+        token=token,
+        fields=["uuid", "group_name", "contains_human_genetic_sequences"],
+    )
+    if metadata is None or "uuid" not in metadata:
+        warning(f"Unable to retrieve the directory of {hubmap_id}.")
         return None
 
     if (
@@ -1078,7 +1448,7 @@ def get_files(hubmap_id: str, token: str, instance: str = "prod") -> list:
     .. note::
        - If the directory associated with the HuBMAP ID does not exist or is inaccessible due to
          permission issues, the function will return None and might print a warning.
-       - The function uses the `pathlib` module to handle directories and files.
+       - Files are listed with `scanner.list_files`, which reuses the snapshots of unchanged directories.
 
     .. example::
        >>> get_files("HGXXX", "your_token_here")
@@ -1090,9 +1460,7 @@ def get_files(hubmap_id: str, token: str, instance: str = "prod") -> list:
 
     try:
         if Path(directory).exists():
-            files = list(Path(directory).glob("**/*"))
-            files = [x for x in files if x.is_file()]
-            return files
+            return scanner.list_files(directory)
         else:
             return None
     except:
@@ -1106,8 +1474,8 @@ def get_number_of_files(hubmap_id: str, token: str, instance: str = "prod") -> i
     """
     Retrieve the number of files associated with a given HuBMAP dataset ID.
 
-    This function calls the `get_files` function to determine the list of files
-    for a given HuBMAP ID and then returns the count of those files.
+    This function determines the directory path for a given HuBMAP ID and counts the files
+    in that directory, including subdirectories, without building the list of files.
 
     :param hubmap_id: The HuBMAP ID of the dataset for which the count of files is to be retrieved.
     :type hubmap_id: str
@@ -1124,7 +1492,7 @@ def get_number_of_files(hubmap_id: str, token: str, instance: str = "prod") -> i
     .. note::
        - If there's an error or the directory associated with the HuBMAP ID does not exist,
          the function will return None.
-       - This function is dependent on the `get_files` function to retrieve the list of files.
+       - Files are counted with `scanner.count_files`, which reuses the snapshots of unchanged directories.
 
     .. example::
        >>> get_number_of_files("HGXXX", "your_token_here")
@@ -1132,12 +1500,18 @@ def get_number_of_files(hubmap_id: str, token: str, instance: str = "prod") -> i
 
     """
 
-    answer = get_files(hubmap_id, instance=instance, token=token)
+    directory = get_directory(hubmap_id, instance=instance, token=token)
 
-    if answer is None:
+    try:
+        if Path(directory).exists():
+            return scanner.count_files(directory)
+        else:
+            return None
+    except:
+        warning(
+            "Unable to access files in directory. More than likely a permission file."
+        )
         return None
-    else:
-        return len(answer)
 
 
 def __query_donor_info(
@@ -1194,7 +1568,7 @@ def __query_donor_info(
 
     headers = {"Authorization": "Bearer " + token, "accept": "application/json"}
 
-    r = requests.get(URL, headers=headers)
+    r = client.get(URL, headers=headers)
     return r
 
 
@@ -1202,15 +1576,16 @@ def get_donor_info(
     hubmap_id: str,
     token: str,
     instance: str = "prod",
-    overwrite: bool = True,
+    overwrite: bool = False,
+    fields: list = None,
     debug: bool = False,
 ) -> dict:
     """
-    Retrieve the donor information associated with a given HuBMAP ID and optionally save it as a JSON file.
+    Retrieve the donor information associated with a given HuBMAP ID and cache it locally.
 
     This function obtains the donor information from the HuBMAP API based on a given HuBMAP ID.
-    The donor information is then saved as a JSON file in a `.donor` directory. If the file already
-    exists, the function will overwrite it by default, unless specified otherwise.
+    The donor information is then saved in the local metadata store. If a fresh cached version
+    exists, it is used instead, unless specified otherwise.
 
     :param hubmap_id: The HuBMAP ID for which donor information is to be retrieved.
     :type hubmap_id: str
@@ -1221,10 +1596,13 @@ def get_donor_info(
     :param instance: Specifies the instance environment (e.g., "prod"). Default is "prod".
     :type instance: str, optional
 
-    :param overwrite: If set to True, the existing JSON file with donor information will be overwritten.
-                      Default is True.
+    :param overwrite: If set to True, the cached donor information will be overwritten.
+                      Default is False.
     :type overwrite: bool, optional
 
+    :param fields: If given, retrieve only these properties of the donor instead of the full entity document.
+    :type fields: list, optional
+
     :param debug: If set to True, debug information will be printed. Default is False.
     :type debug: bool, optional
 
@@ -1232,10 +1610,10 @@ def get_donor_info(
              Returns None if there's an error or if the request response is empty.
 
     .. note::
-       - The function saves the donor information as a JSON file in a `.donor` directory
-         with the filename as `<donor_hubmap_id>.json`.
-       - The function utilizes `get_provenance_info` and `__query_donor_info` to gather
-         and process the necessary donor information.
+       - The function saves the donor information in the local metadata store keyed by
+         the donor HuBMAP ID.
+       - The donor is found in the lineage graph, filled by `sync_catalog`, and only falls back
+         to `get_provenance_info` for datasets missing from it.
 
     .. example::
        >>> get_donor_info("HGXXX", "your_token_here")
@@ -1244,34 +1622,32 @@ def get_donor_info(
     """
 
     # get donor ID from dataset ID
-    metadata = get_provenance_info(
-        hubmap_id, instance=instance, token=token, debug=debug
-    )
-    hubmap_donor_id = metadata["donor_hubmap_id"][0]
-
-    directory = ".donor"
-    file = os.path.join(directory, hubmap_donor_id + ".json")
-    if os.path.exists(file) and not overwrite:
-        j = json.load(open(file, "r"))
-    else:
-        r = __query_donor_info(
-            hubmap_donor_id, instance=instance, token=token, debug=debug
+    donor = lineage.donor_of(hubmap_id, token=token, instance=instance)
+    if donor is None or donor["hubmap_id"] is None:
+        warning(f"Unable to find the donor of {hubmap_id}.")
+        return None
+    hubmap_donor_id = donor["hubmap_id"]
+
+    if fields is not None:
+        return __get_projected_info(
+            hubmap_donor_id,
+            fields,
+            token=token,
+            instance=instance,
+            overwrite=overwrite,
+            debug=debug,
         )
-        if r is None:
-            warning("JSON object is empty.")
-            return r
-        j = json.loads(r.text)
 
-    if "message" in j:
-        warning("Request response is empty. Not populating dataframe.")
-        print(j["message"])
-        return None
-    else:
-        if not os.path.exists(directory):
-            os.mkdir(directory)
-        with open(file, "w") as outfile:
-            json.dump(j, outfile, indent=4)
-        return j
+    return __load_or_query(
+        "entity",
+        hubmap_donor_id,
+        lambda: __query_donor_info(
+            hubmap_donor_id, instance=instance, token=token, debug=debug
+        ),
+        instance=instance,
+        overwrite=overwrite,
+        debug=debug,
+    )
 
 
 def __query_entity_info(
@@ -1329,7 +1705,7 @@ def __query_entity_info(
 
     headers = {"Authorization": "Bearer " + token, "accept": "application/json"}
 
-    r = requests.get(URL, headers=headers)
+    r = client.get(URL, headers=headers)
     return r
 
 
@@ -1337,15 +1713,16 @@ def get_entity_info(
     hubmap_id: str,
     token: str,
     instance: str = "prod",
-    overwrite: bool = True,
-    debug: bool = True,
+    overwrite: bool = False,
+    fields: list = None,
+    debug: bool = False,
 ) -> dict:
     """
     Retrieve entity information from HuBMAP API based on a given HuBMAP ID and cache it locally.
 
     This function checks if the information related to the given HuBMAP ID is already stored locally.
     If not, or if overwrite is set to True, the HuBMAP API is queried for the entity information.
-    The response from the API is then saved as a JSON file in a directory named `.entity`.
+    The response from the API is then saved in the local metadata store.
 
     :param hubmap_id: The HuBMAP ID for which entity information is to be retrieved.
     :type hubmap_id: str
@@ -1356,10 +1733,13 @@ def get_entity_info(
     :param instance: Specifies the instance environment (e.g., "prod"). Default is "prod".
     :type instance: str, optional
 
-    :param overwrite: If set to True, overwrite the local cache if it exists. Default is True.
+    :param overwrite: If set to True, overwrite the local cache if it exists. Default is False.
     :type overwrite: bool, optional
 
-    :param debug: If set to True, debug information will be printed. Default is True.
+    :param fields: If given, retrieve only these properties instead of the full entity document.
+    :type fields: list, optional
+
+    :param debug: If set to True, debug information will be printed. Default is False.
     :type debug: bool, optional
 
     :return: A dictionary containing the entity information for the given HuBMAP ID.
@@ -1380,27 +1760,26 @@ def get_entity_info(
 
     """
 
-    directory = ".entity"
-    file = os.path.join(directory, hubmap_id + ".json")
-    if os.path.exists(file) and not overwrite:
-        j = json.load(open(file, "r"))
-    else:
-        r = __query_entity_info(hubmap_id, instance=instance, token=token, debug=debug)
-        if r is None:
-            warning("JSON object is empty.")
-            return r
-        j = json.loads(r.text)
+    if fields is not None:
+        return __get_projected_info(
+            hubmap_id,
+            fields,
+            token=token,
+            instance=instance,
+            overwrite=overwrite,
+            debug=debug,
+        )
 
-    if "message" in j:
-        warning("Request response is empty. Not populating dataframe.")
-        print(j["message"])
-        return None
-    else:
-        if not os.path.exists(directory):
-            os.mkdir(directory)
-        with open(file, "w") as outfile:
-            json.dump(j, outfile, indent=4)
-        return j
+    return __load_or_query(
+        "entity",
+        hubmap_id,
+        lambda: __query_entity_info(
+            hubmap_id, instance=instance, token=token, debug=debug
+        ),
+        instance=instance,
+        overwrite=overwrite,
+        debug=debug,
+    )
 
 
 def get_assay_types(token: str, debug: bool = False) -> list:
@@ -1440,7 +1819,7 @@ def get_dataset_type(
     :param overwrite: Determines whether to overwrite existing data or use cached data. Default is False.
     :type overwrite: bool, optional
 
-    :return: A string indicating the dataset type. Can be "Primary", "Derived", or "Unknown".
+    :return: A string indicating the dataset type. Can be "Publication", "Primary", "Derived", or "Unknown". None if the dataset could not be retrieved.
 
     .. note::
        - The function relies on the direct ancestors provided by the HuBMAP API to determine dataset type.
@@ -1453,14 +1832,505 @@ def get_dataset_type(
     """
 
     metadata = get_dataset_info(
-        hubmap_id, instance="prod", token=token, overwrite=overwrite
+        hubmap_id,
+        instance="prod",
+        token=token,
+        overwrite=overwrite,
+        fields=["data_types", "direct_ancestors.entity_type"],
     )
+    if metadata is None:
+        warning(f"Unable to retrieve the type of {hubmap_id}.")
+        return None
+
+    ancestors = metadata.get("direct_ancestors") or [{}]
 
-    if "publication_ancillary" in metadata["data_types"]:
+    if "publication_ancillary" in (metadata.get("data_types") or []):
         return "Publication"
-    elif metadata["direct_ancestors"][0]["entity_type"] == "Sample":
+    elif ancestors[0].get("entity_type") == "Sample":
         return "Primary"
-    elif metadata["direct_ancestors"][0]["entity_type"] == "Dataset":
+    elif ancestors[0].get("entity_type") == "Dataset":
         return "Derived"
     else:
         return "Unknown"
+
+
+def __get_info_many(
+    function,
+    kind: str,
+    hubmap_ids: list,
+    token: str,
+    instance: str = "prod",
+    overwrite: bool = False,
+    max_workers: int = 16,
+    debug: bool = False,
+) -> dict:
+    """
+    Helper method that calls a single-ID metadata getter on many HuBMAP IDs concurrently.
+
+    Requests are issued from a bounded thread pool and go through the shared HTTP client,
+    so the number of open connections never exceeds the pool size. If `kind` is given,
+    cached payloads are loaded in bulk first and only the missing IDs are queried.
+    """
+
+    token = utilities.__get_token(token)
+    hubmap_ids = list(dict.fromkeys(hubmap_ids))
+
+    results = {}
+    if kind is not None and not overwrite:
+        results = cache.load_many(kind, hubmap_ids, instance=instance)
+        hubmap_ids = [
+            hubmap_id for hubmap_id in hubmap_ids if hubmap_id not in results
+        ]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                memo.bind(function),
+                hubmap_id,
+                token=token,
+                instance=instance,
+                overwrite=overwrite,
+                debug=False,
+            ): hubmap_id
+            for hubmap_id in hubmap_ids
+        }
+
+        for future in tqdm(
+            as_completed(futures), total=len(futures), disable=not debug
+        ):
+            hubmap_id = futures[future]
+            try:
+                answer = future.result()
+                if answer is None:
+                    results[hubmap_id] = {"error": "Unable to retrieve metadata."}
+                else:
+                    results[hubmap_id] = answer
+            except Exception as e:
+                results[hubmap_id] = {"error": f"{type(e).__name__}: {e}"}
+
+    return results
+
+
+def get_dataset_info_many(
+    hubmap_ids: list,
+    token: str,
+    instance: str = "prod",
+    overwrite: bool = False,
+    max_workers: int = 16,
+    debug: bool = False,
+) -> dict:
+    """
+    Retrieve dataset information for many HuBMAP IDs concurrently.
+
+    This is the batch version of `get_dataset_info`. Each ID is fetched at most once,
+    the local cache is filled as a side effect and failures are reported per ID.
+
+    :param hubmap_ids: List of HuBMAP IDs.
+    :type hubmap_ids: list
+
+    :param token: Authentication token to access the HuBMAP entity API.
+    :type token: str
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+
+    :param overwrite: If True, ignore the local cache and query the API. Default is False.
+    :type overwrite: bool, optional
+
+    :param max_workers: Maximum number of concurrent requests. Default is 16.
+    :type max_workers: int, optional
+
+    :param debug: If True, show a progress bar. Default is False.
+    :type debug: bool, optional
+
+    :return: A dictionary keyed by HuBMAP ID. Values are the dataset information, or a dictionary with an "error" key if the request failed.
+    :rtype: dict
+
+    .. example::
+       >>> df = reports.daily()
+       >>> df = df[(df["status"] == "Published") & (df["is_primary"])]
+       >>> answer = get_dataset_info_many(df["hubmap_id"].tolist(), token=token)
+    """
+
+    return __get_info_many(
+        get_dataset_info,
+        "entity",
+        hubmap_ids,
+        token=token,
+        instance=instance,
+        overwrite=overwrite,
+        max_workers=max_workers,
+        debug=debug,
+    )
+
+
+def get_provenance_info_many(
+    hubmap_ids: list,
+    token: str,
+    instance: str = "prod",
+    overwrite: bool = False,
+    max_workers: int = 16,
+    debug: bool = False,
+) -> dict:
+    """
+    Retrieve provenance information for many HuBMAP IDs concurrently.
+
+    This is the batch version of `get_provenance_info`.
+
+    :param hubmap_ids: List of HuBMAP IDs.
+    :type hubmap_ids: list
+
+    :param token: Authentication token to access the HuBMAP entity API.
+    :type token: str
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+
+    :param overwrite: If True, ignore the local cache and query the API. Default is False.
+    :type overwrite: bool, optional
+
+    :param max_workers: Maximum number of concurrent requests. Default is 16.
+    :type max_workers: int, optional
+
+    :param debug: If True, show a progress bar. Default is False.
+    :type debug: bool, optional
+
+    :return: A dictionary keyed by HuBMAP ID. Values are the provenance information, or a dictionary with an "error" key if the request failed.
+    :rtype: dict
+    """
+
+    return __get_info_many(
+        get_provenance_info,
+        "provenance",
+        hubmap_ids,
+        token=token,
+        instance=instance,
+        overwrite=overwrite,
+        max_workers=max_workers,
+        debug=debug,
+    )
+
+
+def get_donor_info_many(
+    hubmap_ids: list,
+    token: str,
+    instance: str = "prod",
+    overwrite: bool = False,
+    max_workers: int = 16,
+    debug: bool = False,
+) -> dict:
+    """
+    Retrieve donor information for many dataset HuBMAP IDs concurrently.
+
+    This is the batch version of `get_donor_info`. Results are keyed by the dataset
+    HuBMAP ID given as input, not by the donor HuBMAP ID.
+
+    :param hubmap_ids: List of dataset HuBMAP IDs.
+    :type hubmap_ids: list
+
+    :param token: Authentication token to access the HuBMAP entity API.
+    :type token: str
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+
+    :param overwrite: If True, ignore the local cache and query the API. Default is False.
+    :type overwrite: bool, optional
+
+    :param max_workers: Maximum number of concurrent requests. Default is 16.
+    :type max_workers: int, optional
+
+    :param debug: If True, show a progress bar. Default is False.
+    :type debug: bool, optional
+
+    :return: A dictionary keyed by dataset HuBMAP ID. Values are the donor information, or a dictionary with an "error" key if the request failed.
+    :rtype: dict
+    """
+
+    return __get_info_many(
+        get_donor_info,
+        None,
+        hubmap_ids,
+        token=token,
+        instance=instance,
+        overwrite=overwrite,
+        max_workers=max_workers,
+        debug=debug,
+    )
+
+
+# properties of a dataset document needed to build bags
+CATALOG_FIELDS = [
+    "uuid",
+    "hubmap_id",
+    "entity_type",
+    "status",
+    "data_types",
+    "dataset_type",
+    "group_name",
+    "group_uuid",
+    "data_access_level",
+    "contains_human_genetic_sequences",
+    "created_timestamp",
+    "published_timestamp",
+    "last_modified_timestamp",
+    "title",
+    "description",
+    "registered_doi",
+    "doi_url",
+    "dbgap_study_url",
+    "dbgap_sra_experiment_url",
+    "direct_ancestors.uuid",
+    "direct_ancestors.hubmap_id",
+    "direct_ancestors.entity_type",
+    "immediate_ancestors.uuid",
+    "immediate_ancestors.hubmap_id",
+    "immediate_ancestors.entity_type",
+    "donor.uuid",
+    "donor.hubmap_id",
+    "donor.entity_type",
+    "donor.metadata",
+    "origin_samples.uuid",
+    "origin_samples.hubmap_id",
+    "origin_samples.organ",
+]
+
+# sort key used to paginate search results; must be unique per document
+SEARCH_SORT = [{"uuid": "asc"}]
+
+
+def __get_search_url(instance: str = "prod") -> str:
+    """
+    Helper method that returns the search API URL of an instance.
+    """
+
+    if __get_instance(instance) == "prod":
+        return "https://search.api.hubmapconsortium.org/v3/search"
+    else:
+        return (
+            "https://search-api"
+            + __get_instance(instance)
+            + ".hubmapconsortium.org/v3/search"
+        )
+
+
+def __search(
+    body: dict,
+    token: str,
+    instance: str = "prod",
+    page_size: int = 1000,
+    debug: bool = False,
+):
+    """
+    Helper generator that yields every hit of a search API query.
+
+    Results are paginated with `search_after` on `SEARCH_SORT`, so the number of
+    hits is not capped by the size of a single page.
+
+    :raises RuntimeError: If the search API returns an error or a response that is not JSON.
+    """
+
+    url = __get_search_url(instance)
+
+    if token is None:
+        headers = {"Accept": "application/json"}
+    else:
+        headers = {"Authorization": "Bearer " + token, "accept": "application/json"}
+
+    body = dict(body)
+    body["size"] = page_size
+    body["sort"] = SEARCH_SORT
+
+    page = 0
+    while True:
+        r = client.post(url, headers=headers, json=body)
+        if not r.ok:
+            raise RuntimeError(f"Search API request failed with status {r.status_code}.")
+
+        try:
+            data = r.json()
+        except ValueError:
+            raise RuntimeError("Search API response is not JSON.")
+
+        if "error" in data:
+            raise RuntimeError(str(data["error"]))
+
+        hits = data["hits"]["hits"]
+        page = page + 1
+        if debug:
+            print(f"Retrieved page {page} with {len(hits)} documents.")
+
+        yield from hits
+
+        if len(hits) < page_size:
+            return
+
+        body["search_after"] = hits[-1]["sort"]
+
+
+def __to_provenance(document: dict) -> dict:
+    """
+    Helper method that builds the provenance fields used by this package from a search document.
+
+    Returns None if the document does not embed its donor and origin sample.
+    """
+
+    donor = document.get("donor")
+    origin_samples = document.get("origin_samples")
+    if not donor or not origin_samples:
+        return None
+
+    return {
+        "donor_hubmap_id": [donor.get("hubmap_id")],
+        "donor_uuid": [donor.get("uuid")],
+        "organ_type": [origin_samples[0].get("organ")],
+        "organ_hubmap_id": [origin_samples[0].get("hubmap_id")],
+        "organ_uuid": [origin_samples[0].get("uuid")],
+    }
+
+
+def __put_projections(documents: dict, fields: list, instance: str = "prod") -> None:
+    """
+    Helper method that adds projected documents to the projection cache read by `__get_projected_info`.
+
+    The fields and properties already cached for an entity are kept, so a catalog sync only
+    widens the projections. The full entity documents are never touched.
+    """
+
+    cached = cache.load_many("projection", list(documents.keys()), instance=instance)
+
+    projections = {}
+    for hubmap_id, document in documents.items():
+        previous = cached.get(hubmap_id, {"fields": [], "document": {}})
+        projections[hubmap_id] = {
+            "fields": sorted(set(previous["fields"]) | set(fields)),
+            "document": {**previous["document"], **document},
+        }
+
+    cache.put_many("projection", projections, instance=instance)
+
+
+def sync_catalog(
+    token: str,
+    instance: str = "prod",
+    page_size: int = 1000,
+    fields: list = CATALOG_FIELDS,
+    debug: bool = False,
+) -> pd.DataFrame:
+    """
+    Stream every dataset document from the search API and hydrate the local metadata store.
+
+    Documents are paginated with `search_after` and projected to `fields`, so the whole catalog
+    is retrieved with a handful of requests. The datasets and the donors embedded in their documents
+    are added to the projection cache, so later lookups with `fields` do not call the API, and the
+    lineage graph is filled with their provenance.
+
+    :param token: Authentication token to access the HuBMAP search API.
+    :type token: str
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+
+    :param page_size: Number of documents per request. Default is 1000.
+    :type page_size: int, optional
+
+    :param fields: Properties of each dataset document to retrieve. Default is `CATALOG_FIELDS`.
+    :type fields: list, optional
+
+    :param debug: If True, will print additional debug information. Default is False.
+    :type debug: bool, optional
+
+    :return: A DataFrame with one row per dataset.
+    :rtype: pd.DataFrame
+
+    .. note::
+       - Only projections and the lineage graph are filled. Full entity and provenance documents
+         are still retrieved from the entity-api by `get_dataset_info` and `get_provenance_info`,
+         since search documents do not hold all of their properties. `get_donor_info` finds the
+         donor in the lineage graph, so with `fields` it makes no request after a sync.
+
+    .. example::
+       >>> df = sync_catalog(token=token)
+       >>> df[df["status"] == "Published"].shape[0]
+       5012
+    """
+
+    token = utilities.__get_token(token)
+
+    body = {
+        "_source": {"includes": fields},
+        "query": {"bool": {"filter": [{"term": {"entity_type": "Dataset"}}]}},
+    }
+
+    datasets = {}
+    provenance = {}
+    donors = {}
+    rows = []
+    for hit in __search(
+        body, token=token, instance=instance, page_size=page_size, debug=debug
+    ):
+        document = hit["_source"]
+        if "direct_ancestors" not in document and "immediate_ancestors" in document:
+            document["direct_ancestors"] = document.pop("immediate_ancestors")
+
+        hubmap_id = document.get("hubmap_id")
+        if hubmap_id is None:
+            continue
+
+        donor = document.pop("donor", None)
+        prov = __to_provenance(dict(document, donor=donor))
+        if prov is not None:
+            provenance[hubmap_id] = prov
+        if donor and donor.get("hubmap_id"):
+            donors[donor["hubmap_id"]] = donor
+        document.pop("origin_samples", None)
+
+        datasets[hubmap_id] = document
+        rows.append(
+            {
+                "uuid": document.get("uuid"),
+                "hubmap_id": hubmap_id,
+                "status": document.get("status"),
+                "group_name": document.get("group_name"),
+                "dataset_type": document.get("dataset_type"),
+                "data_access_level": document.get("data_access_level"),
+                "donor_hubmap_id": donor.get("hubmap_id") if donor else None,
+                "last_modified_timestamp": document.get("last_modified_timestamp"),
+            }
+        )
+
+    dataset_fields = [
+        field.replace("immediate_ancestors", "direct_ancestors", 1)
+        for field in fields
+        if field.split(".")[0] not in ["donor", "origin_samples"]
+    ]
+    donor_fields = [
+        field.split(".", 1)[1] for field in fields if field.startswith("donor.")
+    ]
+
+    __put_projections(datasets, dataset_fields, instance=instance)
+    __put_projections(donors, donor_fields, instance=instance)
+    lineage.record_many(
+        entities=list(datasets.values()) + list(donors.values()),
+        provenance=provenance,
+        instance=instance,
+    )
+
+    if debug:
+        print(
+            f"Synchronized {len(datasets)} datasets, {len(provenance)} provenance records and {len(donors)} donors."
+        )
+
+    return pd.DataFrame(
+        rows,
+        columns=[
+            "uuid",
+            "hubmap_id",
+            "status",
+            "group_name",
+            "dataset_type",
+            "data_access_level",
+            "donor_hubmap_id",
+            "last_modified_timestamp",
+        ],
+    )
@@ -2,9 +2,8 @@ import datetime
 import math
 
 import pandas as pd
-import requests
 
-from . import apis, uuids
+from . import apis, client, uuids
 
 
 def __prepare_dataframe(
@@ -52,7 +51,7 @@ def __get_assets_link(dataset_uuid: str, path: str) -> str:
 
 
 def __check_assets_link(url: str) -> dict:
-    response = requests.request("HEAD", url)
+    response = client.request("HEAD", url)
     return response
 
 
@@ -0,0 +1,279 @@
+import json
+import os
+import time
+import zlib
+from pathlib import Path
+
+from . import database
+
+# location of the metadata store, relative to the working directory unless absolute
+DATABASE = os.getenv("HUBMAPBAGS_CACHE", ".hubmapbags/metadata.db")
+
+# seconds after which a cached payload is considered stale; None disables expiration
+TTL = float(os.getenv("HUBMAPBAGS_CACHE_TTL", 24 * 60 * 60))
+
+# maximum number of bound parameters per bulk query
+__CHUNK_SIZE = 500
+
+__SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    kind TEXT NOT NULL,
+    hubmap_id TEXT NOT NULL,
+    instance TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    fetched_at REAL NOT NULL,
+    last_modified_timestamp INTEGER,
+    PRIMARY KEY (kind, hubmap_id, instance)
+) WITHOUT ROWID
+"""
+
+
+def __connect():
+    """
+    Helper method that opens the metadata store and creates the schema if needed.
+    """
+
+    return database.connect(DATABASE, schema=__SCHEMA)
+
+
+def __encode(payload) -> bytes:
+    """
+    Helper method that serializes a payload into a compact compressed blob.
+    """
+
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+def __decode(blob: bytes):
+    """
+    Helper method that deserializes a blob written by `__encode`.
+    """
+
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def __get_last_modified_timestamp(payload):
+    """
+    Helper method that extracts the last modified timestamp from an entity payload.
+    """
+
+    if isinstance(payload, dict):
+        return payload.get("last_modified_timestamp")
+
+    return None
+
+
+def __is_fresh(
+    fetched_at: float,
+    stored_timestamp: int,
+    ttl: float,
+    last_modified_timestamp: int,
+) -> bool:
+    """
+    Helper method that decides whether a cached payload can be reused.
+    """
+
+    if ttl is not None and time.time() - fetched_at > ttl:
+        return False
+
+    if last_modified_timestamp is not None:
+        if stored_timestamp is None or int(last_modified_timestamp) > stored_timestamp:
+            return False
+
+    return True
+
+
+def get(
+    kind: str,
+    hubmap_id: str,
+    instance: str = "prod",
+    ttl: float = TTL,
+    last_modified_timestamp: int = None,
+):
+    """
+    Load a payload from the metadata store.
+
+    :param kind: The kind of payload (e.g. "entity", "provenance", "ancestors").
+    :type kind: str
+
+    :param hubmap_id: The HuBMAP ID the payload belongs to.
+    :type hubmap_id: str
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+
+    :param ttl: Maximum age in seconds of a usable payload. If None, payloads never expire.
+    :type ttl: float, optional
+
+    :param last_modified_timestamp: If given, a payload stored before this timestamp is considered stale.
+    :type last_modified_timestamp: int, optional
+
+    :return: The payload, or None if it is missing or stale.
+    """
+
+    row = (
+        __connect()
+        .execute(
+            "SELECT payload, fetched_at, last_modified_timestamp FROM metadata "
+            "WHERE kind = ? AND hubmap_id = ? AND instance = ?",
+            (kind, hubmap_id, instance),
+        )
+        .fetchone()
+    )
+
+    if row is None:
+        return None
+
+    if not __is_fresh(row[1], row[2], ttl, last_modified_timestamp):
+        return None
+
+    return __decode(row[0])
+
+
+def load_many(
+    kind: str, hubmap_ids: list, instance: str = "prod", ttl: float = TTL
+) -> dict:
+    """
+    Load many payloads from the metadata store with a few indexed queries.
+
+    :param kind: The kind of payload (e.g. "entity", "provenance", "ancestors").
+    :type kind: str
+
+    :param hubmap_ids: List of HuBMAP IDs.
+    :type hubmap_ids: list
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+
+    :param ttl: Maximum age in seconds of a usable payload. If None, payloads never expire.
+    :type ttl: float, optional
+
+    :return: A dictionary keyed by HuBMAP ID with the fresh payloads found. Missing and stale IDs are left out.
+    :rtype: dict
+    """
+
+    conn = __connect()
+    hubmap_ids = list(dict.fromkeys(hubmap_ids))
+
+    answer = {}
+    for i in range(0, len(hubmap_ids), __CHUNK_SIZE):
+        chunk = hubmap_ids[i : i + __CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        rows = conn.execute(
+            "SELECT hubmap_id, payload, fetched_at, last_modified_timestamp FROM metadata "
+            f"WHERE kind = ? AND instance = ? AND hubmap_id IN ({placeholders})",
+            [kind, instance] + chunk,
+        )
+
+        for hubmap_id, payload, fetched_at, stored_timestamp in rows:
+            if __is_fresh(fetched_at, stored_timestamp, ttl, None):
+                answer[hubmap_id] = __decode(payload)
+
+    return answer
+
+
+def put(kind: str, hubmap_id: str, payload, instance: str = "prod") -> None:
+    """
+    Save a payload to the metadata store, replacing any previous version.
+
+    :param kind: The kind of payload (e.g. "entity", "provenance", "ancestors").
+    :type kind: str
+
+    :param hubmap_id: The HuBMAP ID the payload belongs to.
+    :type hubmap_id: str
+
+    :param payload: A JSON serializable object.
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+    """
+
+    put_many(kind, {hubmap_id: payload}, instance=instance)
+
+
+def put_many(kind: str, payloads: dict, instance: str = "prod") -> None:
+    """
+    Save many payloads to the metadata store in a single transaction.
+
+    :param kind: The kind of payload (e.g. "entity", "provenance", "ancestors").
+    :type kind: str
+
+    :param payloads: A dictionary keyed by HuBMAP ID of JSON serializable objects.
+    :type payloads: dict
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+    """
+
+    now = time.time()
+    rows = [
+        (
+            kind,
+            hubmap_id,
+            instance,
+            __encode(payload),
+            now,
+            __get_last_modified_timestamp(payload),
+        )
+        for hubmap_id, payload in payloads.items()
+    ]
+
+    conn = __connect()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR REPLACE INTO metadata "
+            "(kind, hubmap_id, instance, payload, fetched_at, last_modified_timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+
+def delete(kind: str = None, hubmap_id: str = None, instance: str = None) -> int:
+    """
+    Remove payloads from the metadata store.
+
+    :param kind: If given, only remove payloads of this kind.
+    :type kind: str, optional
+
+    :param hubmap_id: If given, only remove payloads of this HuBMAP ID.
+    :type hubmap_id: str, optional
+
+    :param instance: If given, only remove payloads of this instance.
+    :type instance: str, optional
+
+    :return: The number of payloads removed.
+    :rtype: int
+    """
+
+    clauses = []
+    params = []
+    for column, value in (
+        ("kind", kind),
+        ("hubmap_id", hubmap_id),
+        ("instance", instance),
+    ):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+
+    query = "DELETE FROM metadata"
+    if clauses:
+        query = query + " WHERE " + " AND ".join(clauses)
+
+    conn = __connect()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        return conn.execute(query, params).rowcount
+
+
+def clear() -> None:
+    """
+    Remove the metadata store from disk.
+    """
+
+    database.close(DATABASE)
+    for suffix in ["", "-journal", "-wal", "-shm"]:
+        file = Path(DATABASE + suffix)
+        if file.exists():
+            file.unlink()
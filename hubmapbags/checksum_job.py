@@ -0,0 +1,368 @@
+import json
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import pandas as pd
+
+from . import checksums, scanner, utilities
+
+# directory of the per-dataset checkpoints
+CHECKPOINT_DIRECTORY = ".data/checksums"
+
+# directory of the local files read by `uuids.generate`
+LOCAL_DIRECTORY = ".data"
+
+# number of files hashed concurrently
+MAX_WORKERS = 16
+
+# number of files queued per worker, so results are written while files are hashed
+__QUEUE_DEPTH = 4
+
+
+def get_checkpoint(
+    hubmap_id: str, checkpoint_directory: str = CHECKPOINT_DIRECTORY
+) -> Path:
+    """
+    Return the path of the checkpoint of a dataset.
+
+    :param hubmap_id: The HuBMAP ID of the dataset.
+    :type hubmap_id: str
+
+    :param checkpoint_directory: Directory of the checkpoints. Default is `CHECKPOINT_DIRECTORY`.
+    :type checkpoint_directory: str, optional
+
+    :return: The path of the checkpoint.
+    :rtype: pathlib.Path
+    """
+
+    return Path(checkpoint_directory) / f"{hubmap_id}.jsonl"
+
+
+def __read_checkpoint(file: Path) -> dict:
+    """
+    Helper method that reads the checkpoint of a dataset, keyed by relative path.
+
+    A line cut short when a job was killed is ignored. When a file appears several times,
+    the last line wins.
+    """
+
+    records = {}
+    if not file.exists():
+        return records
+
+    with open(file) as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[record["relative_path"]] = record
+
+    return records
+
+
+def load(
+    hubmap_id: str, checkpoint_directory: str = CHECKPOINT_DIRECTORY
+) -> pd.DataFrame:
+    """
+    Load the checksums of a dataset.
+
+    :param hubmap_id: The HuBMAP ID of the dataset.
+    :type hubmap_id: str
+
+    :param checkpoint_directory: Directory of the checkpoints. Default is `CHECKPOINT_DIRECTORY`.
+    :type checkpoint_directory: str, optional
+
+    :return: A dataframe with the relative path, size, mtime (ns), md5 and sha256 of every file hashed.
+    :rtype: pandas.DataFrame
+    """
+
+    records = __read_checkpoint(get_checkpoint(hubmap_id, checkpoint_directory))
+    return pd.DataFrame(
+        list(records.values()),
+        columns=["relative_path", "size", "mtime_ns", "md5", "sha256"],
+    )
+
+
+def get_local_file(directory: str, local_directory: str = LOCAL_DIRECTORY) -> Path:
+    """
+    Return the path of the local file of a dataset, the pickle read by `uuids.generate`.
+
+    :param directory: The data directory of the dataset.
+    :type directory: str
+
+    :param local_directory: Directory of the local files. Default is `LOCAL_DIRECTORY`.
+    :type local_directory: str, optional
+
+    :return: The path of the local file.
+    :rtype: pathlib.Path
+    """
+
+    return Path(local_directory) / (
+        directory.replace("/", "_").replace(" ", "_") + ".pkl"
+    )
+
+
+def export(
+    hubmap_id: str,
+    hubmap_uuid: str,
+    directory: str,
+    checkpoint_directory: str = CHECKPOINT_DIRECTORY,
+    local_directory: str = LOCAL_DIRECTORY,
+) -> pd.DataFrame:
+    """
+    Write the checksums of a dataset to its local file, so that `uuids.generate` registers its files.
+
+    The local file has one row per file with its path, size and checksums. Only the files
+    found in the directory now are exported; files deleted or renamed since they were hashed
+    stay in the checkpoint but are left out. The UUIDs of files already in the local file are kept,
+    so exporting after a resumed job never drops them.
+
+    :param hubmap_id: The HuBMAP ID of the dataset.
+    :type hubmap_id: str
+
+    :param hubmap_uuid: The UUID of the dataset.
+    :type hubmap_uuid: str
+
+    :param directory: The data directory of the dataset.
+    :type directory: str
+
+    :param checkpoint_directory: Directory of the checkpoints. Default is `CHECKPOINT_DIRECTORY`.
+    :type checkpoint_directory: str, optional
+
+    :param local_directory: Directory of the local files. Default is `LOCAL_DIRECTORY`.
+    :type local_directory: str, optional
+
+    :return: The local file as a dataframe.
+    :rtype: pandas.DataFrame
+    """
+
+    df = load(hubmap_id, checkpoint_directory=checkpoint_directory)
+
+    root = Path(directory).absolute()
+    relative_paths = {
+        str(file.relative_to(root)) for file in scanner.list_files(str(root))
+    }
+    df = df[df["relative_path"].isin(relative_paths)].reset_index(drop=True)
+
+    df = pd.DataFrame(
+        {
+            "local_id": [
+                os.path.join(directory, relative_path)
+                for relative_path in df["relative_path"]
+            ],
+            "relative_local_id": df["relative_path"],
+            "dataset_uuid": hubmap_uuid,
+            "size_in_bytes": df["size"],
+            "md5": df["md5"],
+            "sha256": df["sha256"],
+            "hubmap_uuid": None,
+        }
+    )
+
+    file = get_local_file(directory, local_directory=local_directory)
+    if file.exists():
+        previous = pd.read_pickle(file)
+        if "hubmap_uuid" in previous.columns:
+            uuids = previous.dropna(subset=["hubmap_uuid"])
+            uuids = uuids.drop_duplicates(subset="relative_local_id", keep="last")
+            uuids = uuids.set_index("relative_local_id")["hubmap_uuid"]
+            df["hubmap_uuid"] = df["relative_local_id"].map(uuids).astype(object)
+
+    file.parent.mkdir(parents=True, exist_ok=True)
+    with utilities.atomic_write(str(file)) as output_file:
+        df.to_pickle(output_file)
+
+    return df
+
+
+def __open_checkpoint(file: Path):
+    """
+    Helper method that opens a checkpoint for appending.
+
+    If the last line was cut short when a job was killed, it is terminated first so that
+    it does not swallow the next record.
+    """
+
+    if file.exists() and file.stat().st_size > 0:
+        with open(file, "rb") as handle:
+            handle.seek(-1, os.SEEK_END)
+            if handle.read(1) != b"\n":
+                with open(file, "a") as output:
+                    output.write("\n")
+
+    return open(file, "a")
+
+
+def __stat(directory: str, file: Path) -> dict:
+    """
+    Helper method that returns the relative path, size and mtime of a file.
+    """
+
+    stat = file.stat()
+    return {
+        "relative_path": str(file.relative_to(directory)),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def __plan(datasets: list, checkpoint_directory: str, max_workers: int) -> list:
+    """
+    Helper method that lists the files of every dataset that are not in its checkpoint yet.
+
+    A file is done if its checkpoint line has the same size and mtime. Returns tuples of
+    HuBMAP ID, directory and file information, largest files first.
+    """
+
+    tasks = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for hubmap_id, directory in datasets:
+            directory = str(Path(directory).absolute())
+            records = __read_checkpoint(get_checkpoint(hubmap_id, checkpoint_directory))
+            files = scanner.list_files(directory, max_workers=max_workers)
+
+            for info in executor.map(lambda file: __stat(directory, file), files):
+                record = records.get(info["relative_path"])
+                if (
+                    record is not None
+                    and record["size"] == info["size"]
+                    and record["mtime_ns"] == info["mtime_ns"]
+                ):
+                    continue
+
+                tasks.append((hubmap_id, directory, info))
+
+    # hashing the largest files first keeps the workers busy until the end,
+    # whichever datasets the files belong to
+    tasks.sort(key=lambda task: task[2]["size"], reverse=True)
+    return tasks
+
+
+def __hash(
+    directory: str, info: dict, block_size: int, paranoia: float, fingerprints: bool
+) -> dict:
+    """
+    Helper method that hashes a file, or reads its checksums from the cache, and returns its checkpoint record.
+    """
+
+    digests = checksums.get(
+        os.path.join(directory, info["relative_path"]),
+        block_size=block_size,
+        paranoia=paranoia,
+        fingerprints=fingerprints,
+    )
+    return {**info, **digests}
+
+
+def run(
+    datasets: list,
+    checkpoint_directory: str = CHECKPOINT_DIRECTORY,
+    max_workers: int = MAX_WORKERS,
+    block_size: int = checksums.BLOCK_SIZE,
+    paranoia: float = 0.0,
+    fingerprints: bool = False,
+) -> pd.DataFrame:
+    """
+    Compute the md5 and sha256 checksums of the files of several datasets.
+
+    Files from all datasets are hashed in a single pool of threads, largest first, so the
+    work is balanced by bytes rather than by dataset. Every checksum is appended to the
+    checkpoint of its dataset as soon as it is computed. When the job is started again,
+    after it finished or was killed, files already in a checkpoint with the same size and
+    mtime are skipped, so only the files that were in progress are hashed again. Files that
+    did not change since they were hashed by any job are read from the checksum cache.
+
+    :param datasets: Tuples of HuBMAP ID and data directory.
+    :type datasets: list
+
+    :param checkpoint_directory: Directory of the checkpoints. Default is `CHECKPOINT_DIRECTORY`.
+    :type checkpoint_directory: str, optional
+
+    :param max_workers: Number of files hashed concurrently. Default is `MAX_WORKERS`.
+    :type max_workers: int, optional
+
+    :param block_size: Number of bytes read at once. Default is `checksums.BLOCK_SIZE`.
+    :type block_size: int, optional
+
+    :param paranoia: Fraction of the files found in the checksum cache that are hashed again to verify it. Default is 0.
+    :type paranoia: float, optional
+
+    :param fingerprints: If True, files picked for verification by `paranoia` are only hashed again if their fast fingerprint changed. Default is False.
+    :type fingerprints: bool, optional
+
+    :return: One row per dataset with the number of files and bytes hashed and the number of errors.
+    :rtype: pandas.DataFrame
+
+    .. example::
+       >>> checksum_job.run([("HBM123.ABCD.456", "/hive/hubmap/data/public/abcd1234")])
+    """
+
+    Path(checkpoint_directory).mkdir(parents=True, exist_ok=True)
+
+    summary = {
+        hubmap_id: {"hubmap_id": hubmap_id, "files": 0, "bytes": 0, "errors": 0}
+        for hubmap_id, _ in datasets
+    }
+
+    tasks = __plan(datasets, checkpoint_directory, max_workers)
+    logging.info(
+        f"Hashing {len(tasks)} files, {sum(task[2]['size'] for task in tasks)} bytes"
+    )
+
+    checkpoints = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            queue = iter(tasks)
+            pending = {}
+
+            def submit(count):
+                for hubmap_id, directory, info in queue:
+                    future = executor.submit(
+                        __hash,
+                        directory,
+                        info,
+                        block_size,
+                        paranoia,
+                        fingerprints,
+                    )
+                    pending[future] = (hubmap_id, info)
+                    count = count - 1
+                    if count == 0:
+                        break
+
+            submit(max_workers * __QUEUE_DEPTH)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    hubmap_id, info = pending.pop(future)
+                    try:
+                        record = future.result()
+                    except OSError as e:
+                        logging.error(
+                            f"Unable to hash {info['relative_path']} of {hubmap_id}: {e!r}"
+                        )
+                        summary[hubmap_id]["errors"] += 1
+                        continue
+
+                    if hubmap_id not in checkpoints:
+                        checkpoints[hubmap_id] = __open_checkpoint(
+                            get_checkpoint(hubmap_id, checkpoint_directory)
+                        )
+
+                    # one line per file, flushed at once, so a kill loses at most
+                    # the files being hashed
+                    checkpoints[hubmap_id].write(json.dumps(record) + "\n")
+                    checkpoints[hubmap_id].flush()
+
+                    summary[hubmap_id]["files"] += 1
+                    summary[hubmap_id]["bytes"] += record["size"]
+
+                submit(len(done))
+    finally:
+        for checkpoint in checkpoints.values():
+            checkpoint.close()
+
+    return pd.DataFrame(list(summary.values()))
@@ -0,0 +1,375 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from warnings import warn as warning
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+from . import database
+
+# location of the checksum cache; kept apart from the metadata store so that cleaning the cache keeps it
+DATABASE = os.getenv("HUBMAPBAGS_CHECKSUMS", ".hubmapbags/checksums.db")
+
+# files modified less than this many seconds before they are hashed are not cached,
+# since a change within the same mtime tick would go unnoticed
+__RACY_SECONDS = 2
+
+__SCHEMA = """
+CREATE TABLE IF NOT EXISTS checksums (
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    digests TEXT NOT NULL,
+    hashed_at REAL NOT NULL,
+    PRIMARY KEY (device, inode)
+) WITHOUT ROWID
+"""
+
+# number of bytes read at once
+BLOCK_SIZE = 2**20
+
+# digests computed by default
+ALGORITHMS = ["md5", "sha256"]
+
+# number of bytes read from each end of a file by `fingerprint`
+SAMPLE_SIZE = 2**16
+
+
+def __advise_sequential(handle) -> None:
+    """
+    Helper method that tells the kernel a file will be read sequentially, so it reads ahead more aggressively.
+    """
+
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(handle.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+
+def __advise_done(handle) -> None:
+    """
+    Helper method that tells the kernel the pages of a file read once can be dropped from the page cache.
+    """
+
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(handle.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+
+
+def compute(
+    file: str, algorithms: list = ALGORITHMS, block_size: int = BLOCK_SIZE
+) -> dict:
+    """
+    Compute several digests of a file in a single read.
+
+    The file is read block by block into one reused buffer, and every block is fed to all
+    digests before the next one is read. hashlib releases the GIL while hashing large
+    blocks, so files can be hashed from several threads at once.
+
+    :param file: Path of the file.
+    :type file: str
+
+    :param algorithms: Names of hashlib algorithms. Default is `ALGORITHMS` (md5 and sha256).
+    :type algorithms: list, optional
+
+    :param block_size: Number of bytes read at once. Default is `BLOCK_SIZE` (1 MiB).
+    :type block_size: int, optional
+
+    :return: A dictionary keyed by algorithm with the hexadecimal digests.
+    :rtype: dict
+
+    :raises ValueError: If an algorithm is not supported by hashlib.
+
+    .. example::
+       >>> checksums.compute("/hive/hubmap/data/public/abcd1234/metadata.tsv")
+       {'md5': '...', 'sha256': '...'}
+    """
+
+    digests = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+
+    with open(file, "rb", buffering=0) as handle:
+        __advise_sequential(handle)
+
+        while True:
+            size = handle.readinto(buffer)
+            if not size:
+                break
+
+            block = view[:size]
+            for digest in digests.values():
+                digest.update(block)
+
+        __advise_done(handle)
+
+    return {algorithm: digest.hexdigest() for algorithm, digest in digests.items()}
+
+
+def benchmark(
+    file: str,
+    block_sizes: list = [2**16, 2**18, 2**20, 2**22, 2**24],
+    algorithms: list = ALGORITHMS,
+) -> list:
+    """
+    Measure the throughput of `compute` on a file for several block sizes.
+
+    Use a file larger than the page cache, or drop the cache between runs, to measure
+    the storage rather than memory.
+
+    :param file: Path of the file.
+    :type file: str
+
+    :param block_sizes: Block sizes in bytes to try.
+    :type block_sizes: list, optional
+
+    :param algorithms: Names of hashlib algorithms. Default is `ALGORITHMS` (md5 and sha256).
+    :type algorithms: list, optional
+
+    :return: One dictionary per block size with the block size, the seconds taken and the throughput in MiB/s.
+    :rtype: list
+    """
+
+    size = os.path.getsize(file)
+
+    results = []
+    for block_size in block_sizes:
+        start = time.perf_counter()
+        compute(file, algorithms=algorithms, block_size=block_size)
+        seconds = time.perf_counter() - start
+
+        results.append(
+            {
+                "block_size": block_size,
+                "seconds": seconds,
+                "throughput": size / 2**20 / seconds if seconds else None,
+            }
+        )
+
+    return results
+
+
+def __new_fast_hash() -> tuple:
+    """
+    Helper method that returns the name and a new instance of the fastest hash available.
+    """
+
+    if xxhash is not None:
+        return "xxh3_128", xxhash.xxh3_128()
+
+    if blake3 is not None:
+        return "blake3", blake3.blake3()
+
+    return "blake2b", hashlib.blake2b(digest_size=16)
+
+
+def fingerprint(file: str, sample_size: int = SAMPLE_SIZE) -> str:
+    """
+    Compute a fast fingerprint of a file from its size and the bytes at both of its ends.
+
+    The fingerprint hashes the size, the first and the last `sample_size` bytes of the file
+    (the whole file if it is smaller) with xxhash or BLAKE3 if installed, or BLAKE2 otherwise.
+    Different fingerprints mean the file changed. Equal fingerprints mean the file most likely
+    did not change, since an edit that keeps the size and both ends goes unnoticed. It is not
+    a checksum and never goes into a manifest.
+
+    :param file: Path of the file.
+    :type file: str
+
+    :param sample_size: Number of bytes read from each end. Default is `SAMPLE_SIZE` (64 KiB).
+    :type sample_size: int, optional
+
+    :return: The fingerprint, prefixed with the hash and the sample size so that only comparable fingerprints are equal.
+    :rtype: str
+    """
+
+    name, digest = __new_fast_hash()
+
+    with open(file, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        digest.update(size.to_bytes(8, "little"))
+
+        if size <= 2 * sample_size:
+            digest.update(handle.read())
+        else:
+            digest.update(handle.read(sample_size))
+            handle.seek(-sample_size, os.SEEK_END)
+            digest.update(handle.read(sample_size))
+
+    return f"{name}:{sample_size}:{digest.hexdigest()}"
+
+
+def __connect():
+    """
+    Helper method that opens the checksum cache and creates the schema if needed.
+    """
+
+    return database.connect(DATABASE, schema=__SCHEMA)
+
+
+def __select(conn, stat):
+    """
+    Helper method that returns the size, mtime and digests cached for the inode of a file.
+    """
+
+    return conn.execute(
+        "SELECT size, mtime_ns, digests FROM checksums WHERE device = ? AND inode = ?",
+        (stat.st_dev, stat.st_ino),
+    ).fetchone()
+
+
+def lookup(file: str, algorithms: list = ALGORITHMS, stat=None) -> dict:
+    """
+    Return the cached digests of a file if it did not change since it was hashed.
+
+    A file is unchanged if its device, inode, size and mtime are the ones recorded when it
+    was hashed.
+
+    :param file: Path of the file.
+    :type file: str
+
+    :param algorithms: Names of hashlib algorithms. Default is `ALGORITHMS` (md5 and sha256).
+    :type algorithms: list, optional
+
+    :param stat: The result of `os.stat` on the file, if already known. Default is None.
+    :type stat: os.stat_result, optional
+
+    :return: A dictionary keyed by algorithm with the hexadecimal digests, or None if the file changed or some digests were never computed.
+    :rtype: dict
+    """
+
+    if stat is None:
+        stat = os.stat(file)
+
+    row = __select(__connect(), stat)
+
+    if row is None or row[0] != stat.st_size or row[1] != stat.st_mtime_ns:
+        return None
+
+    digests = json.loads(row[2])
+    if any(algorithm not in digests for algorithm in algorithms):
+        return None
+
+    return {algorithm: digests[algorithm] for algorithm in algorithms}
+
+
+def __store(file: str, stat, digests: dict) -> None:
+    """
+    Helper method that records the digests of a file with its stat fingerprint.
+
+    Digests already cached for the same version of the file are kept.
+    """
+
+    if time.time() - stat.st_mtime_ns / 1e9 <= __RACY_SECONDS:
+        return
+
+    conn = __connect()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = __select(conn, stat)
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            digests = {**json.loads(row[2]), **digests}
+
+        conn.execute(
+            "INSERT OR REPLACE INTO checksums "
+            "(device, inode, size, mtime_ns, path, digests, hashed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                stat.st_dev,
+                stat.st_ino,
+                stat.st_size,
+                stat.st_mtime_ns,
+                os.path.abspath(file),
+                json.dumps(digests, sort_keys=True),
+                time.time(),
+            ),
+        )
+
+
+def __is_unchanged(file: str, stat) -> bool:
+    """
+    Helper method that checks whether a file still has the fingerprint cached with its digests.
+
+    Returns False if no fingerprint was cached.
+    """
+
+    row = __select(__connect(), stat)
+    if row is None:
+        return False
+
+    cached = json.loads(row[2]).get("fingerprint")
+    return cached is not None and fingerprint(file) == cached
+
+
+def get(
+    file: str,
+    algorithms: list = ALGORITHMS,
+    block_size: int = BLOCK_SIZE,
+    paranoia: float = 0.0,
+    fingerprints: bool = False,
+) -> dict:
+    """
+    Return the digests of a file, from the checksum cache if the file did not change.
+
+    Files that changed, or were never hashed, are read once with `compute` and their digests
+    are cached with their device, inode, size and mtime. Refreshing an unchanged tree then
+    only costs a `stat` per file. A fast `fingerprint` is cached with the digests.
+
+    :param file: Path of the file.
+    :type file: str
+
+    :param algorithms: Names of hashlib algorithms. Default is `ALGORITHMS` (md5 and sha256).
+    :type algorithms: list, optional
+
+    :param block_size: Number of bytes read at once. Default is `BLOCK_SIZE` (1 MiB).
+    :type block_size: int, optional
+
+    :param paranoia: Fraction of cached files, between 0 and 1, that are hashed again to verify the cache. A mismatch is reported and the cache is corrected. Default is 0.
+    :type paranoia: float, optional
+
+    :param fingerprints: If True, a cached file picked for verification by `paranoia` is only read at both ends, and hashed again only if its fingerprint changed. A file whose mtime changed is always hashed again. Default is False.
+    :type fingerprints: bool, optional
+
+    :return: A dictionary keyed by algorithm with the hexadecimal digests.
+    :rtype: dict
+    """
+
+    stat = os.stat(file)
+    cached = lookup(file, algorithms=algorithms, stat=stat)
+
+    if cached is not None and (paranoia <= 0 or random.random() >= paranoia):
+        return cached
+
+    # the fingerprint stands in for the verification of an unchanged file, never for
+    # the digests of a file that changed
+    if cached is not None and fingerprints and __is_unchanged(file, stat):
+        return cached
+
+    digests = compute(file, algorithms=algorithms, block_size=block_size)
+
+    if cached is not None and cached != digests:
+        message = (
+            f"Cached checksums of {file} do not match its content. Updating the cache."
+        )
+        warning(message)
+        logging.warning(message)
+
+    __store(file, stat, {**digests, "fingerprint": fingerprint(file)})
+    return digests
@@ -0,0 +1,126 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import memo
+
+# default (connect, read) timeouts in seconds
+TIMEOUT = (10, 120)
+
+# number of connections kept alive per host
+POOL_SIZE = 32
+
+RETRIES = 5
+BACKOFF_FACTOR = 0.5
+STATUS_FORCELIST = (429, 500, 502, 503, 504)
+
+# endpoints where POST requests are read-only and safe to retry
+SEARCH_URLS = (
+    "https://search.api.hubmapconsortium.org",
+    "https://search-api.dev.hubmapconsortium.org",
+    "https://search-api.test.hubmapconsortium.org",
+)
+
+__lock = threading.Lock()
+__session = None
+__pid = None
+
+
+def __build_adapter(allowed_methods: frozenset) -> HTTPAdapter:
+    """
+    Helper method that builds a pooled adapter that retries with backoff on 429/5xx.
+    """
+
+    retry = Retry(
+        total=RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=STATUS_FORCELIST,
+        allowed_methods=allowed_methods,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+    return HTTPAdapter(
+        pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry
+    )
+
+
+def __build_session() -> requests.Session:
+    """
+    Helper method that builds a session with keep-alive pooling and retries.
+
+    Only idempotent methods are retried, except on the search API where POST is a read-only query.
+    """
+
+    session = requests.Session()
+    session.mount("https://", __build_adapter(Retry.DEFAULT_ALLOWED_METHODS))
+    session.mount("http://", __build_adapter(Retry.DEFAULT_ALLOWED_METHODS))
+    for url in SEARCH_URLS:
+        session.mount(url, __build_adapter(Retry.DEFAULT_ALLOWED_METHODS | {"POST"}))
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Return the package-wide HTTP session.
+
+    The session is created lazily and recreated after a fork so that worker
+    processes never share sockets with their parent.
+
+    :return: A session with per-host connection pooling and retry-with-backoff on 429/5xx.
+    :rtype: requests.Session
+    """
+
+    global __session, __pid
+
+    pid = os.getpid()
+    if __session is None or __pid != pid:
+        with __lock:
+            if __session is None or __pid != pid:
+                __session = __build_session()
+                __pid = pid
+
+    return __session
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Send a request through the package-wide session.
+
+    :param method: HTTP method (e.g. "GET", "POST", "HEAD").
+    :type method: str
+
+    :param url: The URL to send the request to.
+    :type url: str
+
+    :param kwargs: Keyword arguments passed to `requests.Session.request`. If no timeout is given, `TIMEOUT` is used.
+
+    :return: The response.
+    :rtype: requests.Response
+    """
+
+    kwargs.setdefault("timeout", TIMEOUT)
+    memo.count_network_call()
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """
+    Send a GET request through the package-wide session.
+    """
+
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """
+    Send a POST request through the package-wide session.
+    """
+
+    return request("POST", url, **kwargs)
+
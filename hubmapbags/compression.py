@@ -0,0 +1,242 @@
+import logging
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+# EDAM format term of gzip files
+GZIP = "format:3989"
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# largest compression ratio expected from our data; a file that could decompress to more
+# than 4 GiB at this ratio may have an ISIZE trailer that wrapped around
+MAX_RATIO = 32
+
+# largest number of compressed bytes decompressed to count the size of a file whose trailer
+# is ambiguous; a larger file keeps an unknown size
+STREAM_LIMIT = 64 * 2**20
+
+# number of files inspected concurrently
+MAX_WORKERS = 16
+
+# number of bytes read and decompressed at once when streaming
+__BLOCK_SIZE = 2**20
+
+# smallest possible gzip member: a 10 byte header, an empty deflate stream and an 8 byte trailer
+__MINIMUM_SIZE = 20
+
+# bytes added by deflate to incompressible data: 5 per stored block of up to 65535 bytes
+__STORED_BLOCK_SIZE = 65535
+__STORED_BLOCK_OVERHEAD = 5
+
+# gzip header flag of the extra field, used by BGZF
+__FEXTRA = 0x04
+
+# ISIZE is the uncompressed size modulo 2**32
+__WRAP = 2**32
+
+
+def __is_bgzf(header: bytes) -> bool:
+    """
+    Helper method that checks whether a gzip header starts a BGZF block, which makes the file multi-member.
+    """
+
+    if len(header) < 16 or not header[3] & __FEXTRA:
+        return False
+
+    return header[12:14] == b"BC"
+
+
+def __get_block_size(header: bytes) -> int:
+    """
+    Helper method that returns the size of a BGZF block from its header, or None if the header is not BGZF.
+    """
+
+    if len(header) < 12 or not header.startswith(GZIP_MAGIC) or not header[3] & __FEXTRA:
+        return None
+
+    extra_length = struct.unpack("<H", header[10:12])[0]
+    extra = header[12 : 12 + extra_length]
+
+    position = 0
+    while position + 4 <= len(extra):
+        length = struct.unpack("<H", extra[position + 2 : position + 4])[0]
+        if extra[position : position + 2] == b"BC" and length == 2:
+            return struct.unpack("<H", extra[position + 4 : position + 6])[0] + 1
+        position = position + 4 + length
+
+    return None
+
+
+def __sum_blocks(file: str) -> int:
+    """
+    Helper method that adds up the ISIZE trailers of the blocks of a BGZF file.
+
+    Every block states its own size, so only the header and the trailer of each block are
+    read. Returns None if a block is not BGZF, e.g. a plain gzip member was appended.
+    """
+
+    size = 0
+    with open(file, "rb") as handle:
+        descriptor = handle.fileno()
+        compressed_size = os.fstat(descriptor).st_size
+
+        position = 0
+        while position < compressed_size:
+            block_size = __get_block_size(os.pread(descriptor, 64, position))
+            if block_size is None or position + block_size > compressed_size:
+                return None
+
+            trailer = os.pread(descriptor, 4, position + block_size - 4)
+            size = size + struct.unpack("<I", trailer)[0]
+            position = position + block_size
+
+    return size
+
+
+def __get_minimum_size(compressed_size: int) -> int:
+    """
+    Helper method that returns the smallest uncompressed size a single gzip member of this size can have.
+    """
+
+    blocks = compressed_size // (__STORED_BLOCK_SIZE + __STORED_BLOCK_OVERHEAD) + 1
+    return compressed_size - __MINIMUM_SIZE - blocks * __STORED_BLOCK_OVERHEAD
+
+
+def __count(file: str, limit: int) -> int:
+    """
+    Helper method that counts the uncompressed bytes of every gzip member of a file.
+
+    Returns None if the file has more than `limit` compressed bytes or is not valid gzip.
+    """
+
+    if os.path.getsize(file) > limit:
+        logging.warning(f"{file} is larger than {limit} bytes. Leaving its size unknown.")
+        return None
+
+    size = 0
+    decompressor = zlib.decompressobj(wbits=31)
+    started = False
+
+    try:
+        with open(file, "rb") as handle:
+            while True:
+                data = handle.read(__BLOCK_SIZE)
+                if not data:
+                    break
+
+                while data:
+                    started = True
+                    # decompress in bounded pieces so memory does not grow with the ratio
+                    size = size + len(decompressor.decompress(data, __BLOCK_SIZE))
+                    data = decompressor.unconsumed_tail
+
+                    if decompressor.eof:
+                        # the next member starts right after this one
+                        data = decompressor.unused_data + data
+                        decompressor = zlib.decompressobj(wbits=31)
+                        started = False
+                        if not data.startswith(GZIP_MAGIC[: len(data)]):
+                            # trailing garbage after the last member
+                            return size
+    except zlib.error:
+        return None
+
+    if started and not decompressor.eof:
+        # the file was cut short
+        return None
+
+    return size
+
+
+def get_uncompressed_size(file: str, stream_limit: int = STREAM_LIMIT) -> int:
+    """
+    Return the uncompressed size of a gzip file.
+
+    The size of a single-member file is read from its ISIZE trailer, the uncompressed size
+    modulo 4 GiB, with a single seek. The trailer is the size if the file cannot decompress
+    to 4 GiB at `MAX_RATIO` and the trailer is between the compressed size and `MAX_RATIO`
+    times that.
+
+    The size of a BGZF file is the sum of the trailers of its blocks, read without
+    decompressing them. Any other file is decompressed to count its size, but only if it
+    has at most `stream_limit` compressed bytes; a larger file has an unknown size rather
+    than one guessed from its trailer.
+
+    :param file: Path of the file.
+    :type file: str
+
+    :param stream_limit: Largest number of compressed bytes decompressed to count the size of a file whose trailer is ambiguous. Default is `STREAM_LIMIT`.
+    :type stream_limit: int, optional
+
+    :return: The uncompressed size in bytes, or None if the file is not valid gzip or its size cannot be known without decompressing more than `stream_limit` bytes.
+    :rtype: int
+    """
+
+    try:
+        with open(file, "rb") as handle:
+            header = handle.read(16)
+            if not header.startswith(GZIP_MAGIC):
+                return None
+
+            compressed_size = os.fstat(handle.fileno()).st_size
+            if compressed_size < __MINIMUM_SIZE:
+                return None
+
+            handle.seek(-4, os.SEEK_END)
+            isize = struct.unpack("<I", handle.read(4))[0]
+    except OSError as e:
+        logging.warning(f"Unable to read {file}: {e!r}")
+        return None
+
+    try:
+        if __is_bgzf(header):
+            size = __sum_blocks(file)
+            if size is not None:
+                return size
+            return __count(file, stream_limit)
+
+        # a trailer outside of the sizes the file can have comes from several members,
+        # a truncated file or, for large files, a trailer that wrapped around
+        suspicious = (
+            isize < __get_minimum_size(compressed_size)
+            or isize > compressed_size * MAX_RATIO
+        )
+        if not suspicious and compressed_size * MAX_RATIO < __WRAP:
+            return isize
+
+        return __count(file, stream_limit)
+    except OSError as e:
+        logging.warning(f"Unable to read {file}: {e!r}")
+        return None
+
+
+def get_uncompressed_sizes(
+    files: list, stream_limit: int = STREAM_LIMIT, max_workers: int = MAX_WORKERS
+) -> list:
+    """
+    Return the uncompressed sizes of several gzip files, see `get_uncompressed_size`.
+
+    Files are inspected concurrently; zlib releases the GIL while decompressing.
+
+    :param files: Paths of the files.
+    :type files: list
+
+    :param stream_limit: Largest number of compressed bytes decompressed to count the size of a file whose trailer is ambiguous. Default is `STREAM_LIMIT`.
+    :type stream_limit: int, optional
+
+    :param max_workers: Number of files inspected concurrently. Default is `MAX_WORKERS`.
+    :type max_workers: int, optional
+
+    :return: The uncompressed sizes, in the same order, with None for files whose size is unknown.
+    :rtype: list
+    """
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            executor.map(
+                lambda file: get_uncompressed_size(file, stream_limit=stream_limit),
+                files,
+            )
+        )
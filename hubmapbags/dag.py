@@ -0,0 +1,134 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from . import memo
+
+# number of steps run concurrently
+MAX_WORKERS = 8
+
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+def __check(steps: dict) -> None:
+    """
+    Helper method that makes sure every dependency is a step and the graph has no cycles.
+    """
+
+    for name, (_, dependencies) in steps.items():
+        for dependency in dependencies:
+            if dependency not in steps:
+                raise ValueError(f"Step {name} depends on unknown step {dependency}.")
+
+    visited = set()
+    for name in steps:
+        path = [name]
+        stack = [iter(steps[name][1])]
+        while stack:
+            dependency = next(stack[-1], None)
+            if dependency is None:
+                visited.add(path.pop())
+                stack.pop()
+            elif dependency in path:
+                raise ValueError(f"Steps {' -> '.join(path)} form a cycle.")
+            elif dependency not in visited:
+                path.append(dependency)
+                stack.append(iter(steps[dependency][1]))
+
+
+def __time(function) -> tuple:
+    """
+    Helper method that calls `function` and returns when it started, how long it took and what it returned.
+    """
+
+    start = time.time()
+    answer = function()
+    return start, time.time() - start, answer
+
+
+def run(steps: dict, max_workers: int = MAX_WORKERS) -> dict:
+    """
+    Run steps as soon as the steps they depend on are done.
+
+    Steps are run in a pool of threads, so steps waiting on the network or the file system
+    overlap with each other and with steps that compute, and the wall time of a run is
+    close to the time of its longest chain of dependencies. A step fails if it raises or
+    returns False, as the table builders do. If a step fails, no new step is started, the
+    steps in progress are awaited and the first error is raised. Steps share the metadata
+    memo scopes of the caller.
+
+    :param steps: A dictionary keyed by step name with a tuple of a function without arguments and the list of steps it depends on.
+    :type steps: dict
+
+    :param max_workers: Number of steps run concurrently. Default is `MAX_WORKERS`.
+    :type max_workers: int, optional
+
+    :return: A dictionary keyed by step name with its status ("done", "failed" or "skipped"), the seconds between the start of the run and the start of the step, and its duration in seconds.
+    :rtype: dict
+
+    :raises ValueError: If a step depends on an unknown step or the steps form a cycle.
+
+    :raises RuntimeError: If a step returns False.
+
+    .. example::
+       >>> dag.run(
+       ...     {
+       ...         "inventory": (load_inventory, []),
+       ...         "file": (write_files, ["inventory"]),
+       ...         "subject": (write_subjects, []),
+       ...     }
+       ... )
+    """
+
+    __check(steps)
+
+    timings = {
+        name: {"status": SKIPPED, "start": None, "duration": None} for name in steps
+    }
+    remaining = {name: set(dependencies) for name, (_, dependencies) in steps.items()}
+    origin = time.time()
+    error = None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def submit_ready():
+            for name in [name for name, waiting in remaining.items() if not waiting]:
+                del remaining[name]
+                pending[executor.submit(memo.bind(__time), steps[name][0])] = name
+
+        submit_ready()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    start, duration, answer = future.result()
+                    if answer is False:
+                        raise RuntimeError(f"Step {name} returned False.")
+                except Exception as e:
+                    logging.error(f"Step {name} failed: {e!r}")
+                    timings[name]["status"] = FAILED
+                    if error is None:
+                        error = e
+                    continue
+
+                timings[name] = {
+                    "status": DONE,
+                    "start": start - origin,
+                    "duration": duration,
+                }
+                logging.info(f"Step {name} took {duration:.2f} seconds")
+
+                for waiting in remaining.values():
+                    waiting.discard(name)
+
+            if error is None:
+                submit_ready()
+
+    if error is not None:
+        raise error
+
+    return timings
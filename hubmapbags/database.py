@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+# seconds to wait on a locked database before giving up
+TIMEOUT = 60
+
+# SQLite journal mode of every database. The stores live in .hubmapbags/ under the working
+# directory unless HUBMAPBAGS_CACHE, HUBMAPBAGS_LEDGER or HUBMAPBAGS_CHECKSUMS point
+# elsewhere, often on a network file system shared by several hosts. WAL needs memory
+# shared between the processes of a single host and is unsafe there, so the default is
+# DELETE; set HUBMAPBAGS_JOURNAL_MODE=WAL for stores on a local disk.
+JOURNAL_MODE = os.getenv("HUBMAPBAGS_JOURNAL_MODE", "DELETE").upper()
+
+__local = threading.local()
+
+
+def connect(database: str, schema: str = None) -> sqlite3.Connection:
+    """
+    Return a SQLite connection to the given database file.
+
+    Connections are cached per thread and per process, so it is safe to call this
+    function from thread pools and from forked workers. Databases are opened in
+    `JOURNAL_MODE`.
+
+    :param database: Path to the SQLite database file.
+    :type database: str
+
+    :param schema: SQL statements that create the tables of the caller if needed. They are run once per connection. Default is None.
+    :type schema: str, optional
+
+    :return: An open connection.
+    :rtype: sqlite3.Connection
+    """
+
+    database = str(Path(database).absolute())
+    pid = os.getpid()
+
+    if getattr(__local, "pid", None) != pid:
+        __local.pid = pid
+        __local.connections = {}
+        __local.schemas = {}
+
+    conn = __local.connections.get(database)
+    if conn is None:
+        Path(database).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(database, timeout=TIMEOUT, isolation_level=None)
+        conn.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
+        if JOURNAL_MODE == "WAL":
+            conn.execute("PRAGMA synchronous=NORMAL")
+        __local.connections[database] = conn
+        __local.schemas[database] = set()
+
+    if schema is not None and schema not in __local.schemas[database]:
+        conn.executescript(schema)
+        __local.schemas[database].add(schema)
+
+    return conn
+
+
+def close(database: str = None) -> None:
+    """
+    Close the connections opened by the calling thread.
+
+    :param database: Path to the SQLite database file. If None, close every connection.
+    :type database: str, optional
+    """
+
+    if getattr(__local, "pid", None) != os.getpid():
+        return
+
+    if database is None:
+        databases = list(__local.connections.keys())
+    else:
+        databases = [str(Path(database).absolute())]
+
+    for database in databases:
+        conn = __local.connections.pop(database, None)
+        __local.schemas.pop(database, None)
+        if conn is not None:
+            conn.close()
@@ -1,18 +1,13 @@
 import datetime
-import hashlib
 from pprint import pprint
-import mimetypes
 import os
 from itertools import chain
 from pathlib import Path
-import hubmapinventory
+import numpy as np
 import pandas as pd
 from pprint import pprint
 
-
-def __get_persistent_id(file_uuid: str) -> str:
-    url = f"drs://drs.hubmapconsortium.org/{file_uuid}"
-    return url
+from . import checksums, compression, file_types, inventories, utilities
 
 
 def __get_filename(file: str) -> str:
@@ -25,9 +20,10 @@ def __get_filename(file: str) -> str:
 
 def __get_file_extension(file: str) -> str:
     """
-    Helper method that returns the file extension.
+    Helper method that returns the file extension, e.g. ".ome.tiff".
     """
-    return file.suffix
+
+    return file_types.get_extension(file)
 
 
 def __get_file_size(file: str) -> int:
@@ -43,17 +39,15 @@ def __get_md5(file: str) -> str:
     Helper method that computes and return a file md5 checksum.
     """
 
-    blocksize = 2**20
-    m = hashlib.md5()
+    return checksums.get(file, algorithms=["md5"])["md5"]
 
-    with open(file, "rb") as f:
-        while True:
-            buf = f.read(blocksize)
-            if not buf:
-                break
-            m.update(buf)
 
-    return m.hexdigest()
+def __get_checksums(file: str) -> dict:
+    """
+    Helper method that computes the md5 and sha256 checksums of a file in a single read.
+    """
+
+    return checksums.get(file, algorithms=["md5", "sha256"])
 
 
 def __get_relative_local_id(file: str, hubmap_uuid: str) -> str:
@@ -71,17 +65,7 @@ def __get_sha256(file: str) -> str:
     Helper method that computes and return a file sha256 checksum.
     """
 
-    blocksize = 2**20
-    m = hashlib.md5()
-
-    with open(file, "rb") as f:
-        while True:
-            buf = f.read(blocksize)
-            if not buf:
-                break
-            m.update(buf)
-
-    return m.hexdigest()
+    return checksums.get(file, algorithms=["sha256"])["sha256"]
 
 
 def __get_file_creation_date(file: str) -> str:
@@ -98,38 +82,7 @@ def __get_data_type(file: str) -> str:
     Helper method that maps a file extension to an EDAM data format term.
     """
 
-    extension = __get_file_extension(file)
-
-    try:
-        formats = {}
-        formats[".txt"] = "data:3671"  # txt
-        formats[".txt"] = ""  # txt
-        formats[".tsv"] = "data:2526"  # tsv
-        formats[".tif"] = "data:2968"  # tiff
-        formats[".tiff"] = "data:2968"  # tiff
-        formats[".png"] = "data:2968"  # png
-        formats[".jpg"] = "data:2968"  # jpg
-        formats[".ome.tiff"] = "data:2968"  # ome.tiff
-        formats[".fastq"] = "data:2044"  # txt
-        formats[".txt"] = "data:2526"  # txt
-        formats[".xml"] = "data:2526"  # xml
-        formats[".czi"] = "data:2968"  # czi
-        formats[".gz"] = "data:2044"  # gz
-        formats[".json"] = "data:2526"  # json
-        formats[".xlsx"] = "data:2526"  # xlsx
-        formats["._truncated_"] = ""  # ?
-        formats[".tgz"] = ""  # tgz
-        formats[".tar.gz"] = ""  # tar.gz
-        formats[".csv"] = "data:2526"  # csv
-        formats[".html"] = "data:2526"  # html
-        formats[".htm"] = "data:2526"  # htm
-        formats[".h5"] = ""  # h5
-        formats[""] = ""  # other
-
-        return formats[extension]
-    except:
-        print("Unable to find key for data type " + extension)
-        return None
+    return file_types.classify_extension(file_types.get_extension(file))[0]
 
 
 def __get_mime_type(file: str) -> str:
@@ -137,7 +90,7 @@ def __get_mime_type(file: str) -> str:
     Helper function that return a file MIME type.
     """
 
-    return mimetypes.MimeTypes().guess_type(str(file))[0]
+    return file_types.classify_extension(file_types.get_extension(file))[2]
 
 
 def __get_file_format(file: str) -> str:
@@ -145,36 +98,7 @@ def __get_file_format(file: str) -> str:
     Helper method that maps a file extension to an EDAM file format term.
     """
 
-    extension = __get_file_extension(file)
-
-    try:
-        formats = {}
-        formats[".tsv"] = "format:2330"  # tsv
-        formats[".tif"] = "format:3547"  # tiff
-        formats[".tiff"] = "format:3547"  # tiff
-        formats[".png"] = "format:3547"  # png
-        formats[".jpg"] = "format:3547"  # jpg
-        formats[".ome.tiff"] = "format:3547"  # ome.tiff
-        formats[".fastq"] = "format:2330"  # txt
-        formats[".txt"] = "format:2330"  # txt
-        formats[".xml"] = "format:2332"  # xml
-        formats[".czi"] = "format:3547"  # czi
-        formats[".gz"] = "format:3989"  # gz
-        formats[".json"] = "format:2330"  # json
-        formats[".xlsx"] = "format:3468"  # xlsx
-        formats["._truncated_"] = "format:2330"  # ?
-        formats[".tgz"] = "format:3989"  # tgz
-        formats[".csv"] = "format:3752"  # csv
-        formats[".html"] = "format:2331"  # html
-        formats[".htm"] = "format:2331"  # htm
-        formats[".tar.gz"] = "format:3989"  # tgz
-        formats[".h5"] = "format:3590"  # h5
-        formats[""] = ""
-
-        return formats[extension]
-    except:
-        print("Unable to find key for file format " + extension)
-        return None
+    return file_types.classify_extension(file_types.get_extension(file))[1]
 
 
 def __get_assay_type(metadata) -> str:
@@ -255,6 +179,165 @@ def _get_list_of_files(directory: str):
     return Path(directory).glob("**/*")
 
 
+# estimated ratio between the memory used to transform a chunk and the memory of
+# its inventory rows, since each transformation copies some of the columns
+__MEMORY_OVERHEAD = 4
+
+# number of inventory rows used to estimate the memory of a row
+__SAMPLE_SIZE = 1000
+
+
+def __get_constant_column(value, length: int) -> pd.Categorical:
+    """
+    Helper method that returns a column repeating a single value, stored as a categorical.
+
+    A missing value is written as an empty field, like None in an object column.
+    """
+
+    if value is None:
+        return pd.Categorical.from_codes(
+            np.full(length, -1, dtype=np.int8), dtype=pd.CategoricalDtype([])
+        )
+
+    return pd.Categorical.from_codes(
+        np.zeros(length, dtype=np.int8), dtype=pd.CategoricalDtype([value])
+    )
+
+
+def __get_persistent_ids(local_ids: pd.Series) -> pd.Series:
+    """
+    Helper method that returns the DRS URIs of a column of file UUIDs.
+    """
+
+    local_ids = local_ids.astype(object).astype(str)
+    return "drs://drs.hubmapconsortium.org/" + local_ids
+
+
+def __fix_edam_strings(formats: pd.Series) -> pd.Series:
+    """
+    Helper method that shortens EDAM format URIs to CURIEs, e.g. format:1234.
+
+    Values that are not strings become missing values.
+    """
+
+    try:
+        return formats.astype(object).str.replace(
+            "http://edamontology.org/format_", "format:", regex=False
+        )
+    except AttributeError:
+        # the column holds no strings at all
+        return pd.Series(None, index=formats.index, dtype=object)
+
+
+def __get_uncompressed_sizes(
+    df: pd.DataFrame, directory: str | None, compression_format: pd.Series
+) -> pd.Series:
+    """
+    Helper method that returns the uncompressed sizes of the gzip files of the inventory.
+
+    Only files with a gzip extension are opened, and mostly only their trailer is read; see
+    `compression.get_uncompressed_size`. Other files have a missing size.
+    """
+
+    sizes = pd.Series(pd.NA, index=df.index, dtype="Int64")
+    if directory is None or "relative_path" not in df.columns:
+        return sizes
+
+    gzip = compression_format == compression.GZIP
+    if not gzip.any():
+        return sizes
+
+    files = [
+        os.path.join(directory, relative_path)
+        for relative_path in df.loc[gzip, "relative_path"]
+    ]
+    sizes[gzip] = pd.array(compression.get_uncompressed_sizes(files), dtype="Int64")
+
+    return sizes
+
+
+def __transform(
+    df: pd.DataFrame,
+    project_id: str,
+    assay_type: str,
+    dbgap_study_id: str | None,
+    directory: str | None = None,
+) -> pd.DataFrame:
+    """
+    Helper method that turns rows of the inventory into rows of the file manifest.
+
+    Columns are computed as a whole and constant columns are stored as categoricals. Every
+    transformation works row by row, so the inventory can be transformed at once or in chunks.
+    The uncompressed sizes of gzip files are only read if the data `directory` is given.
+    """
+
+    id_namespace = "tag:hubmapconsortium.org,2024:"
+    length = len(df)
+
+    if "file_uuid" in df.keys():
+        local_id = df["file_uuid"]
+    else:
+        local_id = pd.Series(None, index=df.index, dtype=object)
+
+    # formats and MIME types missing from the inventory are classified by extension
+    file_format = __fix_edam_strings(df["file_format"])
+    mime_type = df["mime_type"].astype(object)
+    classes = file_types.classify(df["filename"])
+    file_format = file_format.fillna(classes["file_format"].astype(object))
+    mime_type = mime_type.fillna(classes["mime_type"].astype(object))
+
+    compression_format = classes["compression_format"]
+    uncompressed_size = __get_uncompressed_sizes(df, directory, compression_format)
+
+    columns = {
+        "id_namespace": __get_constant_column(id_namespace, length),
+        "local_id": local_id,
+        "project_id_namespace": __get_constant_column(id_namespace, length),
+        "project_local_id": __get_constant_column(project_id, length),
+        "persistent_id": __get_persistent_ids(local_id),
+        "creation_time": df["modification_time"],
+        "size_in_bytes": df["size"],
+        "uncompressed_size_in_bytes": uncompressed_size,
+        "sha256": df["sha256"],
+        "md5": df["md5"],
+        "filename": df["filename"],
+        "file_format": file_format.astype("category"),
+        "compression_format": compression_format,
+        "data_type": __get_constant_column(None, length),
+        "assay_type": __get_constant_column(
+            __get_assay_type_from_obi(assay_type), length
+        ),
+        "analysis_type": __get_constant_column(None, length),
+        "mime_type": mime_type.astype("category"),
+        "bundle_collection_id_namespace": __get_constant_column(None, length),
+        "bundle_collection_local_id": __get_constant_column(None, length),
+        "dbgap_study_id": __get_constant_column(dbgap_study_id, length),
+    }
+
+    # a single frame built from the columns, instead of adding, renaming and
+    # dropping columns one at a time
+    df = pd.DataFrame(columns, index=df.index)
+
+    return df
+
+
+def __load_inventory(
+    token: None, inventory_directory: str, dataset_hmid: str
+) -> pd.DataFrame:
+    """
+    Helper method that loads the inventory of a dataset.
+    """
+
+    df = inventories.get(
+        hubmap_id=dataset_hmid, token=token, inventory_directory=inventory_directory
+    )
+
+    if df.empty:
+        pprint("Dataframe is empty, code will fail.")
+
+    return df
+
+
 def _build_dataframe(
     project_id: str,
     token: None,
@@ -269,125 +352,55 @@ def _build_dataframe(
     Build a dataframe with minimal information for this entity.
     """
 
-    id_namespace = "tag:hubmapconsortium.org,2024:"
-    headers = [
-        "id_namespace",
-        "local_id",
-        "project_id_namespace",
-        "project_local_id",
-        "persistent_id",
-        "creation_time",
-        "size_in_bytes",
-        "uncompressed_size_in_bytes",
-        "sha256",
-        "md5",
-        "filename",
-        "file_format",
-        "compression_format",
-        "data_type",
-        "assay_type",
-        "analysis_type",
-        "mime_type",
-        "bundle_collection_id_namespace",
-        "bundle_collection_local_id",
-        "dbgap_study_id",
-    ]
-
-    df = hubmapinventory.get(
-        hubmap_id=dataset_hmid, token=token, inventory_directory=inventory_directory
-    )
-
-    if df.empty:
-        pprint("Dataframe is empty, code will fail.")
+    df = __load_inventory(token, inventory_directory, dataset_hmid)
+    return __transform(df, project_id, assay_type, dbgap_study_id, directory)
 
-    df["id_namespace"] = id_namespace
-    df["project_id_namespace"] = id_namespace
-    df["project_local_id"] = project_id
-    df["compression_format"] = None
-    df["bundle_collection_id_namespace"] = None
-    df["bundle_collection_local_id"] = None
-    df["uncompressed_size_in_bytes"] = None
-    df["data_type"] = None
-    df["analysis_type"] = None
 
-    if "file_uuid" in df.keys():
-        df["local_id"] = df["file_uuid"]
-        df = df.drop(["file_uuid"], axis=1)
-    else:
-        df["local_id"] = None
+def __get_chunk_size(df: pd.DataFrame, max_memory: int) -> int:
+    """
+    Helper method that returns the number of inventory rows whose transformation takes about `max_memory` bytes.
+    """
 
-    df["persistent_id"] = df["local_id"].apply(__get_persistent_id)
+    sample = df.head(__SAMPLE_SIZE)
+    if sample.empty:
+        return 1
 
-    df["dbgap_study_id"] = dbgap_study_id
+    bytes_per_row = sample.memory_usage(deep=True, index=True).sum() / len(sample)
+    return max(1, int(max_memory / (bytes_per_row * __MEMORY_OVERHEAD)))
 
-    if "modification_time" in df.keys():
-        df = df.rename(columns={"modification_time": "creation_time"})
 
-    if "size" in df.keys():
-        df["size_in_bytes"] = df["size"]
+def _write_chunks(
+    df: pd.DataFrame,
+    filename: str,
+    project_id: str,
+    assay_type: str,
+    dbgap_study_id: str | None,
+    chunk_size: int,
+    directory: str | None = None,
+) -> int:
+    """
+    Transform the inventory in chunks of rows and append them to the file manifest.
 
-    def __fix_edam_string(edam):
-        try:
-            return edam.replace("http://edamontology.org/format_", "format:")
-        except:
-            return None
+    The header is written with the first chunk. Chunks are slices of the same inventory,
+    so their columns keep the same types and the output is byte-identical to writing the
+    whole manifest at once. The file is written atomically.
 
-    if "file_format" in df.keys():
-        df["file_format"] = df["file_format"].apply(__fix_edam_string)
+    :return: The number of rows written.
+    :rtype: int
+    """
 
-    if "relative_path" in df.keys():
-        df["relative_path"] = df["relative_path"].apply(
-            lambda str: str.replace(" ", "%20")
-        )
-        df = df.rename(columns={"relative_path": "relative_local_id"})
-
-    df = df.rename(columns={"dataset_id": "dataset_hmid"})
-    df["assay_type"] = __get_assay_type_from_obi(assay_type)
-
-    if "full_path" in df.keys():
-        df = df.drop(["full_path"], axis=1)
-
-    if "download_url" in df.keys():
-        df = df.drop(["download_url"], axis=1)
-
-    if "extension" in df.keys():
-        df = df.drop(["extension"], axis=1)
-
-    if "file_type" in df.keys():
-        df = df.drop(["file_type"], axis=1)
-
-    if "size" in df.keys():
-        df = df.drop(["size"], axis=1)
-
-    if "relative_local_id" in df.keys():
-        df = df.drop(["relative_local_id"], axis=1)
-
-    df = df[
-        [
-            "id_namespace",
-            "local_id",
-            "project_id_namespace",
-            "project_local_id",
-            "persistent_id",
-            "creation_time",
-            "size_in_bytes",
-            "uncompressed_size_in_bytes",
-            "sha256",
-            "md5",
-            "filename",
-            "file_format",
-            "compression_format",
-            "data_type",
-            "assay_type",
-            "analysis_type",
-            "mime_type",
-            "bundle_collection_id_namespace",
-            "bundle_collection_local_id",
-            "dbgap_study_id",
-        ]
-    ]
+    rows = 0
+    with utilities.atomic_write(filename) as temp_file:
+        with open(temp_file, "w", newline="") as output:
+            for start in range(0, max(len(df), 1), chunk_size):
+                chunk = df.iloc[start : start + chunk_size]
+                chunk = __transform(
+                    chunk, project_id, assay_type, dbgap_study_id, directory
+                )
+                chunk.to_csv(output, sep="\t", index=False, header=start == 0)
+                rows = rows + len(chunk)
 
-    return df
+    return rows
 
 
 def create_manifest(
@@ -400,21 +413,61 @@ def create_manifest(
     token: str,
     dataset_hmid: str,
     dataset_uuid: str,
+    chunk_size: int = None,
+    max_memory: int = None,
 ):
+    """
+    Create the file manifest (file.tsv) of a dataset.
+
+    By default the whole manifest is built in memory. With `chunk_size` or `max_memory`, the
+    inventory is transformed in chunks of rows that are appended to the manifest, so the
+    copies made by the transformation and the manifest itself grow with the size of a chunk
+    instead of the size of the dataset. The inventory is still loaded whole, since it comes
+    as a single frame shared with the other builders of the bag, so it sets a floor on memory
+    that `max_memory` does not cap.
+
+    :param chunk_size: Number of inventory rows transformed at once. Default is None.
+    :type chunk_size: int, optional
+
+    :param max_memory: Approximate number of bytes used to transform a chunk, on top of the loaded inventory, used to pick the chunk size when `chunk_size` is not given. Default is None.
+    :type max_memory: int, optional
+
+    :return: True
+    :rtype: bool
+    """
+
     filename = os.path.join(output_directory, "file.tsv")
 
-    df = _build_dataframe(
-        project_id,
-        token,
-        assay_type,
-        directory,
-        inventory_directory,
-        dbgap_study_id,
-        dataset_hmid,
-        dataset_uuid,
-    )
+    if chunk_size is None and max_memory is None:
+        df = _build_dataframe(
+            project_id,
+            token,
+            assay_type,
+            directory,
+            inventory_directory,
+            dbgap_study_id,
+            dataset_hmid,
+            dataset_uuid,
+        )
+
+        if Path(output_directory).exists():
+            df.to_csv(filename, sep="\t", index=False)
+
+        return True
+
+    df = __load_inventory(token, inventory_directory, dataset_hmid)
+    if chunk_size is None:
+        chunk_size = __get_chunk_size(df, max_memory)
 
     if Path(output_directory).exists():
-        df.to_csv(filename, sep="\t", index=False)
+        _write_chunks(
+            df,
+            filename,
+            project_id,
+            assay_type,
+            dbgap_study_id,
+            chunk_size,
+            directory=directory,
+        )
 
     return True
@@ -1,7 +1,7 @@
 import os
-import hubmapinventory
 import pandas as pd
 
+from . import inventories
 from .apis import *
 
 
@@ -24,7 +24,7 @@ def _build_dataframe(
         "collection_local_id",
     ]
 
-    df = hubmapinventory.get(
+    df = inventories.get(
         hubmap_id=hubmap_id, token=token, inventory_directory=inventory_directory
     )
     df = df[df["filename"].str.contains("metadata.tsv")]
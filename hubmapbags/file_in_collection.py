@@ -1,8 +1,9 @@
 import os
 from pathlib import Path
-import hubmapinventory
 import pandas as pd
 
+from . import inventories
+
 
 def __build_dataframe(
     hubmap_id: str,
@@ -25,7 +26,7 @@ def __build_dataframe(
 
     id_namespace = "tag:hubmapconsortium.org,2024:"
 
-    df = hubmapinventory.get(
+    df = inventories.get(
         hubmap_id=hubmap_id, token=token, inventory_directory=inventory_directory
     )
     df["collection_id_namespace"] = id_namespace
@@ -0,0 +1,205 @@
+import mimetypes
+from functools import lru_cache
+
+import pandas as pd
+
+# EDAM data terms keyed by extension; compound extensions win over their last suffix
+DATA_TYPES = {
+    ".tsv": "data:2526",  # tsv
+    ".tif": "data:2968",  # tiff
+    ".tiff": "data:2968",  # tiff
+    ".png": "data:2968",  # png
+    ".jpg": "data:2968",  # jpg
+    ".ome.tif": "data:2968",  # ome.tiff
+    ".ome.tiff": "data:2968",  # ome.tiff
+    ".fastq": "data:2044",  # txt
+    ".txt": "data:2526",  # txt
+    ".xml": "data:2526",  # xml
+    ".czi": "data:2968",  # czi
+    ".gz": "data:2044",  # gz
+    ".json": "data:2526",  # json
+    ".xlsx": "data:2526",  # xlsx
+    "._truncated_": "",  # ?
+    ".tgz": "",  # tgz
+    ".tar.gz": "",  # tar.gz
+    ".csv": "data:2526",  # csv
+    ".html": "data:2526",  # html
+    ".htm": "data:2526",  # htm
+    ".h5": "",  # h5
+    "": "",  # other
+}
+
+# EDAM format terms keyed by extension; compound extensions win over their last suffix
+FILE_FORMATS = {
+    ".tsv": "format:2330",  # tsv
+    ".tif": "format:3547",  # tiff
+    ".tiff": "format:3547",  # tiff
+    ".png": "format:3547",  # png
+    ".jpg": "format:3547",  # jpg
+    ".ome.tif": "format:3547",  # ome.tiff
+    ".ome.tiff": "format:3547",  # ome.tiff
+    ".fastq": "format:2330",  # txt
+    ".txt": "format:2330",  # txt
+    ".xml": "format:2332",  # xml
+    ".czi": "format:3547",  # czi
+    ".gz": "format:3989",  # gz
+    ".json": "format:2330",  # json
+    ".xlsx": "format:3468",  # xlsx
+    "._truncated_": "format:2330",  # ?
+    ".tgz": "format:3989",  # tgz
+    ".csv": "format:3752",  # csv
+    ".html": "format:2331",  # html
+    ".htm": "format:2331",  # htm
+    ".tar.gz": "format:3989",  # tgz
+    ".h5": "format:3590",  # h5
+    "": "",
+}
+
+# EDAM format terms of compressed files keyed by their last suffix
+COMPRESSION_FORMATS = {
+    ".gz": "format:3989",  # gzip
+    ".tgz": "format:3989",  # gzip
+}
+
+# the last suffixes of a file name, at most three, e.g. ".ome.tiff" or ".fastq.gz";
+# the file name must have a stem, so dotfiles have no extension
+__EXTENSION = r"^.+?((?:\.[^./]+){1,3})$"
+
+__mime_types = None
+
+
+def __get_mime_types() -> mimetypes.MimeTypes:
+    """
+    Helper method that returns the MIME type database, read once.
+    """
+
+    global __mime_types
+
+    if __mime_types is None:
+        __mime_types = mimetypes.MimeTypes()
+
+    return __mime_types
+
+
+def get_extension(file) -> str:
+    """
+    Return the extension of a file, made of up to its last three suffixes.
+
+    :param file: Path or name of the file.
+    :type file: str
+
+    :return: The lowercase extension, e.g. ".ome.tiff", or "" if the file has none.
+    :rtype: str
+    """
+
+    return get_extensions(pd.Series([str(file)])).iloc[0]
+
+
+def get_extensions(files: pd.Series) -> pd.Series:
+    """
+    Return the extensions of a column of files, see `get_extension`.
+
+    :param files: Paths or names of the files.
+    :type files: pandas.Series
+
+    :return: The lowercase extensions.
+    :rtype: pandas.Series
+    """
+
+    names = files.astype(str).str.rsplit("/", n=1).str[-1]
+    return names.str.extract(__EXTENSION, expand=False).fillna("").str.lower()
+
+
+def __lookup(table: dict, suffixes: tuple):
+    """
+    Helper method that returns the value of the longest extension made of the last suffixes found in a table.
+
+    Returns None if no extension is found.
+    """
+
+    if not suffixes:
+        return table.get("")
+
+    for n in range(len(suffixes), 0, -1):
+        extension = "".join(suffixes[-n:])
+        if extension in table:
+            return table[extension]
+
+    return None
+
+
+@lru_cache(maxsize=None)
+def classify_extension(extension: str) -> tuple:
+    """
+    Classify a file extension.
+
+    The longest compound extension found in a table wins, e.g. ".ome.tiff" over ".tiff". A
+    compressed file that is not in a table as a whole, e.g. ".fastq.gz", is classified by its
+    compression and by the extension under it, or like the compression alone if that
+    extension is unknown, e.g. ".mtx.gz". Results are memoized per extension.
+
+    :param extension: A lowercase extension, see `get_extension`.
+    :type extension: str
+
+    :return: The data type, file format, MIME type and compression format; unknown values are None.
+    :rtype: tuple
+    """
+
+    suffixes = tuple("." + suffix for suffix in extension.split(".")[1:])
+    mime_type = __get_mime_types().guess_type(f"file{extension}")[0]
+
+    compression_format = None
+    inner = suffixes
+    if suffixes and suffixes[-1] in COMPRESSION_FORMATS:
+        compression_format = COMPRESSION_FORMATS[suffixes[-1]]
+
+        # unless the compressed extension is known as a whole, e.g. ".tar.gz",
+        # classify the extension under the compression
+        compound = ["".join(suffixes[-n:]) for n in range(2, len(suffixes) + 1)]
+        if len(suffixes) > 1 and not any(
+            candidate in FILE_FORMATS for candidate in compound
+        ):
+            inner = suffixes[:-1]
+
+    # an unknown extension under the compression, e.g. ".mtx.gz", falls back
+    # to the entry of the compression itself
+    data_type = __lookup(DATA_TYPES, inner)
+    if data_type is None and inner is not suffixes:
+        data_type = __lookup(DATA_TYPES, suffixes[-1:])
+
+    file_format = __lookup(FILE_FORMATS, inner)
+    if file_format is None and inner is not suffixes:
+        file_format = __lookup(FILE_FORMATS, suffixes[-1:])
+
+    return data_type, file_format, mime_type, compression_format
+
+
+def classify(files: pd.Series) -> pd.DataFrame:
+    """
+    Classify a column of files by extension.
+
+    Extensions are extracted from the whole column at once and every distinct extension is
+    classified once, so millions of files are classified in seconds.
+
+    :param files: Paths or names of the files.
+    :type files: pandas.Series
+
+    :return: A dataframe with the same index and the categorical columns data_type, file_format, mime_type and compression_format.
+    :rtype: pandas.DataFrame
+
+    .. example::
+       >>> file_types.classify(pd.Series(["a.ome.tiff", "b.fastq.gz"]))
+    """
+
+    extensions = get_extensions(files).astype("category")
+    categories = extensions.cat.categories
+
+    classes = [classify_extension(extension) for extension in categories]
+    columns = {}
+    for position, column in enumerate(
+        ["data_type", "file_format", "mime_type", "compression_format"]
+    ):
+        values = pd.Series([row[position] for row in classes], index=categories)
+        columns[column] = extensions.map(values).astype("category")
+
+    return pd.DataFrame(columns, index=files.index)
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from . import cache
+
+
+class __Flight:
+    """
+    A call in progress, shared by every thread that asks for the same key.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+__lock = threading.Lock()
+__flights = {}
+
+
+def __get_lock_directory() -> Path:
+    """
+    Helper method that returns the directory of the process locks, next to the metadata store.
+    """
+
+    return Path(cache.DATABASE).absolute().parent / "locks"
+
+
+def __get_lock_file(key: tuple) -> Path:
+    """
+    Helper method that maps a key to its lock file.
+    """
+
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+    return __get_lock_directory() / f"{digest}.lock"
+
+
+def __call_locked(key: tuple, function):
+    """
+    Helper method that calls `function` while holding the process lock of `key`.
+
+    Processes that wait on the lock run `function` once the lock is released. Fetchers
+    check the metadata store first, so they find the payload stored by the process that
+    held the lock instead of querying the API again. The lock file is removed before the
+    lock is released, so no file is left behind per key; a process that was waiting on the
+    removed file notices and locks the current one instead.
+    """
+
+    if fcntl is None:
+        return function()
+
+    file = __get_lock_file(key)
+    file.parent.mkdir(parents=True, exist_ok=True)
+
+    while True:
+        with open(file, "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                current = os.stat(file)
+            except FileNotFoundError:
+                current = None
+
+            if current is None or current.st_ino != os.fstat(handle.fileno()).st_ino:
+                # the file was removed by the previous holder while this process waited
+                fcntl.flock(handle, fcntl.LOCK_UN)
+                continue
+
+            try:
+                return function()
+            finally:
+                file.unlink(missing_ok=True)
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def once(key: tuple, function):
+    """
+    Call `function` once for all concurrent callers that ask for the same key.
+
+    The first caller runs `function` and every other thread that asks for the same key
+    while it is running waits and receives the same value, or the same exception. Across
+    processes, callers of the same key are serialized with a lock file next to the metadata
+    store. Nothing is kept once the call returns; use the metadata store or `memo` to reuse
+    values afterwards.
+
+    :param key: A hashable key, e.g. ("entity", hubmap_id, instance).
+    :type key: tuple
+
+    :param function: A function without arguments that computes the value.
+    :type function: callable
+
+    :return: The value.
+
+    .. example::
+       >>> flight.once(("entity", hubmap_id, "prod"), lambda: fetch(hubmap_id))
+    """
+
+    with __lock:
+        flight = __flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = __Flight()
+            __flights[key] = flight
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    try:
+        flight.value = __call_locked(key, function)
+        return flight.value
+    except BaseException as error:
+        flight.error = error
+        raise
+    finally:
+        with __lock:
+            del __flights[key]
+        flight.done.set()
+
+
+def clear() -> None:
+    """
+    Remove the lock files left on disk by processes that were killed while holding them.
+    """
+
+    directory = __get_lock_directory()
+    if not directory.exists():
+        return
+
+    for file in directory.glob("*.lock"):
+        try:
+            file.unlink()
+        except OSError:
+            pass
+
+    try:
+        directory.rmdir()
+    except OSError:
+        pass
@@ -2,9 +2,8 @@ import datetime
 import math
 
 import pandas as pd
-import requests
 
-from . import apis, uuids
+from . import apis, client, uuids
 
 
 def __prepare_dataframe(hubmap_id, data, instance="prod", token=None):
@@ -49,7 +48,7 @@ def __get_globus_link(dataset_uuid, path):
 
 
 def __check_globus_link(url):
-    response = requests.request("HEAD", url)
+    response = client.request("HEAD", url)
     return response
 
 
@@ -0,0 +1,141 @@
+import threading
+from contextlib import contextmanager
+
+import hubmapinventory
+import pandas as pd
+
+# columns of the inventory read by file.tsv, file_in_collection.tsv and
+# file_describes_collection.tsv; every other column is dropped once loaded
+COLUMNS = [
+    "file_uuid",
+    "filename",
+    "relative_path",
+    "modification_time",
+    "size",
+    "sha256",
+    "md5",
+    "file_format",
+    "mime_type",
+]
+
+__lock = threading.Lock()
+__shared = {}
+
+
+class __Inventory:
+    """
+    The inventory of a dataset shared by the manifest builders of a bag.
+    """
+
+    def __init__(self, columns: list):
+        self.lock = threading.Lock()
+        self.columns = columns
+        self.df = None
+
+
+def __load(
+    hubmap_id: str, token: str, inventory_directory: str, columns: list
+) -> pd.DataFrame:
+    """
+    Helper method that loads the inventory of a dataset and keeps the given columns.
+    """
+
+    df = hubmapinventory.get(
+        hubmap_id=hubmap_id, token=token, inventory_directory=inventory_directory
+    )
+
+    if columns is not None:
+        df = df[[column for column in columns if column in df.columns]]
+
+    return df
+
+
+def get(
+    hubmap_id: str,
+    token: str,
+    inventory_directory: str,
+    columns: list = COLUMNS,
+) -> pd.DataFrame:
+    """
+    Return the inventory of a dataset.
+
+    Inside a `shared` block for the dataset, the inventory is loaded once and every caller,
+    from any thread, receives a view of the same frame. Outside of it, the inventory is
+    loaded on every call.
+
+    :param hubmap_id: The HuBMAP ID of the dataset.
+    :type hubmap_id: str
+
+    :param token: Authentication token.
+    :type token: str
+
+    :param inventory_directory: Directory of the dataset inventories.
+    :type inventory_directory: str
+
+    :param columns: Columns to keep, or None to keep every column. Ignored inside a `shared` block. Default is `COLUMNS`.
+    :type columns: list, optional
+
+    :return: The inventory. Treat it as read-only: assign new columns instead of modifying values in place.
+    :rtype: pandas.DataFrame
+    """
+
+    key = (hubmap_id, inventory_directory)
+    with __lock:
+        inventory = __shared.get(key)
+
+    if inventory is None:
+        return __load(hubmap_id, token, inventory_directory, columns)
+
+    with inventory.lock:
+        if inventory.df is None:
+            inventory.df = __load(
+                hubmap_id, token, inventory_directory, inventory.columns
+            )
+
+    # a shallow copy shares the data, but columns added or replaced by the
+    # caller do not leak into the frames of the other builders
+    return inventory.df.copy(deep=False)
+
+
+@contextmanager
+def shared(hubmap_id: str, inventory_directory: str, columns: list = COLUMNS):
+    """
+    Share the inventory of a dataset between the manifest builders of a bag.
+
+    The inventory is loaded by the first call to `get` inside the `with` block and
+    released when the block ends.
+
+    :param hubmap_id: The HuBMAP ID of the dataset.
+    :type hubmap_id: str
+
+    :param inventory_directory: Directory of the dataset inventories.
+    :type inventory_directory: str
+
+    :param columns: Columns to keep, or None to keep every column. Default is `COLUMNS`.
+    :type columns: list, optional
+
+    .. example::
+       >>> with inventories.shared(hubmap_id, inventory_directory):
+       ...     file.create_manifest(...)
+       ...     file_in_collection.create_manifest(...)
+    """
+
+    key = (hubmap_id, inventory_directory)
+    inventory = __Inventory(columns)
+
+    with __lock:
+        if key in __shared:
+            inventory = None
+        else:
+            __shared[key] = inventory
+
+    if inventory is None:
+        # an outer block already shares this inventory
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        with __lock:
+            del __shared[key]
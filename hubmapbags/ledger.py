@@ -0,0 +1,510 @@
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from . import database
+
+# location of the job ledger; kept apart from the metadata store so that cleaning the cache keeps it
+DATABASE = os.getenv("HUBMAPBAGS_LEDGER", ".hubmapbags/ledger.db")
+
+# seconds between heartbeats of a running job
+HEARTBEAT_INTERVAL = 60
+
+# seconds without a heartbeat after which a running job is considered dead
+STALE_AFTER = float(os.getenv("HUBMAPBAGS_LEDGER_STALE_AFTER", 10 * 60))
+
+COMPUTING = "computing"
+DONE = "done"
+BROKEN = "broken"
+
+# maximum number of bound parameters per bulk query
+__CHUNK_SIZE = 500
+
+__SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    hubmap_id TEXT PRIMARY KEY,
+    directory TEXT,
+    state TEXT NOT NULL,
+    pid INTEGER,
+    host TEXT,
+    heartbeat REAL,
+    started_at REAL,
+    finished_at REAL,
+    duration REAL,
+    bytes INTEGER,
+    reason TEXT,
+    last_modified_timestamp INTEGER,
+    inventory_fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+"""
+
+# columns added after the first version of the ledger, with their types; ledgers created
+# before them are migrated when opened
+__ADDED_COLUMNS = {
+    "last_modified_timestamp": "INTEGER",
+    "inventory_fingerprint": "TEXT",
+}
+
+__COLUMNS = [
+    "hubmap_id",
+    "directory",
+    "state",
+    "pid",
+    "host",
+    "heartbeat",
+    "started_at",
+    "finished_at",
+    "duration",
+    "bytes",
+    "reason",
+    "last_modified_timestamp",
+    "inventory_fingerprint",
+]
+
+
+__lock = threading.Lock()
+__migrated = set()
+
+
+def __migrate(conn) -> None:
+    """
+    Helper method that adds the columns missing from a ledger created by an older version.
+    """
+
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in __ADDED_COLUMNS.items():
+            if column not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+
+def __connect():
+    """
+    Helper method that opens the job ledger and creates or migrates the schema if needed.
+    """
+
+    conn = database.connect(DATABASE, schema=__SCHEMA)
+
+    key = (os.getpid(), os.path.abspath(DATABASE))
+    if key not in __migrated:
+        with __lock:
+            if key not in __migrated:
+                __migrate(conn)
+                __migrated.add(key)
+
+    return conn
+
+
+def __is_alive(pid: int) -> bool:
+    """
+    Helper method that checks whether a process of this host is running.
+    """
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
+def is_stale(job: dict) -> bool:
+    """
+    Check whether a running job was abandoned.
+
+    A job is stale if its process is gone from this host or if it missed its heartbeats
+    for longer than `STALE_AFTER` seconds.
+
+    :param job: A job, as returned by `get_job`.
+    :type job: dict
+
+    :return: True if the job is marked as computing but nothing is computing it.
+    :rtype: bool
+    """
+
+    if job is None or job["state"] != COMPUTING:
+        return False
+
+    if job["host"] == socket.gethostname() and not __is_alive(int(job["pid"])):
+        return True
+
+    return time.time() - job["heartbeat"] > STALE_AFTER
+
+
+def get_job(hubmap_id: str) -> dict:
+    """
+    Return the ledger entry of a dataset.
+
+    :param hubmap_id: The HuBMAP ID of the dataset.
+    :type hubmap_id: str
+
+    :return: A dictionary with the columns of the ledger, or None if the dataset was never claimed.
+    :rtype: dict
+    """
+
+    row = (
+        __connect()
+        .execute(
+            f"SELECT {', '.join(__COLUMNS)} FROM jobs WHERE hubmap_id = ?",
+            (hubmap_id,),
+        )
+        .fetchone()
+    )
+
+    if row is None:
+        return None
+
+    return dict(zip(__COLUMNS, row))
+
+
+def is_done(hubmap_id: str) -> bool:
+    """
+    Check whether a dataset was completed.
+
+    :param hubmap_id: The HuBMAP ID of the dataset.
+    :type hubmap_id: str
+
+    :rtype: bool
+    """
+
+    job = get_job(hubmap_id)
+    return job is not None and job["state"] == DONE
+
+
+def claim(
+    hubmap_id: str, directory: str = None, overwrite: bool = False, reason: str = None
+) -> bool:
+    """
+    Claim a dataset for the calling process.
+
+    The claim succeeds if the dataset was never claimed, if its previous run failed or was
+    abandoned (see `is_stale`), or if it is done and `overwrite` is True. Claims are made in
+    an exclusive transaction, so concurrent workers never claim the same dataset.
+
+    :param hubmap_id: The HuBMAP ID of the dataset.
+    :type hubmap_id: str
+
+    :param directory: The data directory of the dataset.
+    :type directory: str, optional
+
+    :param overwrite: If True, claim datasets that are already done. Default is False.
+    :type overwrite: bool, optional
+
+    :param reason: Why the dataset is (re)built, e.g. as returned by `get_changes`.
+    :type reason: str, optional
+
+    :return: True if the dataset was claimed, False if it is done or another process is computing it.
+    :rtype: bool
+    """
+
+    conn = __connect()
+    now = time.time()
+
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            f"SELECT {', '.join(__COLUMNS)} FROM jobs WHERE hubmap_id = ?",
+            (hubmap_id,),
+        ).fetchone()
+
+        if row is not None:
+            job = dict(zip(__COLUMNS, row))
+            if job["state"] == DONE and not overwrite:
+                return False
+            if job["state"] == COMPUTING:
+                if not is_stale(job):
+                    return False
+                print(
+                    f"Taking over stale job of {hubmap_id} (pid {job['pid']} on {job['host']})."
+                )
+
+        conn.execute(
+            "INSERT OR REPLACE INTO jobs "
+            "(hubmap_id, directory, state, pid, host, heartbeat, started_at, reason, "
+            "last_modified_timestamp, inventory_fingerprint) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                hubmap_id,
+                directory,
+                COMPUTING,
+                os.getpid(),
+                socket.gethostname(),
+                now,
+                now,
+                reason,
+                job.get("last_modified_timestamp") if row is not None else None,
+                job.get("inventory_fingerprint") if row is not None else None,
+            ),
+        )
+
+    return True
+
+
+def heartbeat(hubmap_id: str) -> None:
+    """
+    Record that the job of a dataset is still running.
+
+    :param hubmap_id: The HuBMAP ID of the dataset.
+    :type hubmap_id: str
+    """
+
+    conn = __connect()
+    conn.execute(
+        "UPDATE jobs SET heartbeat = ? WHERE hubmap_id = ? AND state = ? AND pid = ?",
+        (time.time(), hubmap_id, COMPUTING, os.getpid()),
+    )
+
+
+def __close(
+    hubmap_id: str, state: str, number_of_bytes: int = None, reason: str = None
+):
+    """
+    Helper method that ends the job of a dataset. The reason given at claim time is kept unless a new one is given.
+    """
+
+    conn = __connect()
+    now = time.time()
+    conn.execute(
+        "UPDATE jobs SET state = ?, finished_at = ?, duration = ? - started_at, "
+        "heartbeat = ?, bytes = ?, reason = COALESCE(?, reason) WHERE hubmap_id = ?",
+        (state, now, now, now, number_of_bytes, reason, hubmap_id),
+    )
+
+
+def finish(
+    hubmap_id: str,
+    number_of_bytes: int = None,
+    last_modified_timestamp: int = None,
+    inventory_fingerprint: str = None,
+) -> None:
+    """
+    Mark the job of a dataset as done.
+
+    :param hubmap_id: The HuBMAP ID of the dataset.
+    :type hubmap_id: str
+
+    :param number_of_bytes: Number of bytes processed.
+    :type number_of_bytes: int, optional
+
+    :param last_modified_timestamp: Last modified timestamp of the dataset metadata that was built.
+    :type last_modified_timestamp: int, optional
+
+    :param inventory_fingerprint: Fingerprint of the dataset inventory that was built.
+    :type inventory_fingerprint: str, optional
+    """
+
+    __close(hubmap_id, DONE, number_of_bytes=number_of_bytes)
+
+    conn = __connect()
+    conn.execute(
+        "UPDATE jobs SET last_modified_timestamp = ?, inventory_fingerprint = ? "
+        "WHERE hubmap_id = ?",
+        (last_modified_timestamp, inventory_fingerprint, hubmap_id),
+    )
+
+
+def fail(hubmap_id: str, reason: str) -> None:
+    """
+    Mark the job of a dataset as broken.
+
+    :param hubmap_id: The HuBMAP ID of the dataset.
+    :type hubmap_id: str
+
+    :param reason: Why the job failed.
+    :type reason: str
+    """
+
+    __close(hubmap_id, BROKEN, reason=reason)
+
+
+@contextmanager
+def running(hubmap_id: str):
+    """
+    Run the claimed job of a dataset.
+
+    A background thread sends heartbeats while the `with` block runs. The job is marked as
+    done when the block completes and as broken, with the exception as reason, when it raises.
+    The number of bytes processed and the fingerprints of what was built can be reported by
+    setting "bytes", "last_modified_timestamp" and "inventory_fingerprint" in the yielded dictionary.
+
+    :param hubmap_id: The HuBMAP ID of a dataset claimed with `claim`.
+    :type hubmap_id: str
+
+    .. example::
+       >>> if ledger.claim(hubmap_id):
+       ...     with ledger.running(hubmap_id) as job:
+       ...         job["bytes"] = build(hubmap_id)
+    """
+
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            heartbeat(hubmap_id)
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+
+    job = {
+        "bytes": None,
+        "last_modified_timestamp": None,
+        "inventory_fingerprint": None,
+    }
+    try:
+        yield job
+    except BaseException as e:
+        stop.set()
+        thread.join()
+        fail(hubmap_id, reason=repr(e))
+        raise
+
+    stop.set()
+    thread.join()
+    finish(
+        hubmap_id,
+        number_of_bytes=job["bytes"],
+        last_modified_timestamp=job["last_modified_timestamp"],
+        inventory_fingerprint=job["inventory_fingerprint"],
+    )
+
+
+def reset(hubmap_id: str) -> None:
+    """
+    Remove a dataset from the ledger.
+
+    :param hubmap_id: The HuBMAP ID of the dataset.
+    :type hubmap_id: str
+    """
+
+    conn = __connect()
+    conn.execute("DELETE FROM jobs WHERE hubmap_id = ?", (hubmap_id,))
+
+
+def get_jobs(state: str = None) -> pd.DataFrame:
+    """
+    Return the ledger.
+
+    :param state: If given, only return jobs in this state ("computing", "done" or "broken").
+    :type state: str, optional
+
+    :return: A DataFrame with one row per dataset.
+    :rtype: pandas.DataFrame
+    """
+
+    query = f"SELECT {', '.join(__COLUMNS)} FROM jobs"
+    params = []
+    if state is not None:
+        query = query + " WHERE state = ?"
+        params.append(state)
+
+    rows = __connect().execute(query + " ORDER BY hubmap_id", params).fetchall()
+    return pd.DataFrame(rows, columns=__COLUMNS)
+
+
+def remaining(hubmap_ids: list) -> list:
+    """
+    Return the datasets that are not done.
+
+    :param hubmap_ids: List of HuBMAP IDs.
+    :type hubmap_ids: list
+
+    :return: The HuBMAP IDs of `hubmap_ids` that are not done, in the same order.
+    :rtype: list
+
+    .. example::
+       >>> ledger.remaining(["HBM123.ABCD.456", "HBM789.EFGH.012"])
+       ['HBM789.EFGH.012']
+    """
+
+    conn = __connect()
+    unique = list(dict.fromkeys(hubmap_ids))
+
+    done = set()
+    for i in range(0, len(unique), __CHUNK_SIZE):
+        chunk = unique[i : i + __CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        rows = conn.execute(
+            f"SELECT hubmap_id FROM jobs WHERE state = ? AND hubmap_id IN ({placeholders})",
+            [DONE] + chunk,
+        )
+        done.update(row[0] for row in rows)
+
+    return [hubmap_id for hubmap_id in hubmap_ids if hubmap_id not in done]
+
+
+def get_changes(fingerprints: dict) -> dict:
+    """
+    Compare datasets with what the ledger recorded when they were last built.
+
+    :param fingerprints: A dictionary keyed by HuBMAP ID of (last_modified_timestamp, inventory_fingerprint) tuples.
+    :type fingerprints: dict
+
+    :return: A dictionary keyed by HuBMAP ID with the reason to rebuild each dataset that is new, failed,
+             was abandoned, changed or has no last modified timestamp. Datasets that are up to date or
+             being built are left out.
+    :rtype: dict
+
+    .. example::
+       >>> ledger.get_changes({"HBM123.ABCD.456": (1700000000000, "9f86d081")})
+       {'HBM123.ABCD.456': 'metadata changed'}
+    """
+
+    conn = __connect()
+    hubmap_ids = list(fingerprints.keys())
+
+    jobs = {}
+    for i in range(0, len(hubmap_ids), __CHUNK_SIZE):
+        chunk = hubmap_ids[i : i + __CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        rows = conn.execute(
+            f"SELECT {', '.join(__COLUMNS)} FROM jobs WHERE hubmap_id IN ({placeholders})",
+            chunk,
+        )
+        for row in rows:
+            jobs[row[0]] = dict(zip(__COLUMNS, row))
+
+    changes = {}
+    for hubmap_id, fingerprint in fingerprints.items():
+        last_modified_timestamp, inventory_fingerprint = fingerprint
+        job = jobs.get(hubmap_id)
+        if job is None:
+            changes[hubmap_id] = "new"
+        elif job["state"] == BROKEN:
+            changes[hubmap_id] = "failed previously"
+        elif job["state"] == COMPUTING:
+            if is_stale(job):
+                changes[hubmap_id] = "abandoned"
+        elif job["inventory_fingerprint"] != inventory_fingerprint:
+            changes[hubmap_id] = "files changed"
+        elif last_modified_timestamp is None:
+            # without a timestamp a change cannot be ruled out
+            changes[hubmap_id] = "metadata unknown"
+        elif job["last_modified_timestamp"] != last_modified_timestamp:
+            changes[hubmap_id] = "metadata changed"
+
+    return changes
+
+
+def release_stale() -> list:
+    """
+    Mark abandoned running jobs as broken.
+
+    :return: The HuBMAP IDs of the jobs released.
+    :rtype: list
+    """
+
+    released = []
+    for job in get_jobs(state=COMPUTING).to_dict("records"):
+        if is_stale(job):
+            fail(job["hubmap_id"], reason="stale lock")
+            released.append(job["hubmap_id"])
+
+    return released
@@ -0,0 +1,410 @@
+from . import apis, cache, database
+
+__SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    instance TEXT NOT NULL,
+    uuid TEXT NOT NULL,
+    hubmap_id TEXT,
+    entity_type TEXT,
+    PRIMARY KEY (instance, uuid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entities_hubmap_id ON entities (instance, hubmap_id);
+CREATE TABLE IF NOT EXISTS edges (
+    instance TEXT NOT NULL,
+    child_uuid TEXT NOT NULL,
+    relation TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    parent_uuid TEXT NOT NULL,
+    PRIMARY KEY (instance, child_uuid, relation, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS edges_parent ON edges (instance, relation, parent_uuid);
+"""
+
+# relations between an entity and its ancestors
+DIRECT_ANCESTOR = "direct_ancestor"
+FIRST_SAMPLE = "first_sample"
+DONOR = "donor"
+
+
+def __connect():
+    """
+    Helper method that opens the lineage graph, stored next to the metadata, and creates the schema if needed.
+    """
+
+    return database.connect(cache.DATABASE, schema=__SCHEMA)
+
+
+def __first(value):
+    """
+    Helper method that returns the first element of a provenance field, which may be a list.
+    """
+
+    if isinstance(value, list):
+        return value[0] if value else None
+
+    return value
+
+
+def __save(entities: list, edges: list, replace: list) -> None:
+    """
+    Helper method that saves entities and edges in a single transaction.
+
+    The edges of every (instance, child_uuid, relation) in `replace` are removed first.
+    """
+
+    conn = __connect()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "DELETE FROM edges WHERE instance = ? AND child_uuid = ? AND relation = ?",
+            replace,
+        )
+        conn.executemany(
+            "INSERT INTO entities (instance, uuid, hubmap_id, entity_type) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (instance, uuid) DO UPDATE SET "
+            "hubmap_id = COALESCE(excluded.hubmap_id, hubmap_id), "
+            "entity_type = COALESCE(excluded.entity_type, entity_type)",
+            entities,
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO edges "
+            "(instance, child_uuid, relation, position, parent_uuid) VALUES (?, ?, ?, ?, ?)",
+            edges,
+        )
+
+
+def __collect_entity(
+    document: dict, instance: str, entities: list, edges: list, replace: list
+):
+    """
+    Helper method that collects the entity and direct ancestors of an entity document.
+    """
+
+    uuid = document.get("uuid")
+    if uuid is None:
+        return
+
+    entities.append(
+        (instance, uuid, document.get("hubmap_id"), document.get("entity_type"))
+    )
+
+    # projected documents may carry ancestors without their uuid
+    ancestors = document.get("direct_ancestors")
+    if not isinstance(ancestors, list) or not all(
+        isinstance(ancestor, dict) and ancestor.get("uuid") for ancestor in ancestors
+    ):
+        return
+
+    replace.append((instance, uuid, DIRECT_ANCESTOR))
+    for position, ancestor in enumerate(ancestors):
+        entities.append(
+            (
+                instance,
+                ancestor["uuid"],
+                ancestor.get("hubmap_id"),
+                ancestor.get("entity_type"),
+            )
+        )
+        edges.append((instance, uuid, DIRECT_ANCESTOR, position, ancestor["uuid"]))
+
+
+def __collect_provenance(
+    uuid: str, provenance: dict, instance: str, entities: list, edges: list
+):
+    """
+    Helper method that collects the donor and first sample of a provenance record.
+    """
+
+    for relation, entity_type in [(DONOR, "Donor"), (FIRST_SAMPLE, "Sample")]:
+        parent_uuid = __first(provenance.get(f"{relation}_uuid"))
+        if parent_uuid is None:
+            continue
+        entities.append(
+            (
+                instance,
+                parent_uuid,
+                __first(provenance.get(f"{relation}_hubmap_id")),
+                entity_type,
+            )
+        )
+        edges.append((instance, uuid, relation, 0, parent_uuid))
+
+
+def record_entity(document: dict, instance: str = "prod") -> None:
+    """
+    Add an entity document, and the edges to its direct ancestors, to the lineage graph.
+
+    :param document: An entity document from the entity or search API.
+    :type document: dict
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+    """
+
+    record_many(entities=[document], instance=instance)
+
+
+def record_provenance(
+    hubmap_id: str, provenance: dict, instance: str = "prod"
+) -> None:
+    """
+    Add the donor and first sample of a dataset provenance record to the lineage graph.
+
+    :param hubmap_id: The HuBMAP ID or UUID of the dataset.
+    :type hubmap_id: str
+
+    :param provenance: The provenance record of the dataset.
+    :type provenance: dict
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+    """
+
+    record_many(provenance={hubmap_id: provenance}, instance=instance)
+
+
+def record_many(
+    entities: list = None, provenance: dict = None, instance: str = "prod"
+) -> None:
+    """
+    Add many entity documents and provenance records to the lineage graph in a single transaction.
+
+    :param entities: Entity documents from the entity or search API.
+    :type entities: list, optional
+
+    :param provenance: Provenance records keyed by the HuBMAP ID or UUID of their dataset.
+    :type provenance: dict, optional
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+    """
+
+    if entities is None:
+        entities = []
+    if provenance is None:
+        provenance = {}
+
+    entity_rows = []
+    edges = []
+    replace = []
+
+    ids = {}
+    for document in entities:
+        if not isinstance(document, dict):
+            continue
+        __collect_entity(document, instance, entity_rows, edges, replace)
+        if document.get("uuid") is not None:
+            ids[document["uuid"]] = document["uuid"]
+            if document.get("hubmap_id") is not None:
+                ids[document["hubmap_id"]] = document["uuid"]
+
+    for hubmap_id, record in provenance.items():
+        if not isinstance(record, dict):
+            continue
+        uuid = (
+            record.get("dataset_uuid")
+            or ids.get(hubmap_id)
+            or resolve(hubmap_id, instance)
+        )
+        if uuid is None:
+            continue
+        if record.get("dataset_hubmap_id") is not None:
+            entity_rows.append(
+                (instance, uuid, record["dataset_hubmap_id"], "Dataset")
+            )
+        __collect_provenance(uuid, record, instance, entity_rows, edges)
+
+    if entity_rows or edges:
+        __save(entity_rows, edges, replace)
+
+
+def record(kind: str, hubmap_id: str, payload, instance: str = "prod") -> None:
+    """
+    Add an API response of the given kind to the lineage graph.
+
+    :param kind: The kind of payload, as in the metadata store (e.g. "entity", "provenance").
+    :type kind: str
+
+    :param hubmap_id: The HuBMAP ID or UUID the payload belongs to.
+    :type hubmap_id: str
+
+    :param payload: The API response.
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+    """
+
+    if kind == "entity":
+        record_many(entities=[payload], instance=instance)
+    elif kind == "provenance":
+        record_many(provenance={hubmap_id: payload}, instance=instance)
+
+
+def resolve(hubmap_id: str, instance: str = "prod") -> str:
+    """
+    Return the UUID of an entity in the lineage graph.
+
+    :param hubmap_id: The HuBMAP ID or UUID of the entity.
+    :type hubmap_id: str
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+
+    :return: The UUID, or None if the entity is not in the graph.
+    :rtype: str
+    """
+
+    conn = __connect()
+    row = conn.execute(
+        "SELECT uuid FROM entities WHERE instance = ? AND uuid = ?",
+        (instance, hubmap_id),
+    ).fetchone()
+    if row is None:
+        row = conn.execute(
+            "SELECT uuid FROM entities WHERE instance = ? AND hubmap_id = ?",
+            (instance, hubmap_id),
+        ).fetchone()
+
+    if row is None:
+        return None
+
+    return row[0]
+
+
+def __get_parent(hubmap_id: str, relation: str, instance: str) -> dict:
+    """
+    Helper method that returns the first parent of an entity through the given relation.
+    """
+
+    uuid = resolve(hubmap_id, instance)
+    if uuid is None:
+        return None
+
+    row = (
+        __connect()
+        .execute(
+            "SELECT e.uuid, e.hubmap_id, e.entity_type FROM edges AS r "
+            "JOIN entities AS e ON e.instance = r.instance AND e.uuid = r.parent_uuid "
+            "WHERE r.instance = ? AND r.child_uuid = ? AND r.relation = ? "
+            "ORDER BY r.position LIMIT 1",
+            (instance, uuid, relation),
+        )
+        .fetchone()
+    )
+
+    if row is None:
+        return None
+
+    return {"uuid": row[0], "hubmap_id": row[1], "entity_type": row[2]}
+
+
+def donor_of(hubmap_id: str, token: str = None, instance: str = "prod") -> dict:
+    """
+    Return the donor of a dataset.
+
+    The donor is read from the lineage graph. If the dataset is not in the graph and a token
+    is given, its provenance is retrieved once and added to the graph.
+
+    :param hubmap_id: The HuBMAP ID or UUID of the dataset.
+    :type hubmap_id: str
+
+    :param token: Authentication token to access the HuBMAP APIs. If None, only the graph is used.
+    :type token: str, optional
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+
+    :return: A dictionary with the uuid, hubmap_id and entity_type of the donor, or None if it is unknown.
+    :rtype: dict
+
+    .. example::
+       >>> lineage.donor_of("HBM123.ABCD.456")
+       {'uuid': '...', 'hubmap_id': 'HBM789.EFGH.012', 'entity_type': 'Donor'}
+    """
+
+    donor = __get_parent(hubmap_id, DONOR, instance)
+    if donor is None and token is not None:
+        provenance = apis.get_provenance_info(
+            hubmap_id, token=token, instance=instance
+        )
+        if provenance is not None:
+            record_provenance(hubmap_id, provenance, instance=instance)
+            donor = __get_parent(hubmap_id, DONOR, instance)
+
+    return donor
+
+
+def first_sample(hubmap_id: str, token: str = None, instance: str = "prod") -> dict:
+    """
+    Return the first sample of a dataset.
+
+    The sample is read from the lineage graph, following direct ancestors through derived
+    datasets when needed. If the dataset is not in the graph and a token is given, its
+    provenance is retrieved once and added to the graph.
+
+    :param hubmap_id: The HuBMAP ID or UUID of the dataset.
+    :type hubmap_id: str
+
+    :param token: Authentication token to access the HuBMAP APIs. If None, only the graph is used.
+    :type token: str, optional
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+
+    :return: A dictionary with the uuid, hubmap_id and entity_type of the sample, or None if it is unknown.
+    :rtype: dict
+    """
+
+    sample = __get_parent(hubmap_id, FIRST_SAMPLE, instance)
+    if sample is not None:
+        return sample
+
+    seen = set()
+    entity = __get_parent(hubmap_id, DIRECT_ANCESTOR, instance)
+    while entity is not None and entity["uuid"] not in seen:
+        if entity["entity_type"] == "Sample":
+            return entity
+        seen.add(entity["uuid"])
+        entity = __get_parent(entity["uuid"], DIRECT_ANCESTOR, instance)
+
+    if token is not None:
+        provenance = apis.get_provenance_info(
+            hubmap_id, token=token, instance=instance
+        )
+        if provenance is not None:
+            record_provenance(hubmap_id, provenance, instance=instance)
+            return __get_parent(hubmap_id, FIRST_SAMPLE, instance)
+
+    return None
+
+
+def datasets_of(hubmap_id: str, instance: str = "prod") -> list:
+    """
+    Return the datasets of a donor known to the lineage graph.
+
+    :param hubmap_id: The HuBMAP ID or UUID of the donor.
+    :type hubmap_id: str
+
+    :param instance: Instance of the HuBMAP service. Default is "prod".
+    :type instance: str, optional
+
+    :return: A list of dictionaries with the uuid and hubmap_id of each dataset.
+    :rtype: list
+
+    .. note::
+       - Run `apis.sync_catalog` first to have every dataset in the graph.
+    """
+
+    uuid = resolve(hubmap_id, instance)
+    if uuid is None:
+        return []
+
+    rows = __connect().execute(
+        "SELECT e.uuid, e.hubmap_id FROM edges AS r "
+        "JOIN entities AS e ON e.instance = r.instance AND e.uuid = r.child_uuid "
+        "WHERE r.instance = ? AND r.relation = ? AND r.parent_uuid = ? "
+        "ORDER BY e.hubmap_id",
+        (instance, DONOR, uuid),
+    )
+
+    return [{"uuid": row[0], "hubmap_id": row[1]} for row in rows]
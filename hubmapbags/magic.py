@@ -7,68 +7,70 @@ from uuid import uuid4
 import traceback
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+import hashlib
+from tabulate import tabulate
 from shutil import rmtree, move, copytree
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
 from . import (
-    analysis_type,
-    anatomy,
     apis,
-    assay_type,
     biosample,
-    biosample_disease,
     biosample_from_subject,
-    biosample_gene,
     biosample_in_collection,
-    biosample_substance,
     collection,
-    collection_anatomy,
-    collection_compound,
     collection_defined_by_project,
-    collection_disease,
-    collection_gene,
-    collection_in_collection,
-    collection_phenotype,
-    collection_protein,
-    collection_substance,
-    collection_taxonomy,
-    compound,
-    dcc,
-    biofluid,
-    collection_biofluid,
-    disease,
+    dag,
 )
 from . import file as files
-from . import data_type as data_type_file
 from . import (
-    file_describes_biosample,
     file_describes_collection,
-    file_describes_subject,
-    file_format,
     file_in_collection,
-    gene,
+    inventories,
     reports,
-    id_namespace,
-    ncbi_taxonomy,
-    phenotype,
-    phenotype_disease,
-    phenotype_gene,
+    ledger,
+    lineage,
+    memo,
     project_in_project,
     project,
-    protein,
-    protein_gene,
+    static_tables,
     subject,
-    subject_disease,
     subject_in_collection,
-    subject_phenotype,
-    subject_race,
-    subject_role_taxonomy,
-    subject_substance,
-    substance,
     utilities,
 )
 
+# properties of the entities read while building a submission; lookups ask the
+# APIs for these fields only instead of the full entity documents
+DATASET_FIELDS = [
+    "uuid",
+    "hubmap_id",
+    "status",
+    "data_types",
+    "dataset_type",
+    "group_name",
+    "group_uuid",
+    "contains_human_genetic_sequences",
+    "direct_ancestors.uuid",
+    "direct_ancestors.hubmap_id",
+    "direct_ancestors.entity_type",
+    "published_timestamp",
+    "registered_doi",
+    "title",
+    "description",
+]
+
+ENTITY_FIELDS = [
+    "uuid",
+    "hubmap_id",
+    "registered_doi",
+    "published_timestamp",
+    "description",
+]
+
+DONOR_FIELDS = ["uuid", "hubmap_id", "registered_doi", "metadata"]
+
 
 def _convert_to_datetime(stamp):
     try:
@@ -125,7 +127,9 @@ def __extract_dataset_info_from_db(
 
     """
 
-    j = apis.get_dataset_info(hubmap_id, token=token, instance=instance)
+    j = apis.get_dataset_info(
+        hubmap_id, token=token, instance=instance, fields=DATASET_FIELDS
+    )
     if j is None:
         warnings.warn("Unable to extract data from database.")
         return None
@@ -140,8 +144,11 @@ def __extract_dataset_info_from_db(
 
     group_name = j.get("group_name")
     group_uuid = j.get("group_uuid")
-    first_sample_id = j.get("direct_ancestors")[0].get("hubmap_id")
-    first_sample_uuid = j.get("direct_ancestors")[0].get("uuid")
+    sample = lineage.first_sample(hubmap_id, token=token, instance=instance)
+    if sample is None:
+        sample = j.get("direct_ancestors")[0]
+    first_sample_id = sample.get("hubmap_id")
+    first_sample_uuid = sample.get("uuid")
 
     if j.get("contains_human_genetic_sequences") == False:
         is_protected = False
@@ -152,8 +159,9 @@ def __extract_dataset_info_from_db(
     organ_type = j.get("organ_type")[0]
     organ_hmid = j.get("organ_hubmap_id")[0]
     organ_uuid = j.get("organ_uuid")[0]
-    donor_hmid = j.get("donor_hubmap_id")[0]
-    donor_uuid = j.get("donor_uuid")[0]
+    donor = lineage.donor_of(hubmap_id, token=token, instance=instance)
+    donor_hmid = donor["hubmap_id"]
+    donor_uuid = donor["uuid"]
 
     if is_protected:
         full_path = os.path.join("/hive/hubmap/data/protected", group_name, hmuuid)
@@ -330,7 +338,9 @@ def __get_donor_url(donor_id: str, token: str, instance: str = "prod") -> str:
     >>> url = __get_donor_url(donor_id, token)
     """
 
-    metadata = apis.get_entity_info(donor_id, instance=instance, token=token)
+    metadata = apis.get_entity_info(
+        donor_id, instance=instance, token=token, fields=DONOR_FIELDS
+    )
     url = f'https://portal.hubmapconsortium.org/browse/donor/{metadata["uuid"]}'
 
     return url
@@ -372,7 +382,9 @@ def __get_sample_url(sample_id: str, token: str, instance: str = "prod") -> str:
 
     """
 
-    metadata = apis.get_entity_info(sample_id, instance=instance, token=token)
+    metadata = apis.get_entity_info(
+        sample_id, instance=instance, token=token, fields=ENTITY_FIELDS
+    )
 
     if "registered_doi" in metadata.keys():
         return f'https://doi.org/{metadata["registered_doi"]}'
@@ -416,7 +428,9 @@ def __get_dataset_url(dataset_id: str, token: str, instance: str = "prod") -> st
 
     """
 
-    metadata = apis.get_entity_info(dataset_id, instance=instance, token=token)
+    metadata = apis.get_entity_info(
+        dataset_id, instance=instance, token=token, fields=DATASET_FIELDS
+    )
 
     if "registered_doi" in metadata.keys():
         return f'https://doi.org/{metadata["registered_doi"]}'
@@ -433,7 +447,8 @@ def __get_donor_metadata(hubmap_id: str, token: str, instance: str = "prod") ->
     persistent ID (URL), granularity, creation time, age at enrollment, sex, race,
     and ethnicity.
 
-    :param hubmap_id: The HubMap ID of the donor for which to retrieve metadata.
+    :param hubmap_id: The HubMap ID of a dataset of the donor. The donor is resolved
+                      through the lineage graph.
     :type hubmap_id: str
 
     :param token: Authentication token for accessing donor metadata.
@@ -454,12 +469,15 @@ def __get_donor_metadata(hubmap_id: str, token: str, instance: str = "prod") ->
     >>> metadata = __get_donor_metadata(hubmap_id, token)
     """
 
-    metadata = apis.get_donor_info(hubmap_id, instance=instance, token=token)
+    donor = lineage.donor_of(hubmap_id, token=token, instance=instance)
+    metadata = apis.get_entity_info(
+        donor["hubmap_id"], instance=instance, token=token, fields=DONOR_FIELDS
+    )
     donor_metadata = {}
     donor_metadata["local_id"] = metadata["hubmap_id"]
     donor_metadata["local_uuid"] = metadata["uuid"]
     donor_metadata["persistent_id"] = __get_donor_url(
-        hubmap_id, instance=instance, token=token
+        donor["hubmap_id"], instance=instance, token=token
     )
     donor_metadata["granularity"] = "cfde_subject_granularity:0"
     donor_metadata["creation_time"] = None
@@ -568,7 +586,9 @@ def __get_dataset_metadata(hubmap_id: str, token: str, instance: str = "prod") -
     >>> metadata = __get_dataset_metadata(hubmap_id, token)
     """
 
-    metadata = apis.get_dataset_info(hubmap_id, instance=instance, token=token)
+    metadata = apis.get_dataset_info(
+        hubmap_id, instance=instance, token=token, fields=DATASET_FIELDS
+    )
     dataset_metadata = {}
     dataset_metadata["local_id"] = hubmap_id
     dataset_metadata["local_uuid"] = metadata["uuid"]
@@ -628,7 +648,9 @@ def __get_biosample_metadata(
 
     """
 
-    metadata = apis.get_entity_info(hubmap_id, instance=instance, token=token)
+    metadata = apis.get_entity_info(
+        hubmap_id, instance=instance, token=token, fields=ENTITY_FIELDS
+    )
     biosample_metadata = {}
     biosample_metadata["local_id"] = hubmap_id
     biosample_metadata["project_local_id"] = metadata["uuid"]
@@ -642,7 +664,9 @@ def __get_biosample_metadata(
     return biosample_metadata
 
 
-def aggregate(directory: str, output_directory: str = "submission"):
+def aggregate(
+    directory: str, output_directory: str = "submission", static_directory: str = None
+):
     tsv_files = [
         "analysis_type.tsv",
         "anatomy.tsv",
@@ -700,6 +724,11 @@ def aggregate(directory: str, output_directory: str = "submission"):
         rmtree(output_directory)
     Path(output_directory).mkdir()
 
+    if static_directory is not None:
+        # the static tables are the same in every bag, so copy them once
+        static = static_tables.copy(static_directory, output_directory)
+        tsv_files = [tsv_file for tsv_file in tsv_files if tsv_file not in static]
+
     for tsv_file in tsv_files:
         df = pd.DataFrame()
         p = Path(directory).glob(f"**/{tsv_file}")
@@ -723,6 +752,11 @@ def do_it(
     backup_directory=None,
     inventory_directory="/hive/hubmap/bdbags/inventory",
     overwrite: bool = False,
+    reason: str = None,
+    static_directory: str = None,
+    link_static_tables: bool = True,
+    max_memory: int = None,
+    last_modified_timestamps: dict = None,
     debug: bool = True,
 ) -> bool:
     """
@@ -750,10 +784,32 @@ def do_it(
     :param overwrite: Whether to overwrite existing bags.
     :type overwrite: bool, optional
 
+    :param reason: If given, rebuild datasets that are done in the job ledger, recording this reason,
+                   without discarding precomputed checksums.
+    :type reason: str, optional
+
+    :param static_directory: If given, the tables that are the same in every bag are written once to this
+                             directory and hardlinked into the bag instead of being rebuilt for each dataset.
+    :type static_directory: str, optional
+
+    :param link_static_tables: If False, leave the tables of `static_directory` out of the bag; `aggregate`
+                               copies them into the submission. Ignored without `static_directory`.
+    :type link_static_tables: bool, optional
+
+    :param max_memory: If given, build file.tsv in chunks of inventory rows whose transformation
+                       takes roughly this many bytes instead of all at once. The inventory itself
+                       is still loaded whole.
+    :type max_memory: int, optional
+
+    :param last_modified_timestamps: Last modified timestamps keyed by HuBMAP ID, recorded in the job ledger.
+                                     If not given, they are read once from the daily report.
+    :type last_modified_timestamps: dict, optional
+
     :param debug: Whether to enable debugging information.
     :type debug: bool, optional
 
-    :return: True if the operation was successful, False otherwise.
+    :return: True if the operation was successful, None if a dataset was skipped because another
+             process is building it according to the job ledger, False otherwise.
     :rtype: bool
 
     :Example:
@@ -764,6 +820,55 @@ def do_it(
     >>> success = do_it(input_source, token)
     """
 
+    with memo.scope() as run:
+        answer = __do_it(
+            input,
+            token=token,
+            dbgap_study_id=dbgap_study_id,
+            instance=instance,
+            build_bags=build_bags,
+            backup_directory=backup_directory,
+            inventory_directory=inventory_directory,
+            overwrite=overwrite,
+            reason=reason,
+            static_directory=static_directory,
+            link_static_tables=link_static_tables,
+            max_memory=max_memory,
+            last_modified_timestamps=last_modified_timestamps,
+            debug=debug,
+        )
+
+    stats = run.stats()
+    message = (
+        f"Metadata lookups for {input}: {stats['hits']} memo hits, "
+        f"{stats['misses']} misses, {stats['network_calls']} network calls"
+    )
+    print(message)
+    logging.info(message)
+
+    return answer
+
+
+def __do_it(
+    input: str,
+    token: str,
+    dbgap_study_id: None,
+    instance: str = "prod",
+    build_bags: bool = False,
+    backup_directory=None,
+    inventory_directory="/hive/hubmap/bdbags/inventory",
+    overwrite: bool = False,
+    reason: str = None,
+    static_directory: str = None,
+    link_static_tables: bool = True,
+    max_memory: int = None,
+    last_modified_timestamps: dict = None,
+    debug: bool = True,
+) -> bool:
+    """
+    Helper method that processes and builds bags for datasets. See `do_it`.
+    """
+
     if not Path("logs").exists():
         Path("logs").mkdir()
 
@@ -782,6 +887,12 @@ def do_it(
     else:
         logging.info(f"Extracted dataset information from {input}")
 
+    if last_modified_timestamps is None:
+        last_modified_timestamps = __get_last_modified_timestamps()
+
+    # set when a dataset is claimed by another process, so it is neither done nor failed
+    skipped = False
+
     for index, dataset in datasets.iterrows():
         status = dataset["ds.status"].lower()
         data_type = (
@@ -864,9 +975,6 @@ def do_it(
 
         print(f"Building bag for dataset in {data_directory}")
         logging.info(f"Building bag for dataset in {data_directory}")
-        computing = data_directory.replace("/", "_").replace(" ", "_") + ".computing"
-        done = "." + data_directory.replace("/", "_").replace(" ", "_") + ".done"
-        broken = "." + data_directory.replace("/", "_").replace(" ", "_") + ".broken"
 
         # get donor information
         try:
@@ -905,244 +1013,321 @@ def do_it(
         if overwrite:
             print("Erasing old checkpoint. Re-computing checksums.")
             logging.info("Erasing old checkpoint. Re-computing checksums.")
-            if Path(done).exists():
-                try:
-                    Path(done).unlink()
-                except:
-                    logging.warning(f"Unable to remove file {done}.")
-                    return False
 
-        if Path(done).exists():
+        if not overwrite and reason is None and ledger.is_done(hubmap_id):
             print(
-                f"Checkpoint found. Avoiding computation. To re-compute erase file {done}"
+                f"Dataset {hubmap_id} is done according to the job ledger. Avoiding computation. To re-compute set overwrite to True"
             )
             logging.info(
-                f"Checkpoint found. Avoiding computation. To re-compute erase file {done}"
+                f"Dataset {hubmap_id} is done according to the job ledger. Avoiding computation. To re-compute set overwrite to True"
             )
-        elif Path(computing).exists():
+        elif not ledger.claim(
+            hubmap_id,
+            directory=data_directory,
+            overwrite=overwrite or reason is not None,
+            reason=reason,
+        ):
             logging.info(
-                "Computing checkpoint found. Avoiding computation since another process is building this bag."
+                "Job ledger shows another process is building this bag. Avoiding computation."
             )
             print(
-                "Computing checkpoint found. Avoiding computation since another process is building this bag."
+                "Job ledger shows another process is building this bag. Avoiding computation."
             )
+            skipped = True
         else:
-            with open(computing, "w") as file:
-                pass
-
-            print(f"Creating checkpoint {computing}")
-            logging.info(f"Creating checkpoint {computing}")
-
-            if build_bags:
-                logging.info(f"Checking if output directory exists")
-                print("Checking if output directory exists")
-                output_directory = f'{data_type}-{status}-{dataset["dataset_uuid"]}'
-
-                if Path(output_directory).exists() and Path(output_directory).is_dir():
-                    print("Output directory found. Removing old copy.")
-                    logging.info("Output directory found. Removing old copy.")
-                    rmtree(output_directory)
-                    print(f"Creating output directory {output_directory}")
-                    logging.info(f"Creating output directory {output_directory}")
-                    os.mkdir(output_directory)
-                else:
-                    print(
-                        f"Output directory {output_directory} does not exist. Creating directory."
-                    )
-                    logging.info(
-                        f"Output directory {output_directory} does not exist. Creating directory."
+            print(f"Claimed dataset {hubmap_id} in the job ledger")
+            logging.info(f"Claimed dataset {hubmap_id} in the job ledger")
+
+            with ledger.running(hubmap_id) as job:
+                # fingerprints of what is being built, compared by incremental runs
+                job["last_modified_timestamp"] = last_modified_timestamps.get(hubmap_id)
+                if job["last_modified_timestamp"] is None:
+                    logging.warning(
+                        f"Dataset {hubmap_id} has no last modified timestamp in the daily report. "
+                        "Incremental runs will rebuild it."
                     )
-                    os.mkdir(output_directory)
+                job["inventory_fingerprint"] = __get_inventory_fingerprint(
+                    hubmap_id, inventory_directory
+                )
 
-                print("Making file.tsv")
-                logging.info("Making file.tsv")
+                if build_bags:
+                    logging.info(f"Checking if output directory exists")
+                    print("Checking if output directory exists")
+                    output_directory = f'{data_type}-{status}-{dataset["dataset_uuid"]}'
 
-                if not Path(".data").exists():
-                    logging.info("Make directory .data/")
-                    Path(".data").mkdir()
+                    if (
+                        Path(output_directory).exists()
+                        and Path(output_directory).is_dir()
+                    ):
+                        print("Output directory found. Removing old copy.")
+                        logging.info("Output directory found. Removing old copy.")
+                        rmtree(output_directory)
+                        print(f"Creating output directory {output_directory}")
+                        logging.info(f"Creating output directory {output_directory}")
+                        os.mkdir(output_directory)
+                    else:
+                        print(
+                            f"Output directory {output_directory} does not exist. Creating directory."
+                        )
+                        logging.info(
+                            f"Output directory {output_directory} does not exist. Creating directory."
+                        )
+                        os.mkdir(output_directory)
+
+                    if not Path(".data").exists():
+                        logging.info("Make directory .data/")
+                        Path(".data").mkdir()
+
+                    temp_file = ".data/" + hubmap_uuid + ".tsv"
+                    logging.info("")
+
+                    if overwrite:
+                        print("Removing precomputed checksums")
+                        logging.info("Removing precomputed checksums")
+                        if Path(temp_file).exists():
+                            Path(temp_file).unlink()
+
+                    # steps that write the tables of the bag, keyed by table, with the
+                    # steps they depend on; independent steps run concurrently
+                    steps = {
+                        "inventory": (
+                            partial(
+                                inventories.get,
+                                hubmap_id,
+                                token=token,
+                                inventory_directory=inventory_directory,
+                            ),
+                            [],
+                        ),
+                        "file": (
+                            partial(
+                                files.create_manifest,
+                                project_id=data_provider,
+                                assay_type=data_type,
+                                directory=data_directory,
+                                inventory_directory=inventory_directory,
+                                output_directory=output_directory,
+                                dbgap_study_id=dbgap_study_id,
+                                token=token,
+                                dataset_hmid=hubmap_id,
+                                dataset_uuid=hubmap_uuid,
+                                max_memory=max_memory,
+                            ),
+                            ["inventory"],
+                        ),
+                        "biosample": (
+                            partial(
+                                biosample.create_manifest,
+                                biosample_id,
+                                biosample_url,
+                                data_provider,
+                                donor_metadata["organ_shortcode"],
+                                output_directory,
+                            ),
+                            [],
+                        ),
+                        "biosample_in_collection": (
+                            partial(
+                                biosample_in_collection.create_manifest,
+                                biosample_id,
+                                hubmap_id,
+                                output_directory,
+                            ),
+                            [],
+                        ),
+                        "project": (
+                            partial(project.create_manifest, data_provider, output_directory),
+                            [],
+                        ),
+                        "project_in_project": (
+                            partial(
+                                project_in_project.create_manifest,
+                                data_provider,
+                                output_directory,
+                            ),
+                            [],
+                        ),
+                        "biosample_from_subject": (
+                            partial(
+                                biosample_from_subject.create_manifest,
+                                biosample_id,
+                                donor_metadata["local_id"],
+                                output_directory,
+                            ),
+                            [],
+                        ),
+                        "collection": (
+                            partial(
+                                collection.create_manifest, dataset_metadata, output_directory
+                            ),
+                            [],
+                        ),
+                        "collection_defined_by_project": (
+                            partial(
+                                collection_defined_by_project.create_manifest,
+                                hubmap_id,
+                                data_provider,
+                                output_directory,
+                            ),
+                            [],
+                        ),
+                        "file_describes_collection": (
+                            partial(
+                                file_describes_collection.create_manifest,
+                                hubmap_id=hubmap_id,
+                                token=token,
+                                hubmap_uuid=hubmap_uuid,
+                                inventory_directory=inventory_directory,
+                                directory=data_directory,
+                                output_directory=output_directory,
+                            ),
+                            ["inventory"],
+                        ),
+                        "subject": (
+                            partial(subject.create_manifest, donor_metadata, output_directory),
+                            [],
+                        ),
+                        "subject_in_collection": (
+                            partial(
+                                subject_in_collection.create_manifest,
+                                donor_metadata["local_id"],
+                                hubmap_id,
+                                output_directory,
+                            ),
+                            [],
+                        ),
+                        "file_in_collection": (
+                            partial(
+                                file_in_collection.create_manifest,
+                                hubmap_id=hubmap_id,
+                                token=token,
+                                hubmap_uuid=hubmap_uuid,
+                                inventory_directory=inventory_directory,
+                                directory=data_directory,
+                                output_directory=output_directory,
+                            ),
+                            ["inventory"],
+                        ),
+                        "static_tables": (
+                            partial(
+                                static_tables.create_manifests,
+                                output_directory,
+                                static_directory=static_directory,
+                                link=link_static_tables,
+                            ),
+                            [],
+                        ),
+                    }
 
-                temp_file = ".data/" + hubmap_uuid + ".tsv"
-                logging.info("")
+                    print(f"Making {len(steps)} tables")
+                    logging.info(f"Making {len(steps)} tables")
+                    # the inventory is loaded once and shared by the file tables
+                    with inventories.shared(hubmap_id, inventory_directory):
+                        timings = dag.run(steps)
+                    __print_timings(hubmap_id, timings)
+                else:
+                    output_directory = (
+                        data_type + "-" + status + "-" + dataset["dataset_uuid"]
+                    )
+                    answer = files.create_manifest(
+                        project_id=data_provider,
+                        assay_type=data_type,
+                        directory=data_directory,
+                        inventory_directory=inventory_directory,
+                        output_directory=output_directory,
+                        dbgap_study_id=dbgap_study_id,
+                        token=token,
+                        dataset_hmid=hubmap_id,
+                        dataset_uuid=hubmap_uuid,
+                        max_memory=max_memory,
+                    )
 
-                if overwrite:
-                    print("Removing precomputed checksums")
-                    logging.info("Removing precomputed checksums")
-                    if Path(temp_file).exists():
-                        Path(temp_file).unlink()
+                job["bytes"] = __get_number_of_bytes(output_directory)
 
-                answer = files.create_manifest(
-                    project_id=data_provider,
-                    assay_type=data_type,
-                    directory=data_directory,
-                    inventory_directory=inventory_directory,
-                    output_directory=output_directory,
-                    dbgap_study_id=dbgap_study_id,
-                    token=token,
-                    dataset_hmid=hubmap_id,
-                    dataset_uuid=hubmap_uuid,
-                )
+                if build_bags:
+                    if not backup_directory:
+                        backup_directory = "bags"
 
-                print("Making biosample.tsv")
-                logging.info("Making biosample.tsv")
-                biosample.create_manifest(
-                    biosample_id,
-                    biosample_url,
-                    data_provider,
-                    donor_metadata["organ_shortcode"],
-                    output_directory,
-                )
+                    if not Path(backup_directory).exists():
+                        Path(backup_directory).mkdir()
 
-                print("Making biosample_in_collection.tsv")
-                logging.info("Making biosample_in_collection.tsv")
-                biosample_in_collection.create_manifest(
-                    biosample_id, hubmap_id, output_directory
-                )
+                    if Path(f"{backup_directory}/{output_directory}").exists():
+                        rmtree(f"{backup_directory}/{output_directory}")
+                    move(output_directory, backup_directory)
 
-                print("Making project.tsv")
-                logging.info("Making project.tsv")
-                project.create_manifest(data_provider, output_directory)
+    if skipped:
+        return None
 
-                print("Making project_in_project.tsv")
-                logging.info("Making project_in_project.tsv")
-                project_in_project.create_manifest(data_provider, output_directory)
+    return True
 
-                print("Making biosample_from_subject.tsv")
-                logging.info("Making biosample_from_subject.tsv")
-                biosample_from_subject.create_manifest(
-                    biosample_id, donor_metadata["local_id"], output_directory
-                )
 
-                print("Making ncbi_taxonomy.tsv")
-                logging.info("Making ncbi_taxonomy.tsv")
-                ncbi_taxonomy.create_manifest(output_directory)
+def __print_timings(hubmap_id: str, timings: dict) -> None:
+    """
+    Helper method that prints and logs how long each step of a bag took.
+    """
 
-                print("Making collection.tsv")
-                logging.info("Making collection.tsv")
-                collection.create_manifest(dataset_metadata, output_directory)
+    table = [["Step", "Start (s)", "Duration (s)"]]
+    for name, timing in sorted(timings.items(), key=lambda item: item[1]["start"]):
+        table.append([name, f'{timing["start"]:.1f}', f'{timing["duration"]:.1f}'])
 
-                print("Making collection_defined_by_project.tsv")
-                logging.info("Making collection_defined_by_project.tsv")
-                collection_defined_by_project.create_manifest(
-                    hubmap_id, data_provider, output_directory
-                )
+    print(tabulate(table, headers="firstrow", tablefmt="grid"))
+    logging.info(f"Step timings for {hubmap_id}: {timings}")
 
-                print("Making file_describes_collection.tsv")
-                logging.info("Making file_describes_collection.tsv")
-                file_describes_collection.create_manifest(
-                    hubmap_id=hubmap_id,
-                    token=token,
-                    hubmap_uuid=hubmap_uuid,
-                    inventory_directory=inventory_directory,
-                    directory=data_directory,
-                    output_directory=output_directory,
-                )
 
-                print("Making dcc.tsv")
-                logging.info("Making dcc.tsv")
-                dcc.create_manifest(output_directory)
+def __get_number_of_bytes(output_directory: str) -> int:
+    """
+    Helper method that returns the total size of the files listed in the file manifest of a bag.
+    """
 
-                print("Making id_namespace.tsv")
-                logging.info("Making id_namespace.tsv")
-                id_namespace.create_manifest(output_directory)
+    try:
+        df = pd.read_csv(
+            f"{output_directory}/file.tsv", sep="\t", usecols=["size_in_bytes"]
+        )
+        return int(df["size_in_bytes"].sum())
+    except Exception:
+        return None
 
-                print("Making subject.tsv")
-                logging.info("Making subject.tsv")
-                subject.create_manifest(donor_metadata, output_directory)
 
-                print("Making subject_in_collection.tsv")
-                logging.info("Making subject_in_collection.tsv")
-                subject_in_collection.create_manifest(
-                    donor_metadata["local_id"], hubmap_id, output_directory
-                )
+def __get_inventory_fingerprint(hubmap_id: str, inventory_directory: str) -> str:
+    """
+    Helper method that fingerprints the inventory files of a dataset from their names, sizes and mtimes.
 
-                print("Making file_in_collection.tsv")
-                logging.info("Making file_in_collection.tsv")
-                answer = file_in_collection.create_manifest(
-                    hubmap_id=hubmap_id,
-                    token=token,
-                    hubmap_uuid=hubmap_uuid,
-                    inventory_directory=inventory_directory,
-                    directory=data_directory,
-                    output_directory=output_directory,
-                )
+    Returns None if the dataset has no inventory.
+    """
 
-                print("Creating empty files")
-                logging.info("Creating empty files")
-                file_describes_subject.create_manifest(output_directory)
-                file_describes_biosample.create_manifest(output_directory)
-                anatomy.create_manifest(output_directory)
-                assay_type.create_manifest(output_directory)
-                analysis_type.create_manifest(output_directory)
-                biosample_disease.create_manifest(output_directory)
-                biosample_gene.create_manifest(output_directory)
-                biosample_substance.create_manifest(output_directory)
-                collection_anatomy.create_manifest(output_directory)
-                collection_compound.create_manifest(output_directory)
-                collection_disease.create_manifest(output_directory)
-                collection_gene.create_manifest(output_directory)
-                collection_in_collection.create_manifest(output_directory)
-                collection_phenotype.create_manifest(output_directory)
-
-                collection_biofluid.create_manifest(output_directory)
-                biofluid.create_manifest(output_directory)
-
-                collection_substance.create_manifest(output_directory)
-                collection_taxonomy.create_manifest(output_directory)
-                analysis_type.create_manifest(output_directory)
-                compound.create_manifest(output_directory)
-                data_type_file.create_manifest(output_directory)
-                disease.create_manifest(output_directory)
-                gene.create_manifest(output_directory)
-                phenotype_disease.create_manifest(output_directory)
-                phenotype_gene.create_manifest(output_directory)
-                phenotype.create_manifest(output_directory)
-                protein.create_manifest(output_directory)
-                protein_gene.create_manifest(output_directory)
-                substance.create_manifest(output_directory)
-                file_format.create_manifest(output_directory)
-                ncbi_taxonomy.create_manifest(output_directory)
-                subject_disease.create_manifest(output_directory)
-                subject_phenotype.create_manifest(output_directory)
-                subject_race.create_manifest(output_directory)
-                subject_role_taxonomy.create_manifest(output_directory)
-                subject_substance.create_manifest(output_directory)
-                file_format.create_manifest(output_directory)
-                collection_substance.create_manifest(output_directory)
-                subject_substance.create_manifest(output_directory)
-            else:
-                output_directory = (
-                    data_type + "-" + status + "-" + dataset["dataset_uuid"]
-                )
-                answer = files.create_manifest(
-                    project_id=data_provider,
-                    assay_type=data_type,
-                    directory=data_directory,
-                    output_directory=output_directory,
-                    dbgap_study_id=dbgap_study_id,
-                    token=token,
-                    dataset_hmid=hubmap_id,
-                    dataset_uuid=hubmap_uuid,
-                )
+    files = sorted(Path(inventory_directory).glob(f"{hubmap_id}*"))
+    if not files:
+        return None
 
-            print(f"Removing checkpoint {computing}")
-            logging.info(f"Removing checkpoint {computing}")
-            Path(computing).unlink()
+    digest = hashlib.sha1()
+    for file in files:
+        stat = file.stat()
+        digest.update(
+            f"{file.name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8")
+        )
 
-            print(f"Creating final checkpoint {done}")
-            logging.info(f"Creating final checkpoint {done}")
+    return digest.hexdigest()
 
-            if build_bags:
-                if not backup_directory:
-                    backup_directory = "bags"
 
-                if not Path(backup_directory).exists():
-                    Path(backup_directory).mkdir()
+def __get_last_modified_timestamps() -> dict:
+    """
+    Helper method that returns the last modified timestamp of every dataset in the daily report.
+    """
 
-                if Path(f"{backup_directory}/{output_directory}").exists():
-                    rmtree(f"{backup_directory}/{output_directory}")
-                move(output_directory, backup_directory)
+    df = reports.daily()
+    if "last_modified_timestamp" not in df.columns:
+        logging.warning(
+            "The daily report has no last_modified_timestamp column. "
+            "Datasets will be rebuilt by incremental runs."
+        )
+        return {}
 
-    return True
+    return {
+        hubmap_id: None if pd.isnull(timestamp) else int(timestamp)
+        for hubmap_id, timestamp in zip(
+            df["hubmap_id"], df["last_modified_timestamp"]
+        )
+    }
 
 
 def __get_dbgap_study_id(hubmap_id: str, token: str, debug: bool = False):
@@ -1182,7 +1367,9 @@ def __get_dbgap_study_id(hubmap_id: str, token: str, debug: bool = False):
     None
     """
 
-    metadata = apis.get_dataset_info(hubmap_id=hubmap_id, token=token)
+    metadata = apis.get_dataset_info(
+        hubmap_id=hubmap_id, token=token, fields=DATASET_FIELDS
+    )
 
     # Stanford
     hubmap_ids = "HBM955.HLLV.597 HBM659.TVWH.432 HBM463.QNLT.332 HBM774.KLGK.828 HBM439.WKBL.739 HBM338.SSPB.265 HBM772.BLMV.579 HBM397.LPDS.629 HBM296.NBPZ.987 HBM589.SDPS.578 HBM892.BKPQ.552 HBM655.CTDD.395 HBM989.JQKP.746 HBM645.KNRR.524 HBM298.BJXM.949 HBM985.RHTM.678 HBM757.DVSN.643 HBM443.CTRV.486 HBM562.FTNH.728 HBM829.FJPP.583 HBM899.PGTB.347 HBM592.GVWV.947 HBM329.SNBL.255 HBM584.XLZR.364 HBM693.BHLJ.499 HBM789.WPJN.678 HBM283.VGKK.538 HBM546.NVKL.577 HBM576.LVBL.359 HBM675.WGCV.363 HBM346.XMWF.667 HBM957.HKSV.373 HBM654.VQLP.438 HBM357.ZRCT.729 HBM425.HGPQ.798 HBM673.ZXZT.494 HBM838.NDBV.498 HBM764.TNMB.956 HBM329.LFSX.674 HBM342.FWKM.533 HBM356.HJJX.599 HBM433.TSNT.433 HBM492.NPXK.885 HBM496.NWMZ.649 HBM688.VFBR.562 HBM786.RRSH.472 HBM947.LJKB.895 HBM972.LWTD.655 HBM979.DRXV.239 HBM364.JHKZ.383 HBM427.SRRW.989 HBM568.TFRG.449 HBM739.KSDT.896 HBM748.MMQM.339 HBM372.FSCF.979 HBM443.RQDW.442 HBM865.WSGK.682 HBM747.VBFK.754 HBM398.THRG.589 HBM452.SKFP.725 HBM264.QCGR.632 HBM632.PMDT.978 HBM849.QFWQ.926 HBM232.XPHF.775 HBM397.SHGQ.476 HBM357.WRHQ.827 HBM993.LPCM.624 HBM882.HDWL.396 HBM535.KPZS.733 HBM582.DFHH.268 HBM722.HPXF.559 HBM442.MWFQ.639 HBM835.DHSZ.473 HBM522.LSNV.433 HBM623.PHGT.682 HBM376.RMDH.899 HBM658.RLQC.482 HBM667.ZWGS.745 HBM239.CKSF.677 HBM792.GHWK.356 HBM332.PGSG.277 HBM227.XCNT.648 HBM424.RQMH.756 HBM946.NKHN.264 HBM255.JXWV.538 HBM389.XRDV.828 HBM272.JZLF.372 HBM233.XQZM.395 HBM243.MXBM.589 HBM247.JTNN.859 HBM322.TNGF.859 HBM367.NSZK.788 HBM367.ZMBH.758 HBM373.VTNH.683 HBM433.SPRB.778 HBM444.XJKC.552 HBM469.MMFJ.248 HBM477.KVFD.827 HBM545.QLKW.543 HBM553.DVSQ.754 HBM557.VZPM.253 HBM579.JKPM.857 HBM599.CXNC.464 HBM655.MFTK.764 HBM655.RVNL.232 HBM659.GSQR.225 HBM745.GCNN.553 HBM778.QZPM.472 HBM793.LCCQ.642 HBM874.FDKQ.476 HBM925.FQDP.328 HBM949.PNXL.623 HBM254.XFHN.834 HBM292.FTLJ.343 HBM324.MKDC.693 HBM346.LSFW.324 HBM354.FMKQ.822 HBM373.FZMG.625 HBM379.PCLL.836 HBM382.VHCQ.532 HBM399.GZRJ.726 HBM439.LWSZ.467 HBM453.GWNF.247 HBM479.LFNT.246 HBM487.WJST.938 HBM493.KSXW.563 HBM543.QTVF.423 HBM558.BHPZ.328 HBM569.FMVR.429 HBM575.GQQG.346 HBM638.CDHV.585 HBM639.VPHX.366 HBM657.XWQQ.636 HBM684.SLGB.599 HBM879.DFQN.248 HBM889.DMLC.292 HBM892.VLVC.242 HBM895.FSVF.555 HBM895.RVGB.733 HBM928.PDBD.287 HBM958.VZLG.297 HBM967.JBBL.592 HBM983.LKMP.544 HBM987.BFBR.496 HBM378.WGXD.394 HBM854.LQKL.226 HBM945.QNRF.244 HBM338.HJRC.646 HBM393.FCNB.633 HBM394.NMWZ.594 HBM846.LZNC.567 HBM974.CTTF.889 HBM998.WTJK.564 HBM243.QRKL.558 HBM393.DSCC.392 HBM398.JXVV.636 HBM438.NJKG.575 HBM534.XNJK.939 HBM577.NRCL.952 HBM653.SPBN.555 HBM999.NRRQ.328 HBM233.GVDL.962 HBM254.SXCB.872 HBM368.BMZL.342 HBM596.PZBR.726 HBM669.FBKC.238 HBM725.ZXDG.482 HBM848.VLZL.329 HBM893.LCWM.423 HBM522.WKQN.772 HBM283.XXQN.824 HBM366.TWHT.638 HBM473.HNPK.434 HBM563.PTWZ.467 HBM688.DRXP.369 HBM726.DDNW.235 HBM733.SLXV.683 HBM782.XQRG.998 HBM323.JGNJ.947 HBM379.MLVH.522 HBM422.GKTR.735 HBM638.SQBD.338 HBM666.QBKB.629 HBM723.SFNS.898 HBM875.LBGV.674 HBM975.DJNJ.667 HBM454.ZWSD.895 HBM756.GJDX.884 HBM946.HHKL.578 HBM954.PCBD.364 HBM634.HGLT.739"
@@ -1223,17 +1410,38 @@ def create_big_data_bags(
         "TMT-LC-MS",
     ],
     backup_directory=None,
+    workers: int = 1,
+    incremental: bool = False,
+    inventory_directory="/hive/hubmap/bdbags/inventory",
+    static_directory: str = None,
     debug: bool = True,
-):
+) -> list:
     """
     Create a HuBMAP data submission.
 
     :param token: The authentication token for accessing HubMap resources.
     :type token: str
 
+    :param workers: Number of datasets built concurrently, each in its own process. Defaults to 1.
+    :type workers: int
+
+    :param incremental: If True, rebuild datasets that are done in the job ledger when their metadata
+                        or inventory changed since they were built. Defaults to False.
+    :type incremental: bool
+
+    :param inventory_directory: Directory of the dataset inventories. Defaults to "/hive/hubmap/bdbags/inventory".
+    :type inventory_directory: str
+
+    :param static_directory: If given, the tables that are the same in every bag are written once to this
+                             directory and hardlinked into each bag. Defaults to None.
+    :type static_directory: str
+
     :param debug: If True, enable debugging mode. Defaults to True.
     :type debug: bool
 
+    :return: One dictionary per dataset with its HuBMAP ID, status ("done", "skipped" when another process is building it, or "failed"), reason, duration and error.
+    :rtype: list
+
     This function creates a HubMap data submission by performing the following steps:
     1. Retrieves assay types using the provided authentication token.
     2. Iterates through each assay type and retrieves dataset IDs.
@@ -1249,13 +1457,22 @@ def create_big_data_bags(
 
     If the dataset is protected, it initiates data submission with a None dbGaP study ID.
 
+    In incremental mode, the last modified timestamp of each dataset in the daily report and the
+    fingerprint of its inventory are compared with the ones recorded in the job ledger, and only
+    new, failed or changed datasets are built. The reason is recorded in the ledger.
+
+    With `workers` greater than 1, datasets are built in a pool of processes. Each worker
+    logs to its own file in `logs/`, a failed dataset does not stop the others, and a summary
+    table is printed at the end.
+
     :Example:
 
-    >>> create_submission(token="your_token_here", debug=True)
+    >>> create_big_data_bags(token="your_token_here", workers=32)
     """
 
     assay_types = apis.get_assay_types(token=token, debug=debug)
 
+    jobs = []
     for assay_type in assay_types:
         if assay_type in dataset_types_to_ignore:
             utilities.pprint(f"Ignoring assay type {assay_type}")
@@ -1265,49 +1482,221 @@ def create_big_data_bags(
             datasets = apis.get_hubmap_ids(assay_type, token=token)
 
             for index, dataset in datasets.iterrows():
+                if dataset["status"] == "Published" and dataset["is_primary"]:
+                    jobs.append((dataset["hubmap_id"], bool(dataset["is_protected"])))
+                else:
+                    print(f'Avoiding computation of dataset {dataset["hubmap_id"]}.')
+
+    # the daily report is read once for the whole submission
+    timestamps = __get_last_modified_timestamps()
+
+    if incremental:
+        missing = [
+            hubmap_id for hubmap_id, _ in jobs if timestamps.get(hubmap_id) is None
+        ]
+        if missing:
+            message = f"{len(missing)} datasets have no last modified timestamp in the daily report and will be rebuilt"
+            print(message)
+            logging.warning(f"{message}: {missing}")
+
+        reasons = ledger.get_changes(
+            {
+                hubmap_id: (
+                    timestamps.get(hubmap_id),
+                    __get_inventory_fingerprint(hubmap_id, inventory_directory),
+                )
+                for hubmap_id, _ in jobs
+            }
+        )
+    else:
+        remaining = ledger.remaining([hubmap_id for hubmap_id, _ in jobs])
+        reasons = {hubmap_id: None for hubmap_id in remaining}
+
+    utilities.pprint(
+        f"{len(jobs) - len(reasons)} of {len(jobs)} datasets are up to date according to the job ledger"
+    )
+    if incremental:
+        counts = pd.Series(list(reasons.values()), dtype="object").value_counts()
+        for reason, count in counts.items():
+            print(f"{count} datasets to rebuild: {reason}")
+
+    jobs = [
+        (hubmap_id, is_protected, reasons[hubmap_id])
+        for hubmap_id, is_protected in jobs
+        if hubmap_id in reasons
+    ]
+
+    results = []
+    if workers == 1:
+        for hubmap_id, is_protected, reason in jobs:
+            results.append(
+                __build_dataset(
+                    hubmap_id,
+                    is_protected,
+                    token=token,
+                    backup_directory=backup_directory,
+                    inventory_directory=inventory_directory,
+                    reason=reason,
+                    static_directory=static_directory,
+                    last_modified_timestamps=__select(timestamps, hubmap_id),
+                )
+            )
+    else:
+        utilities.pprint(f"Building {len(jobs)} datasets with {workers} workers")
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=__initialize_worker
+        ) as executor:
+            futures = {
+                executor.submit(
+                    __build_dataset,
+                    hubmap_id,
+                    is_protected,
+                    token=token,
+                    backup_directory=backup_directory,
+                    inventory_directory=inventory_directory,
+                    reason=reason,
+                    static_directory=static_directory,
+                    last_modified_timestamps=__select(timestamps, hubmap_id),
+                ): hubmap_id
+                for hubmap_id, is_protected, reason in jobs
+            }
+
+            for future in tqdm(as_completed(futures), total=len(futures)):
                 try:
-                    if (
-                        dataset["status"] == "Published"
-                        and not dataset["is_protected"]
-                        and dataset["is_primary"]
-                    ):
-                        hubmap_id = dataset["hubmap_id"]
-                        do_it(
-                            hubmap_id,
-                            token=token,
-                            instance="prod",
-                            overwrite=False,
-                            backup_directory=backup_directory,
-                            dbgap_study_id=__get_dbgap_study_id(
-                                hubmap_id=hubmap_id, token=token
-                            ),
-                            build_bags=True,
-                        )
-                    elif (
-                        dataset["status"] == "Published"
-                        and dataset["is_protected"]
-                        and dataset["is_primary"]
-                    ):
-                        hubmap_id = dataset["hubmap_id"]
-                        dbgap_study_id = __get_dbgap_study_id(
-                            hubmap_id=hubmap_id, token=token
-                        )
-                        do_it(
-                            hubmap_id,
-                            token=token,
-                            instance="prod",
-                            backup_directory=backup_directory,
-                            overwrite=False,
-                            dbgap_study_id=None,
-                            build_bags=True,
-                        )
-                    else:
-                        print(
-                            f'Avoiding computation of dataset {dataset["hubmap_id"]}.'
-                        )
+                    results.append(future.result())
                 except Exception as e:
-                    print(f'Failed to process dataset {dataset["hubmap_id"]}.')
-                    traceback.print_exc()
+                    # the worker process died
+                    results.append(
+                        {
+                            "hubmap_id": futures[future],
+                            "status": "failed",
+                            "reason": None,
+                            "duration": None,
+                            "error": repr(e),
+                        }
+                    )
+
+    __print_summary(results)
+
+    return results
+
+
+def __select(timestamps: dict, hubmap_id: str) -> dict:
+    """
+    Helper method that keeps the last modified timestamp of a single dataset, so workers do not receive the whole report.
+    """
+
+    if hubmap_id in timestamps:
+        return {hubmap_id: timestamps[hubmap_id]}
+
+    return {}
+
+
+def __initialize_worker():
+    """
+    Helper method that sends the log of a worker process to its own file.
+    """
+
+    if not Path("logs").exists():
+        Path("logs").mkdir(exist_ok=True)
+
+    now = datetime.now()
+    log_filename = f'hubmapbags-{now.strftime("%Y%m%d")}-{os.getpid()}.log'
+    logging.basicConfig(
+        filename=f"logs/{log_filename}",
+        filemode="w",
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        force=True,
+    )
+
+
+def __build_dataset(
+    hubmap_id: str,
+    is_protected: bool,
+    token: str,
+    backup_directory=None,
+    inventory_directory="/hive/hubmap/bdbags/inventory",
+    reason: str = None,
+    static_directory: str = None,
+    last_modified_timestamps: dict = None,
+) -> dict:
+    """
+    Helper method that builds the bag of a single published primary dataset.
+
+    Errors are caught and reported in the result so that one dataset never stops the others.
+    """
+
+    start = time.time()
+    try:
+        # share metadata between the dbGaP lookup and do_it
+        with memo.scope():
+            dbgap_study_id = __get_dbgap_study_id(hubmap_id=hubmap_id, token=token)
+            if is_protected:
+                dbgap_study_id = None
+
+            answer = do_it(
+                hubmap_id,
+                token=token,
+                instance="prod",
+                overwrite=reason == "files changed",
+                reason=reason,
+                backup_directory=backup_directory,
+                inventory_directory=inventory_directory,
+                dbgap_study_id=dbgap_study_id,
+                static_directory=static_directory,
+                last_modified_timestamps=last_modified_timestamps,
+                build_bags=True,
+            )
+
+        if answer is None:
+            status = "skipped"
+            error = "claimed elsewhere"
+        else:
+            status = "done" if answer else "failed"
+            error = None
+    except Exception as e:
+        print(f"Failed to process dataset {hubmap_id}.")
+        logging.error(f"Failed to process dataset {hubmap_id}: {e!r}")
+        traceback.print_exc()
+        status = "failed"
+        error = repr(e)
+
+    return {
+        "hubmap_id": hubmap_id,
+        "status": status,
+        "reason": reason,
+        "duration": time.time() - start,
+        "error": error,
+    }
+
+
+def __print_summary(results: list) -> None:
+    """
+    Helper method that prints the outcome of every dataset built by `create_big_data_bags`.
+    """
+
+    table = [["HuBMAP ID", "Status", "Reason", "Duration (s)", "Error"]]
+    for result in sorted(results, key=lambda result: result["hubmap_id"]):
+        duration = result["duration"]
+        table.append(
+            [
+                result["hubmap_id"],
+                result["status"],
+                result["reason"] or "",
+                "-" if duration is None else f"{duration:.1f}",
+                result["error"] or "",
+            ]
+        )
+
+    print(tabulate(table, headers="firstrow", tablefmt="grid"))
+
+    done = sum(1 for result in results if result["status"] == "done")
+    skipped = sum(1 for result in results if result["status"] == "skipped")
+    failed = len(results) - done - skipped
+    utilities.pprint(
+        f"Processed {len(results)} datasets: {done} done, "
+        f"{skipped} skipped (claimed elsewhere), {failed} failed"
+    )
 
 
 def generate_random_sample(directory: str, number_of_samples: int = 10):
@@ -1391,7 +1780,9 @@ def generate_random_sample(directory: str, number_of_samples: int = 10):
         df.to_csv(output_filename, sep="\t", index=False)
 
 
-def aggregate2(directory: str, output_directory: str = "submission"):
+def aggregate2(
+    directory: str, output_directory: str = "submission", static_directory: str = None
+):
     tsv_files = [
         "analysis_type.tsv",
         "anatomy.tsv",
@@ -1449,6 +1840,11 @@ def aggregate2(directory: str, output_directory: str = "submission"):
         rmtree(output_directory)
     Path(output_directory).mkdir()
 
+    if static_directory is not None:
+        # the static tables are the same in every bag, so copy them once
+        static = static_tables.copy(static_directory, output_directory)
+        tsv_files = [tsv_file for tsv_file in tsv_files if tsv_file not in static]
+
     for tsv_file in tsv_files:
         p = Path(directory).glob(f"**/{tsv_file}")
         files = list(p)
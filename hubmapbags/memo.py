@@ -0,0 +1,161 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# active scopes, outermost first; every thread and task sees only the scopes it opened
+# or that were handed to it with `bind`
+__scopes = ContextVar("scopes", default=())
+
+
+class Memo:
+    """
+    In-memory memo of metadata lookups made during a single run.
+
+    Entries live only as long as the scope that created them, so a run never
+    fetches the same entity twice while separate runs still see fresh metadata.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.network_calls = 0
+        self.lock = threading.Lock()
+
+    def stats(self) -> dict:
+        """
+        Return the hit, miss and network call counters of this memo.
+        """
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "network_calls": self.network_calls,
+        }
+
+
+@contextmanager
+def scope():
+    """
+    Open a run-scoped memo.
+
+    Every metadata lookup made inside the `with` block consults the memo before the
+    local cache or the network. Scopes are private to the thread that opens them, so
+    scopes opened concurrently on several threads never share entries or counters;
+    wrap work handed to other threads with `bind`. Scopes can be nested; inner scopes
+    see the entries of outer scopes and record their own lookups.
+
+    :return: The memo of this scope.
+    :rtype: Memo
+
+    .. example::
+       >>> with memo.scope() as run:
+       ...     apis.get_dataset_info("HBM123.ABCD.456", token=token)
+       >>> run.stats()
+       {'hits': 0, 'misses': 1, 'network_calls': 1}
+    """
+
+    memo = Memo()
+    token = __scopes.set(__scopes.get() + (memo,))
+
+    try:
+        yield memo
+    finally:
+        __scopes.reset(token)
+
+
+def bind(function):
+    """
+    Return a version of `function` that runs inside the scopes active where `bind` is called.
+
+    Use it to hand work to other threads, e.g. a thread pool, so their lookups share the
+    memo of the caller.
+
+    :param function: The function to bind.
+    :type function: callable
+
+    :return: The bound function.
+    :rtype: callable
+
+    .. example::
+       >>> executor.submit(memo.bind(apis.get_dataset_info), hubmap_id)
+    """
+
+    scopes = __scopes.get()
+
+    def bound(*args, **kwargs):
+        token = __scopes.set(scopes)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            __scopes.reset(token)
+
+    return bound
+
+
+def current() -> Memo:
+    """
+    Return the innermost active memo, or None if no scope is open.
+    """
+
+    scopes = __scopes.get()
+    if scopes:
+        return scopes[-1]
+
+    return None
+
+
+def lookup(key: tuple, function):
+    """
+    Return the memoized value of `key`, calling `function` on a miss.
+
+    Every open scope is consulted, innermost first, and new values are recorded in
+    the innermost scope. Values that are None are not memoized so that failed lookups
+    are retried. Outside of a scope this is just a call to `function`.
+
+    :param key: A hashable key, e.g. ("entity", hubmap_id, instance).
+    :type key: tuple
+
+    :param function: A function without arguments that computes the value.
+    :type function: callable
+
+    :return: The value.
+    """
+
+    scopes = list(reversed(__scopes.get()))
+
+    if not scopes:
+        return function()
+
+    memo = scopes[0]
+    for outer in scopes:
+        with outer.lock:
+            if key in outer.entries:
+                value = outer.entries[key]
+                break
+    else:
+        with memo.lock:
+            memo.misses += 1
+
+        value = function()
+
+        if value is not None:
+            with memo.lock:
+                memo.entries[key] = value
+
+        return value
+
+    with memo.lock:
+        memo.hits += 1
+
+    return value
+
+
+def count_network_call() -> None:
+    """
+    Record a network call in every active memo.
+    """
+
+    for memo in __scopes.get():
+        with memo.lock:
+            memo.network_calls += 1
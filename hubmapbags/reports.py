@@ -5,7 +5,7 @@ import pandas as pd
 from pandarallel import pandarallel
 from tqdm import tqdm
 
-from . import apis, plots, utilities
+from . import apis, client, plots, utilities
 
 
 def __is_protected(hubmap_id, token=None):
@@ -326,7 +326,7 @@ def daily() -> pd.DataFrame:
     else:
         url = "https://ingest.api.hubmapconsortium.org/datasets/data-status"  # The URL to get the data from
         try:
-            response = requests.get(url)  # Send a request to the URL to get the data
+            response = client.get(url)  # Send a request to the URL to get the data
             response.raise_for_status()  # Check if the request was successful (no errors)
             json_data = response.json()  # Convert the response to JSON format
 
@@ -355,7 +355,8 @@ def daily() -> pd.DataFrame:
             Path(report_output_directory).mkdir()
 
         try:
-            df.to_csv(report_output_filename, sep="\t", index=False)
+            with utilities.atomic_write(report_output_filename) as output_file:
+                df.to_csv(output_file, sep="\t", index=False)
         except:
             print(f"Unable to save dataframe to {report_output_filename}.")
 
@@ -0,0 +1,275 @@
+import json
+import os
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from . import cache, database
+
+# number of directories listed concurrently
+MAX_WORKERS = 16
+
+# directories modified less than this many seconds before a scan are always listed,
+# since a change within the same mtime tick would go unnoticed
+__RACY_SECONDS = 2
+
+__SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    directory TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    payload BLOB NOT NULL
+) WITHOUT ROWID
+"""
+
+
+def __connect():
+    """
+    Helper method that opens the snapshot table, stored next to the metadata, and creates the schema if needed.
+    """
+
+    return database.connect(cache.DATABASE, schema=__SCHEMA)
+
+
+def __load_snapshot(directory: str, mtime_ns: int) -> dict:
+    """
+    Helper method that returns the snapshot of a directory if it was taken at the given mtime.
+    """
+
+    row = (
+        __connect()
+        .execute(
+            "SELECT mtime_ns, payload FROM snapshots WHERE directory = ?", (directory,)
+        )
+        .fetchone()
+    )
+
+    if row is None or row[0] != mtime_ns:
+        return None
+
+    return json.loads(zlib.decompress(row[1]).decode("utf-8"))
+
+
+def __save_snapshots(rows: list) -> None:
+    """
+    Helper method that saves directory snapshots in a single transaction.
+    """
+
+    if not rows:
+        return
+
+    rows = [
+        (
+            directory,
+            mtime_ns,
+            zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8")),
+        )
+        for directory, mtime_ns, payload in rows
+    ]
+
+    conn = __connect()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR REPLACE INTO snapshots (directory, mtime_ns, payload) VALUES (?, ?, ?)",
+            rows,
+        )
+
+
+def __list_directory(directory: str, sizes: bool) -> dict:
+    """
+    Helper method that lists the files and subdirectories of a single directory.
+
+    File types come from the directory entries (d_type), so only symbolic links and,
+    when `sizes` is True, files are stat'ed.
+    """
+
+    files = []
+    file_sizes = [] if sizes else None
+    directories = []
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(entry.name)
+            elif entry.is_file():
+                files.append(entry.name)
+                if sizes:
+                    file_sizes.append(entry.stat().st_size)
+
+    return {"files": files, "sizes": file_sizes, "directories": directories}
+
+
+def __scan_directory(directory: str, sizes: bool, use_snapshots: bool):
+    """
+    Helper method that lists a directory, reusing its snapshot if the directory did not change.
+
+    Returns the listing and, if the directory was listed, the snapshot row to save.
+    """
+
+    stat = os.stat(directory)
+    mtime_ns = stat.st_mtime_ns
+
+    if use_snapshots:
+        snapshot = __load_snapshot(directory, mtime_ns)
+        if snapshot is not None and (not sizes or snapshot["sizes"] is not None):
+            return snapshot, None
+
+    listing = __list_directory(directory, sizes)
+
+    if use_snapshots and time.time() - mtime_ns / 1e9 > __RACY_SECONDS:
+        return listing, (directory, mtime_ns, listing)
+
+    return listing, None
+
+
+def scan(
+    directory: str,
+    mode: str = "count",
+    max_workers: int = MAX_WORKERS,
+    use_snapshots: bool = True,
+):
+    """
+    Walk a directory tree and count, sum the sizes of or list its files.
+
+    Subdirectories are listed concurrently with `os.scandir`, which reads file types from the
+    directory entries instead of stat'ing every file. The listing of each directory is kept in
+    a snapshot keyed by the directory mtime, so later scans of an unchanged tree only stat its
+    directories. Symbolic links to files are counted as files; symbolic links to directories
+    are not followed.
+
+    :param directory: The root of the tree.
+    :type directory: str
+
+    :param mode: One of "count" (number of files), "size" (total size in bytes) or "list" (paths of the files). Default is "count".
+    :type mode: str, optional
+
+    :param max_workers: Number of directories listed concurrently. Default is `MAX_WORKERS`.
+    :type max_workers: int, optional
+
+    :param use_snapshots: If False, list every directory and leave the snapshots untouched. Default is True.
+    :type use_snapshots: bool, optional
+
+    :return: An integer in "count" and "size" modes, or a list of `pathlib.Path` in "list" mode.
+
+    :raises ValueError: If the mode is unknown.
+    :raises OSError: If a directory cannot be listed, e.g. because of permissions.
+
+    .. note::
+       - Snapshots track files being added, removed or renamed. A file rewritten in place does
+         not change the mtime of its directory, so use `use_snapshots=False` in "size" mode when
+         files may be rewritten.
+
+    .. example::
+       >>> scanner.scan("/hive/hubmap/data/public/abcd1234")
+       1024
+    """
+
+    if mode not in ["count", "size", "list"]:
+        raise ValueError(f"Unknown scan mode {mode}.")
+
+    sizes = mode == "size"
+    directory = str(Path(directory).absolute())
+
+    count = 0
+    size = 0
+    files = []
+    rows = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {
+            executor.submit(__scan_directory, directory, sizes, use_snapshots): directory
+        }
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                listing, row = future.result()
+
+                if row is not None:
+                    rows.append(row)
+
+                count = count + len(listing["files"])
+                if sizes:
+                    size = size + sum(listing["sizes"])
+                if mode == "list":
+                    files.extend(Path(path, name) for name in listing["files"])
+
+                for name in listing["directories"]:
+                    subdirectory = os.path.join(path, name)
+                    pending[
+                        executor.submit(
+                            __scan_directory, subdirectory, sizes, use_snapshots
+                        )
+                    ] = subdirectory
+
+    __save_snapshots(rows)
+
+    if mode == "count":
+        return count
+    elif mode == "size":
+        return size
+    else:
+        return sorted(files)
+
+
+def count_files(directory: str, max_workers: int = MAX_WORKERS) -> int:
+    """
+    Return the number of files in a directory tree.
+
+    :param directory: The root of the tree.
+    :type directory: str
+
+    :param max_workers: Number of directories listed concurrently. Default is `MAX_WORKERS`.
+    :type max_workers: int, optional
+
+    :return: The number of files.
+    :rtype: int
+    """
+
+    return scan(directory, mode="count", max_workers=max_workers)
+
+
+def get_size(
+    directory: str, max_workers: int = MAX_WORKERS, use_snapshots: bool = False
+) -> int:
+    """
+    Return the total size in bytes of the files in a directory tree.
+
+    Every directory is listed by default, since a file rewritten in place does not change
+    the mtime of its directory and a snapshot would keep its old size.
+
+    :param directory: The root of the tree.
+    :type directory: str
+
+    :param max_workers: Number of directories listed concurrently. Default is `MAX_WORKERS`.
+    :type max_workers: int, optional
+
+    :param use_snapshots: If True, reuse the snapshots of unchanged directories, see `scan`. Default is False.
+    :type use_snapshots: bool, optional
+
+    :return: The total size in bytes.
+    :rtype: int
+    """
+
+    return scan(
+        directory, mode="size", max_workers=max_workers, use_snapshots=use_snapshots
+    )
+
+
+def list_files(directory: str, max_workers: int = MAX_WORKERS) -> list:
+    """
+    Return the paths of the files in a directory tree.
+
+    :param directory: The root of the tree.
+    :type directory: str
+
+    :param max_workers: Number of directories listed concurrently. Default is `MAX_WORKERS`.
+    :type max_workers: int, optional
+
+    :return: A sorted list of `pathlib.Path`.
+    :rtype: list
+    """
+
+    return scan(directory, mode="list", max_workers=max_workers)
@@ -0,0 +1,213 @@
+import os
+import shutil
+import threading
+import traceback
+from pathlib import Path
+
+from . import (
+    analysis_type,
+    anatomy,
+    assay_type,
+    biofluid,
+    biosample_disease,
+    biosample_gene,
+    biosample_substance,
+    collection_anatomy,
+    collection_biofluid,
+    collection_compound,
+    collection_disease,
+    collection_gene,
+    collection_in_collection,
+    collection_phenotype,
+    collection_substance,
+    collection_taxonomy,
+    compound,
+    data_type,
+    dcc,
+    disease,
+    file_describes_biosample,
+    file_describes_subject,
+    file_format,
+    gene,
+    id_namespace,
+    ncbi_taxonomy,
+    phenotype,
+    phenotype_disease,
+    phenotype_gene,
+    protein,
+    protein_gene,
+    subject_disease,
+    subject_phenotype,
+    subject_race,
+    subject_role_taxonomy,
+    subject_substance,
+    substance,
+    utilities,
+)
+
+# tables whose content does not depend on the dataset, keyed by file name
+TABLES = {
+    "analysis_type.tsv": analysis_type,
+    "anatomy.tsv": anatomy,
+    "assay_type.tsv": assay_type,
+    "biofluid.tsv": biofluid,
+    "biosample_disease.tsv": biosample_disease,
+    "biosample_gene.tsv": biosample_gene,
+    "biosample_substance.tsv": biosample_substance,
+    "collection_anatomy.tsv": collection_anatomy,
+    "collection_biofluid.tsv": collection_biofluid,
+    "collection_compound.tsv": collection_compound,
+    "collection_disease.tsv": collection_disease,
+    "collection_gene.tsv": collection_gene,
+    "collection_in_collection.tsv": collection_in_collection,
+    "collection_phenotype.tsv": collection_phenotype,
+    "collection_substance.tsv": collection_substance,
+    "collection_taxonomy.tsv": collection_taxonomy,
+    "compound.tsv": compound,
+    "data_type.tsv": data_type,
+    "dcc.tsv": dcc,
+    "disease.tsv": disease,
+    "file_describes_biosample.tsv": file_describes_biosample,
+    "file_describes_subject.tsv": file_describes_subject,
+    "file_format.tsv": file_format,
+    "gene.tsv": gene,
+    "id_namespace.tsv": id_namespace,
+    "ncbi_taxonomy.tsv": ncbi_taxonomy,
+    "phenotype.tsv": phenotype,
+    "phenotype_disease.tsv": phenotype_disease,
+    "phenotype_gene.tsv": phenotype_gene,
+    "protein.tsv": protein,
+    "protein_gene.tsv": protein_gene,
+    "subject_disease.tsv": subject_disease,
+    "subject_phenotype.tsv": subject_phenotype,
+    "subject_race.tsv": subject_race,
+    "subject_role_taxonomy.tsv": subject_role_taxonomy,
+    "subject_substance.tsv": subject_substance,
+    "substance.tsv": substance,
+}
+
+__lock = threading.Lock()
+__rendered = None
+
+
+def render() -> dict:
+    """
+    Render the static tables.
+
+    Tables are rendered once per process with the `_build_dataframe` function of their module,
+    exactly as their `create_manifest` function would write them.
+
+    :return: A dictionary keyed by file name with the content of each table.
+    :rtype: dict
+    """
+
+    global __rendered
+
+    with __lock:
+        if __rendered is None:
+            __rendered = {
+                filename: module._build_dataframe().to_csv(sep="\t", index=False)
+                for filename, module in TABLES.items()
+            }
+
+        return __rendered
+
+
+def __write(output_directory: str, overwrite: bool = True) -> None:
+    """
+    Helper method that writes the rendered static tables to a directory.
+    """
+
+    for filename, content in render().items():
+        file = os.path.join(output_directory, filename)
+        if not overwrite and Path(file).exists():
+            continue
+
+        with utilities.atomic_write(file) as temp_file:
+            with open(temp_file, "w") as output:
+                output.write(content)
+
+
+def __link(static_directory: str, output_directory: str) -> None:
+    """
+    Helper method that hardlinks the static tables of a shared directory into a directory.
+
+    Tables are copied when the directories are on different file systems.
+    """
+
+    for filename in TABLES:
+        source = os.path.join(static_directory, filename)
+        destination = os.path.join(output_directory, filename)
+
+        if Path(destination).exists():
+            Path(destination).unlink()
+
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copyfile(source, destination)
+
+
+def create_manifests(
+    output_directory: str, static_directory: str = None, link: bool = True
+) -> bool:
+    """
+    Create the static tables of a bag.
+
+    Without `static_directory`, the tables are written to `output_directory`. Otherwise they are
+    written once to `static_directory`, shared by every bag of a submission, and hardlinked into
+    `output_directory`, or left out of it if `link` is False.
+
+    :param output_directory: The directory of the bag.
+    :type output_directory: str
+
+    :param static_directory: A directory shared by the bags of a submission. Default is None.
+    :type static_directory: str, optional
+
+    :param link: If True, hardlink the shared tables into `output_directory`. Default is True.
+    :type link: bool, optional
+
+    :return: True if the tables were created, False otherwise.
+    :rtype: bool
+    """
+
+    try:
+        if static_directory is None:
+            __write(output_directory)
+            return True
+
+        Path(static_directory).mkdir(parents=True, exist_ok=True)
+        __write(static_directory, overwrite=False)
+
+        if link:
+            __link(static_directory, output_directory)
+
+        return True
+    except:
+        traceback.print_exc()
+        return False
+
+
+def copy(static_directory: str, output_directory: str) -> list:
+    """
+    Copy the shared static tables into a submission.
+
+    :param static_directory: The directory shared by the bags of a submission.
+    :type static_directory: str
+
+    :param output_directory: The directory of the submission.
+    :type output_directory: str
+
+    :return: The file names of the tables copied.
+    :rtype: list
+    """
+
+    __write(static_directory, overwrite=False)
+
+    for filename in TABLES:
+        shutil.copyfile(
+            os.path.join(static_directory, filename),
+            os.path.join(output_directory, filename),
+        )
+
+    return list(TABLES)
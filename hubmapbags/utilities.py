@@ -1,9 +1,19 @@
 from shutil import rmtree
 from pathlib import Path
+from contextlib import contextmanager
 import pandas as pd
 from tabulate import tabulate
+import tempfile
+import stat
 import os
 
+from . import cache
+from . import flight
+
+# permissions of new files, read once since reading the umask means setting it
+__UMASK = os.umask(0)
+os.umask(__UMASK)
+
 
 def __get_token(token: str) -> str:
     """
@@ -16,6 +26,46 @@ def __get_token(token: str) -> str:
     return token
 
 
+@contextmanager
+def atomic_write(file: str):
+    """
+    Helper method that writes a file atomically.
+
+    Yields a temporary path in the same directory as `file`. Once the `with` block
+    completes, the temporary file is renamed to `file`, so readers see either the old
+    or the new version and never a partially written one. If the block fails, the
+    temporary file is removed and `file` is left untouched. The file keeps the permissions
+    of the version it replaces, or gets those of a new file under the umask, instead of the
+    owner-only permissions of a temporary file.
+
+    :param file: Path of the file to write
+    :type file: string
+
+    .. example::
+       >>> with atomic_write("data.tsv") as temp_file:
+       ...     df.to_csv(temp_file, sep="\t", index=False)
+    """
+
+    file = Path(file)
+    handle, temp_file = tempfile.mkstemp(
+        dir=file.parent, prefix=f".{file.name}.", suffix=file.suffix
+    )
+    os.close(handle)
+
+    try:
+        yield temp_file
+        try:
+            mode = stat.S_IMODE(os.stat(file).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~__UMASK
+        os.chmod(temp_file, mode)
+        os.replace(temp_file, file)
+    except BaseException:
+        if Path(temp_file).exists():
+            os.remove(temp_file)
+        raise
+
+
 def add_empty_duuid_column(file: str) -> bool:
     """
     Helper method that adds the UUID column of a backup pickle file.
@@ -31,7 +81,8 @@ def add_empty_duuid_column(file: str) -> bool:
 
         df = pd.read_pickle(file)
         df["duuid"] = duuid
-        df.to_pickle(file)
+        with atomic_write(file) as temp_file:
+            df.to_pickle(temp_file)
         return True
     except:
         return False
@@ -49,7 +100,8 @@ def reset_hubmap_uuid_column(file: str) -> bool:
     try:
         df = pd.read_pickle(file)
         df["hubmap_uuid"] = None
-        df.to_pickle(file)
+        with atomic_write(file) as temp_file:
+            df.to_pickle(temp_file)
         return True
     except:
         return False
@@ -70,7 +122,8 @@ def add_empty_dbgap_study_id_column(file: str) -> bool:
 
         df = pd.read_pickle(file)
         df["dbgap_study_id"] = None
-        df.to_pickle(file)
+        with atomic_write(file) as temp_file:
+            df.to_pickle(temp_file)
         return True
     except:
         return False
@@ -94,7 +147,10 @@ def clean():
     Helper method that erases files generated by this package.
     """
 
-    directories = [".datasets", ".provenance"]
+    cache.clear()
+    flight.clear()
+
+    directories = [".datasets", ".provenance", ".ancestors", ".donor", ".entity"]
     for directory in directories:
         if Path(directory).exists():
             rmtree(directory)
@@ -4,9 +4,8 @@ from warnings import warn as warning
 import uuid
 
 import pandas as pd
-import requests
 
-from . import apis, magic, utilities
+from . import apis, client, ledger, magic, utilities
 
 
 def load_local_file_with_remote_uuids(
@@ -38,6 +37,35 @@ def load_local_file_with_remote_uuids(
         return pd.DataFrame()
 
 
+def __backfill_uuids(df: pd.DataFrame, uuids: list) -> tuple:
+    """
+    Helper method that fills the UUIDs of local files from the remote UUID records of a dataset.
+
+    Local files are joined to remote records on relative_local_id and path with a single
+    keyed lookup. If a path has several records, the last one wins. Local files without a
+    record keep their UUID.
+
+    Returns the dataframe, the local paths without a remote record and the remote paths
+    without a local file.
+    """
+
+    remote = pd.DataFrame.from_records(uuids, columns=["path", "file_uuid"])
+    remote = remote.drop_duplicates(subset="path", keep="last").set_index("path")
+
+    local_paths = df["relative_local_id"]
+    remote_uuids = local_paths.map(remote["file_uuid"])
+    matched = local_paths.isin(remote.index)
+
+    if "hubmap_uuid" not in df.columns:
+        df["hubmap_uuid"] = None
+    df["hubmap_uuid"] = remote_uuids.where(matched, df["hubmap_uuid"])
+
+    unmatched_local = local_paths[~matched].tolist()
+    unmatched_remote = remote.index[~remote.index.isin(local_paths)].tolist()
+
+    return df, unmatched_local, unmatched_remote
+
+
 def populate_local_file_with_remote_uuids(
     hubmap_id: str,
     token: str,
@@ -59,25 +87,29 @@ def populate_local_file_with_remote_uuids(
         return False
 
     data_directory = dataset["full_path"][0]
-    computing = data_directory.replace("/", "_").replace(" ", "_") + ".computing"
-    done = "." + data_directory.replace("/", "_").replace(" ", "_") + ".done"
-    broken = "." + data_directory.replace("/", "_").replace(" ", "_") + ".broken"
+    job = ledger.get_job(dataset["ds.hubmap_id"][0])
 
     if not Path(".data").is_dir():
         Path(".data").mkdir()
     temp_file = ".data/" + data_directory.replace("/", "_").replace(" ", "_") + ".pkl"
 
-    if Path(computing).is_file():
+    if (
+        job is not None
+        and job["state"] == ledger.COMPUTING
+        and not ledger.is_stale(job)
+    ):
         warning(
-            "Computing file "
-            + computing
-            + " exists. Another process is computing checksums. Not populating local file."
+            "Job ledger shows process "
+            + str(job["pid"])
+            + " on "
+            + str(job["host"])
+            + " is computing checksums. Not populating local file."
         )
         return False
-    elif not Path(computing).is_file() and not Path(done).is_file():
-        print("File " + done + " not found on disk. Not populating local file.")
+    elif job is None or job["state"] != ledger.DONE:
+        print("Dataset not done in job ledger. Not populating local file.")
         return False
-    elif Path(done).is_file():
+    else:
         if Path(temp_file).is_file():
             if not should_i_generate_uuids(
                 hubmap_id, instance=instance, token=token, debug=debug
@@ -88,14 +120,27 @@ def populate_local_file_with_remote_uuids(
                     hubmap_id, instance=instance, token=token, debug=debug
                 )
 
-                for i in range(len(df)):
-                    for uuid in uuids:
-                        if df.loc[i, "relative_local_id"] == uuid["path"]:
-                            df.loc[i, "hubmap_uuid"] = uuid["file_uuid"]
+                df, unmatched_local, unmatched_remote = __backfill_uuids(df, uuids)
+                if unmatched_local:
+                    warning(
+                        str(len(unmatched_local))
+                        + " local files have no remote UUID, e.g. "
+                        + ", ".join(map(str, unmatched_local[:5]))
+                    )
+                if unmatched_remote:
+                    warning(
+                        str(len(unmatched_remote))
+                        + " remote UUIDs have no local file, e.g. "
+                        + ", ".join(map(str, unmatched_remote[:5]))
+                    )
 
                 print("Updating local file " + temp_file + " with UUIDs.")
-                df.to_pickle(temp_file)
-                df.to_csv(temp_file.replace("pkl", "tsv"), sep="\t", index=False)
+                with utilities.atomic_write(temp_file) as output_file:
+                    df.to_pickle(output_file)
+                with utilities.atomic_write(
+                    temp_file.replace("pkl", "tsv")
+                ) as output_file:
+                    df.to_csv(output_file, sep="\t", index=False)
                 return True
             else:
                 return False
@@ -143,7 +188,7 @@ def __query_existence(
 
     headers = {"Authorization": "Bearer " + token, "accept": "application/json"}
 
-    r = requests.get(URL, headers=headers)
+    r = client.get(URL, headers=headers)
     return r
 
 
@@ -168,7 +213,7 @@ def __query_uuids(
 
     headers = {"Authorization": "Bearer " + token, "accept": "application/json"}
 
-    r = requests.get(URL, headers=headers)
+    r = client.get(URL, headers=headers)
     return r
 
 
@@ -185,9 +230,11 @@ def get_uuids(
         link = r.content  # Amazon S3 bucket link
         file = f"/tmp/{str(uuid.uuid4())}.json"
 
-        with open(file, "wb") as f:
-            f.write(requests.get(link).content)
-            j = json.load(open(file, "rb"))
+        with utilities.atomic_write(file) as output_file:
+            with open(output_file, "wb") as f:
+                f.write(client.get(link).content)
+        with open(file, "rb") as f:
+            j = json.load(f)
     else:
         j = json.loads(r.text)
 
@@ -234,9 +281,6 @@ def generate(
 
     dataset = dataset.squeeze()
     data_directory = dataset["full_path"]
-    computing = data_directory.replace("/", "_").replace(" ", "_") + ".computing"
-    done = "." + data_directory.replace("/", "_").replace(" ", "_") + ".done"
-    broken = "." + data_directory.replace("/", "_").replace(" ", "_") + ".broken"
 
     if not Path(".data").is_dir():
         Path(".data").mkdir()
@@ -306,7 +350,7 @@ def generate(
 
             if debug:
                 print("Generating UUIDs")
-            r = requests.post(
+            r = client.post(
                 URL,
                 params=params,
                 headers=headers,
@@ -337,9 +381,13 @@ def generate(
                         + " with the request response."
                     )
 
-                df.to_pickle(temp_file)
-                with open(temp_file.replace("pkl", "json"), "w") as outfile:
-                    json.dump(j, outfile, indent=4)
+                with utilities.atomic_write(temp_file) as output_file:
+                    df.to_pickle(output_file)
+                with utilities.atomic_write(
+                    temp_file.replace("pkl", "json")
+                ) as output_file:
+                    with open(output_file, "w") as outfile:
+                        json.dump(j, outfile, indent=4)
         else:
             if debug:
                 print("HuBMAP UUID column is populated. Skipping generation.")
@@ -393,7 +441,7 @@ def generate(
                 if debug:
                     print("Generating UUIDs")
 
-                r = requests.post(
+                r = client.post(
                     URL,
                     params=params,
                     headers=headers,
@@ -421,7 +469,8 @@ def generate(
                             + file
                             + " with the results of this chunk."
                         )
-                    df.to_pickle(file)
+                    with utilities.atomic_write(file) as output_file:
+                        df.to_pickle(output_file)
             else:
                 print("HuBMAP UUID chunk is populated. Skipping recomputation.")
 
@@ -31,6 +31,10 @@ setup(
         "matplotlib",
         "duckdb",
     ],
+    extras_require={
+        # faster change-detection fingerprints in hubmapbags.checksums
+        "fast": ["xxhash", "blake3"],
+    },
     python_requires=">=3.10",
     project_urls={
         "Bug Reports": "https://github.com/hubmapconsortium/py-hubmapbags/issues",
@@ -0,0 +1,14 @@
+import pytest
+
+from hubmapbags import cache, checksums, ledger
+
+
+@pytest.fixture(autouse=True)
+def databases(tmp_path, monkeypatch):
+    """
+    Keep the metadata store, the ledger and the checksum cache of every test in its own directory.
+    """
+
+    monkeypatch.setattr(cache, "DATABASE", str(tmp_path / "metadata.db"))
+    monkeypatch.setattr(ledger, "DATABASE", str(tmp_path / "ledger.db"))
+    monkeypatch.setattr(checksums, "DATABASE", str(tmp_path / "checksums.db"))
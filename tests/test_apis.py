@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from hubmapbags import apis, client
+
+
+class Response:
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+        self.ok = status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    def fail(url, **kwargs):
+        raise AssertionError(f"{url} was requested")
+
+    monkeypatch.setattr(client, "get", fail)
+    monkeypatch.setattr(client, "post", fail)
+    return monkeypatch
+
+
+def test_gateway_error_of_the_search_api_is_an_error(offline):
+    offline.setattr(
+        client, "post", lambda url, **kwargs: Response(502, "<html>Bad Gateway</html>")
+    )
+
+    with pytest.raises(RuntimeError, match="502"):
+        list(apis.__search({"query": {}}, token=None))
+
+    assert "502" in apis.__query_hubmap_ids("AF", token=None)["error"]
+
+
+def test_donors_are_found_without_requests_after_a_sync(offline):
+    document = {
+        "uuid": "dataset-uuid",
+        "hubmap_id": "HBM123.ABCD.456",
+        "entity_type": "Dataset",
+        "donor": {"uuid": "donor-uuid", "hubmap_id": "HBM789.EFGH.012", "sex": "F"},
+        "origin_samples": [
+            {"uuid": "organ-uuid", "hubmap_id": "HBM000.AAAA.000", "organ": "LK"}
+        ],
+    }
+    page = {"hits": {"hits": [{"_source": document, "sort": [1]}]}}
+    offline.setattr(
+        client, "post", lambda url, **kwargs: Response(200, json.dumps(page))
+    )
+
+    apis.sync_catalog(
+        token="token",
+        fields=[
+            "uuid",
+            "hubmap_id",
+            "entity_type",
+            "donor.uuid",
+            "donor.hubmap_id",
+            "donor.sex",
+            "origin_samples.uuid",
+            "origin_samples.hubmap_id",
+            "origin_samples.organ",
+        ],
+    )
+    offline.setattr(client, "post", lambda url, **kwargs: pytest.fail("requested"))
+
+    donor = apis.get_donor_info(
+        "HBM123.ABCD.456", token="token", fields=["hubmap_id", "sex"]
+    )
+    assert donor == {"hubmap_id": "HBM789.EFGH.012", "sex": "F"}
+
+
+def test_failed_search_of_an_entity_falls_back_to_nothing(offline):
+    requests = []
+
+    def post(url, **kwargs):
+        requests.append(kwargs["json"])
+        return Response(503, "Service Unavailable")
+
+    offline.setattr(client, "post", post)
+
+    with pytest.warns(UserWarning, match="503"):
+        assert apis.__search_entity("HBM123.ABCD.456", ["uuid"], token=None) is None
+    assert requests[0]["_source"] == {"includes": ["uuid"]}
@@ -0,0 +1,128 @@
+import hashlib
+
+import pandas as pd
+import pytest
+
+from hubmapbags import checksum_job, uuids
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    directory = tmp_path / "public" / "abcd1234"
+    (directory / "raw").mkdir(parents=True)
+    contents = {
+        "metadata.tsv": b"a\tb\n1\t2\n",
+        "raw/reads.fastq": b"@read\nACGT\n+\nIIII\n" * 1000,
+        "raw/image.tif": bytes(range(256)) * 100,
+    }
+    for relative_path, content in contents.items():
+        (directory / relative_path).write_bytes(content)
+
+    return str(directory), contents
+
+
+def test_resumed_run_is_exported_to_the_local_file(tmp_path, dataset):
+    directory, contents = dataset
+    checkpoint_directory = str(tmp_path / "checksums")
+    local_directory = str(tmp_path / "local")
+
+    summary = checksum_job.run(
+        [("HBM123.ABCD.456", directory)], checkpoint_directory=checkpoint_directory
+    )
+    assert summary["files"].tolist() == [3]
+
+    # a job killed while writing its last line leaves it cut short
+    checkpoint = checksum_job.get_checkpoint("HBM123.ABCD.456", checkpoint_directory)
+    lines = checkpoint.read_bytes().splitlines(keepends=True)
+    checkpoint.write_bytes(b"".join(lines[:-1]) + lines[-1][:20])
+
+    summary = checksum_job.run(
+        [("HBM123.ABCD.456", directory)], checkpoint_directory=checkpoint_directory
+    )
+    assert summary["files"].tolist() == [1]
+
+    df = checksum_job.export(
+        "HBM123.ABCD.456",
+        "abcd1234",
+        directory,
+        checkpoint_directory=checkpoint_directory,
+        local_directory=local_directory,
+    )
+
+    # uuids.generate reads the same file
+    file = checksum_job.get_local_file(directory, local_directory=local_directory)
+    pd.testing.assert_frame_equal(pd.read_pickle(file), df)
+
+    assert sorted(df["relative_local_id"]) == sorted(contents)
+    for row in df.to_dict("records"):
+        content = contents[row["relative_local_id"]]
+        assert row["sha256"] == hashlib.sha256(content).hexdigest()
+        assert row["md5"] == hashlib.md5(content).hexdigest()
+        assert row["size_in_bytes"] == len(content)
+        assert row["dataset_uuid"] in row["local_id"]
+
+
+def test_export_keeps_known_uuids(tmp_path, dataset):
+    directory, contents = dataset
+    checkpoint_directory = str(tmp_path / "checksums")
+    local_directory = str(tmp_path / "local")
+
+    checksum_job.run(
+        [("HBM123.ABCD.456", directory)], checkpoint_directory=checkpoint_directory
+    )
+    df = checksum_job.export(
+        "HBM123.ABCD.456",
+        "abcd1234",
+        directory,
+        checkpoint_directory=checkpoint_directory,
+        local_directory=local_directory,
+    )
+
+    df, unmatched_local, unmatched_remote = uuids.__backfill_uuids(
+        df,
+        [
+            {"path": "metadata.tsv", "file_uuid": "uuid-1"},
+            {"path": "missing.txt", "file_uuid": "uuid-2"},
+        ],
+    )
+    assert sorted(unmatched_local) == ["raw/image.tif", "raw/reads.fastq"]
+    assert unmatched_remote == ["missing.txt"]
+
+    file = checksum_job.get_local_file(directory, local_directory=local_directory)
+    df.to_pickle(file)
+
+    df = checksum_job.export(
+        "HBM123.ABCD.456",
+        "abcd1234",
+        directory,
+        checkpoint_directory=checkpoint_directory,
+        local_directory=local_directory,
+    )
+    uuids_by_path = dict(zip(df["relative_local_id"], df["hubmap_uuid"]))
+    assert uuids_by_path["metadata.tsv"] == "uuid-1"
+    assert pd.isna(uuids_by_path["raw/reads.fastq"])
+
+
+def test_export_leaves_out_files_that_are_gone(tmp_path, dataset):
+    directory, contents = dataset
+    checkpoint_directory = str(tmp_path / "checksums")
+
+    checksum_job.run(
+        [("HBM123.ABCD.456", directory)], checkpoint_directory=checkpoint_directory
+    )
+    (tmp_path / "public" / "abcd1234" / "raw" / "image.tif").unlink()
+    (tmp_path / "public" / "abcd1234" / "metadata.tsv").rename(
+        tmp_path / "public" / "abcd1234" / "metadata.txt"
+    )
+    checksum_job.run(
+        [("HBM123.ABCD.456", directory)], checkpoint_directory=checkpoint_directory
+    )
+
+    df = checksum_job.export(
+        "HBM123.ABCD.456",
+        "abcd1234",
+        directory,
+        checkpoint_directory=checkpoint_directory,
+        local_directory=str(tmp_path / "local"),
+    )
+    assert sorted(df["relative_local_id"]) == ["metadata.txt", "raw/reads.fastq"]
@@ -0,0 +1,44 @@
+import hashlib
+import os
+import time
+
+import pytest
+
+from hubmapbags import checksums
+
+
+@pytest.fixture
+def file(tmp_path):
+    file = tmp_path / "image.tif"
+    file.write_bytes(bytes(range(256)) * 2048)
+    past = time.time() - 3600
+    os.utime(file, (past, past))
+    return file
+
+
+def test_edit_in_the_middle_is_hashed_again_with_fingerprints(file):
+    checksums.get(str(file), fingerprints=True)
+
+    # same size and same ends, new mtime
+    content = bytearray(file.read_bytes())
+    content[len(content) // 2] ^= 0xFF
+    stat = file.stat()
+    file.write_bytes(bytes(content))
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    digests = checksums.get(str(file), fingerprints=True)
+    assert digests["sha256"] == hashlib.sha256(content).hexdigest()
+    assert digests["md5"] == hashlib.md5(content).hexdigest()
+
+
+def test_fingerprint_skips_the_verification_of_unchanged_files(file, monkeypatch):
+    digests = checksums.get(str(file))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the file was hashed again")
+
+    monkeypatch.setattr(checksums, "compute", fail)
+    assert checksums.get(str(file), paranoia=1.0, fingerprints=True) == digests
+
+    with pytest.raises(AssertionError):
+        checksums.get(str(file), paranoia=1.0)
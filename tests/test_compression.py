@@ -0,0 +1,108 @@
+import gzip
+import random
+import struct
+import zlib
+
+import pytest
+
+from hubmapbags import compression
+
+
+def fastq(reads: int, seed: int = 0) -> bytes:
+    generator = random.Random(seed)
+    lines = []
+    for read in range(reads):
+        sequence = "".join(generator.choice("ACGT") for _ in range(50))
+        lines.append(f"@read{read}\n{sequence}\n+\n{'I' * 50}\n")
+    return "".join(lines).encode()
+
+
+def bgzf(data: bytes, block_size: int = 4096) -> bytes:
+    blocks = []
+    for start in range(0, len(data), block_size):
+        chunk = data[start : start + block_size]
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        deflated = compressor.compress(chunk) + compressor.flush()
+        header = b"\x1f\x8b\x08\x04" + b"\x00" * 4 + b"\x00\xff" + b"\x06\x00"
+        extra = b"BC\x02\x00" + struct.pack("<H", 18 + len(deflated) + 8 - 1)
+        trailer = struct.pack("<II", zlib.crc32(chunk), len(chunk))
+        blocks.append(header + extra + deflated + trailer)
+    return b"".join(blocks)
+
+
+@pytest.fixture
+def no_streaming(monkeypatch):
+    def fail(file, limit):
+        raise AssertionError(f"{file} was decompressed")
+
+    monkeypatch.setattr(compression, "__count", fail)
+
+
+def test_trailer_of_a_single_member(tmp_path, no_streaming):
+    data = fastq(2000)
+    file = tmp_path / "reads.fastq.gz"
+    file.write_bytes(gzip.compress(data))
+
+    assert compression.get_uncompressed_size(str(file)) == len(data)
+
+
+def test_several_members_are_counted(tmp_path):
+    data = fastq(2000)
+    file = tmp_path / "reads.fastq.gz"
+    file.write_bytes(gzip.compress(data) + gzip.compress(b"@last\nA\n+\nI\n"))
+
+    assert compression.get_uncompressed_size(str(file)) == len(data) + 12
+
+
+def test_bgzf_blocks_are_summed(tmp_path, no_streaming):
+    data = fastq(2000)
+    file = tmp_path / "reads.fastq.gz"
+    file.write_bytes(bgzf(data) + bgzf(b""))
+
+    assert gzip.decompress(file.read_bytes()) == data
+    assert compression.get_uncompressed_size(str(file)) == len(data)
+
+
+def test_ambiguous_trailer_is_counted_within_the_stream_limit(tmp_path, monkeypatch):
+    # at 64 KiB a trailer is as ambiguous for this file as it is at 4 GiB for large ones
+    monkeypatch.setattr(compression, "__WRAP", 2**16)
+
+    data = fastq(4000)
+    file = tmp_path / "reads.fastq.gz"
+    file.write_bytes(gzip.compress(data))
+
+    assert len(data) > 2 * 2**16
+    assert compression.get_uncompressed_size(str(file)) == len(data)
+    assert compression.get_uncompressed_size(str(file), stream_limit=0) is None
+
+
+def test_several_members_past_the_stream_limit_are_unknown(tmp_path):
+    data = fastq(2000)
+    file = tmp_path / "reads.fastq.gz"
+    file.write_bytes(gzip.compress(data) + gzip.compress(b"@last\nA\n+\nI\n"))
+
+    assert compression.get_uncompressed_size(str(file), stream_limit=100) is None
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"plain text, not gzip", gzip.compress(fastq(100))[:-100]],
+    ids=["not gzip", "truncated"],
+)
+def test_invalid_files_have_no_size(tmp_path, content):
+    file = tmp_path / "reads.fastq.gz"
+    file.write_bytes(content)
+
+    assert compression.get_uncompressed_size(str(file)) is None
+
+
+def test_sizes_keep_the_order_of_the_files(tmp_path):
+    files = []
+    for reads in [10, 200, 3000]:
+        file = tmp_path / f"{reads}.fastq.gz"
+        file.write_bytes(gzip.compress(fastq(reads)))
+        files.append(str(file))
+
+    assert compression.get_uncompressed_sizes(files, max_workers=2) == [
+        len(fastq(reads)) for reads in [10, 200, 3000]
+    ]
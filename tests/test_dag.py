@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from hubmapbags import dag
+
+
+def test_steps_run_after_their_dependencies():
+    order = []
+    lock = threading.Lock()
+
+    def step(name):
+        def function():
+            with lock:
+                order.append(name)
+            return True
+
+        return function
+
+    timings = dag.run(
+        {
+            "inventory": (step("inventory"), []),
+            "file": (step("file"), ["inventory"]),
+            "biosample": (step("biosample"), ["inventory"]),
+            "manifest": (step("manifest"), ["file", "biosample"]),
+        }
+    )
+
+    assert order[0] == "inventory"
+    assert order[-1] == "manifest"
+    assert {timing["status"] for timing in timings.values()} == {dag.DONE}
+
+
+@pytest.mark.parametrize(
+    "failure, error",
+    [
+        (lambda: False, "Step file returned False"),
+        (lambda: 1 / 0, "division by zero"),
+    ],
+    ids=["returns False", "raises"],
+)
+def test_failed_step_stops_its_dependents(failure, error):
+    ran = []
+
+    with pytest.raises(Exception, match=error):
+        dag.run(
+            {
+                "inventory": (lambda: None, []),
+                "file": (failure, ["inventory"]),
+                "manifest": (lambda: ran.append("manifest"), ["file"]),
+            }
+        )
+
+    assert ran == []
+
+
+@pytest.mark.parametrize(
+    "steps",
+    [
+        {"file": (lambda: None, ["inventory"])},
+        {"file": (lambda: None, ["manifest"]), "manifest": (lambda: None, ["file"])},
+    ],
+    ids=["unknown dependency", "cycle"],
+)
+def test_invalid_graphs_are_rejected(steps):
+    with pytest.raises(ValueError):
+        dag.run(steps)
@@ -0,0 +1,19 @@
+from hubmapbags import database
+
+SCHEMA = "CREATE TABLE runs (id INTEGER PRIMARY KEY)"
+
+
+def test_schema_is_created_once_per_connection(tmp_path):
+    file = str(tmp_path / "store.db")
+
+    # the schema has no IF NOT EXISTS, so running it twice would fail
+    conn = database.connect(file, schema=SCHEMA)
+    assert database.connect(file, schema=SCHEMA) is conn
+
+    conn.execute("INSERT INTO runs VALUES (1)")
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+
+    database.close(file)
+    conn = database.connect(file)
+    assert conn.execute("SELECT id FROM runs").fetchall() == [(1,)]
+    database.close(file)
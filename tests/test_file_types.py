@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+
+from hubmapbags import file_types
+
+
+@pytest.mark.parametrize(
+    "file, extension",
+    [
+        ("/data/image.ome.tiff", ".ome.tiff"),
+        ("raw/reads.fastq.gz", ".fastq.gz"),
+        ("release.v2/Image.TIF", ".tif"),
+        ("a.b.c.d.e", ".c.d.e"),
+        ("README", ""),
+        (".hidden", ""),
+    ],
+)
+def test_extension_is_made_of_the_last_suffixes(file, extension):
+    assert file_types.get_extension(file) == extension
+
+
+def test_files_are_classified_by_extension():
+    files = pd.Series(
+        [
+            "/data/image.ome.tiff",
+            "raw/reads.fastq.gz",
+            "archive.tar.gz",
+            "metadata.tsv",
+            "README",
+            ".hidden",
+            "unknown.weird",
+        ],
+        index=list("abcdefg"),
+    )
+
+    df = file_types.classify(files)
+
+    assert df.index.equals(files.index)
+    assert list(df.columns) == [
+        "data_type",
+        "file_format",
+        "mime_type",
+        "compression_format",
+    ]
+
+    # the compound extension wins over its last suffix
+    assert df.loc["a", ["data_type", "file_format"]].tolist() == [
+        "data:2968",
+        "format:3547",
+    ]
+
+    # a compressed file is classified by the extension under the compression
+    assert df.loc["b", ["data_type", "file_format", "compression_format"]].tolist() == [
+        "data:2044",
+        "format:2330",
+        "format:3989",
+    ]
+
+    # unless the compressed extension is known as a whole
+    assert df.loc["c", ["file_format", "compression_format"]].tolist() == [
+        "format:3989",
+        "format:3989",
+    ]
+
+    assert df.loc["d", ["data_type", "file_format"]].tolist() == [
+        "data:2526",
+        "format:2330",
+    ]
+    assert pd.isna(df.loc["d", "compression_format"])
+
+    # files without an extension, dotfiles included, get the default entry
+    for row in ["e", "f"]:
+        assert df.loc[row, ["data_type", "file_format"]].tolist() == ["", ""]
+
+    assert df.loc["g"].isna().all()
+
+
+def test_classification_matches_the_single_file_helpers():
+    files = ["image.ome.tif", "reads.fastq.gz", "page.html", "matrix.h5"]
+    df = file_types.classify(pd.Series(files))
+
+    for file, row in zip(files, df.to_dict("records")):
+        classes = file_types.classify_extension(file_types.get_extension(file))
+        assert [row["data_type"], row["file_format"]] == list(classes[:2])
+
+
+@pytest.mark.parametrize("file", ["matrix.mtx.gz", "reads.bam.gz", "data.gz"])
+def test_unknown_extension_under_compression_is_classified_as_gzip(file):
+    data_type, file_format, _, compression_format = file_types.classify_extension(
+        file_types.get_extension(file)
+    )
+
+    assert data_type == "data:2044"
+    assert file_format == "format:3989"
+    assert compression_format == "format:3989"
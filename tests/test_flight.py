@@ -0,0 +1,13 @@
+import pytest
+
+from hubmapbags import flight
+
+
+def test_calls_leave_no_lock_file():
+    for n in range(10):
+        assert flight.once(("entity", n), lambda: n) == n
+
+    with pytest.raises(ZeroDivisionError):
+        flight.once(("entity", "broken"), lambda: 1 / 0)
+
+    assert list(flight.__get_lock_directory().glob("*.lock")) == []
@@ -0,0 +1,102 @@
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from hubmapbags import ledger
+
+
+def update(hubmap_id: str, **values):
+    assignments = ", ".join(f"{column} = ?" for column in values)
+    with sqlite3.connect(ledger.DATABASE) as conn:
+        conn.execute(
+            f"UPDATE jobs SET {assignments} WHERE hubmap_id = ?",
+            list(values.values()) + [hubmap_id],
+        )
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_claim_is_exclusive():
+    assert ledger.claim("HBM123.ABCD.456", directory="/data")
+    assert not ledger.claim("HBM123.ABCD.456")
+
+    job = ledger.get_job("HBM123.ABCD.456")
+    assert job["state"] == ledger.COMPUTING
+    assert job["directory"] == "/data"
+    assert not ledger.is_stale(job)
+
+
+def test_done_jobs_are_only_claimed_again_with_overwrite():
+    assert ledger.claim("HBM123.ABCD.456")
+    with ledger.running("HBM123.ABCD.456") as job:
+        job["bytes"] = 1024
+
+    assert ledger.is_done("HBM123.ABCD.456")
+    assert ledger.get_job("HBM123.ABCD.456")["bytes"] == 1024
+    assert not ledger.claim("HBM123.ABCD.456")
+    assert ledger.claim("HBM123.ABCD.456", overwrite=True)
+
+
+def test_failed_jobs_are_broken_and_claimed_again():
+    assert ledger.claim("HBM123.ABCD.456")
+    with pytest.raises(RuntimeError):
+        with ledger.running("HBM123.ABCD.456"):
+            raise RuntimeError("disk full")
+
+    job = ledger.get_job("HBM123.ABCD.456")
+    assert job["state"] == ledger.BROKEN
+    assert "disk full" in job["reason"]
+    assert ledger.claim("HBM123.ABCD.456")
+
+
+def test_job_of_a_dead_process_is_stale():
+    assert ledger.claim("HBM123.ABCD.456")
+    update("HBM123.ABCD.456", pid=dead_pid())
+
+    assert ledger.is_stale(ledger.get_job("HBM123.ABCD.456"))
+    assert ledger.claim("HBM123.ABCD.456")
+    assert ledger.get_job("HBM123.ABCD.456")["pid"] == ledger.os.getpid()
+
+
+def test_job_without_heartbeats_is_stale():
+    assert ledger.claim("HBM123.ABCD.456")
+    update("HBM123.ABCD.456", host="another-host", pid=1)
+    assert not ledger.is_stale(ledger.get_job("HBM123.ABCD.456"))
+
+    update("HBM123.ABCD.456", heartbeat=time.time() - ledger.STALE_AFTER - 1)
+    assert ledger.is_stale(ledger.get_job("HBM123.ABCD.456"))
+    assert ledger.release_stale() == ["HBM123.ABCD.456"]
+    assert ledger.get_job("HBM123.ABCD.456")["state"] == ledger.BROKEN
+
+
+def test_ledger_of_an_older_version_is_migrated():
+    with sqlite3.connect(ledger.DATABASE) as conn:
+        conn.execute(
+            "CREATE TABLE jobs (hubmap_id TEXT PRIMARY KEY, directory TEXT, "
+            "state TEXT NOT NULL, pid INTEGER, host TEXT, heartbeat REAL, "
+            "started_at REAL, finished_at REAL, duration REAL, bytes INTEGER, "
+            "reason TEXT)"
+        )
+        conn.execute(
+            "INSERT INTO jobs (hubmap_id, state) VALUES ('HBM000.AAAA.000', 'done')"
+        )
+
+    assert ledger.claim("HBM123.ABCD.456")
+    with ledger.running("HBM123.ABCD.456") as job:
+        job["last_modified_timestamp"] = 1700000000000
+        job["inventory_fingerprint"] = "9f86d081"
+
+    assert ledger.get_changes(
+        {
+            "HBM000.AAAA.000": (None, None),
+            "HBM123.ABCD.456": (1700000000000, "9f86d081"),
+            "HBM789.EFGH.012": (1700000000000, "9f86d081"),
+        }
+    ) == {"HBM000.AAAA.000": "metadata unknown", "HBM789.EFGH.012": "new"}
@@ -0,0 +1,18 @@
+from hubmapbags import magic
+
+
+def build(monkeypatch, answer):
+    monkeypatch.setattr(magic, "__get_dbgap_study_id", lambda **kwargs: None)
+    monkeypatch.setattr(magic, "do_it", lambda *args, **kwargs: answer)
+    return magic.__build_dataset("HBM123.ABCD.456", False, token="token")
+
+
+def test_dataset_claimed_elsewhere_is_skipped(monkeypatch):
+    result = build(monkeypatch, None)
+    assert result["status"] == "skipped"
+    assert result["error"] == "claimed elsewhere"
+
+
+def test_dataset_status_follows_do_it(monkeypatch):
+    assert build(monkeypatch, True)["status"] == "done"
+    assert build(monkeypatch, False)["status"] == "failed"
@@ -0,0 +1,45 @@
+import threading
+
+from hubmapbags import dag, memo
+
+
+def test_scopes_on_different_threads_are_separate():
+    barrier = threading.Barrier(2)
+    stats = {}
+
+    def run(name):
+        with memo.scope() as scope:
+            barrier.wait(5)
+            memo.lookup(("entity", name), lambda: memo.count_network_call() or name)
+            memo.lookup(("entity", "shared"), lambda: memo.count_network_call() or 1)
+            barrier.wait(5)
+            stats[name] = scope.stats()
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in "ab"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stats["a"] == {"hits": 0, "misses": 2, "network_calls": 2}
+    assert stats["b"] == {"hits": 0, "misses": 2, "network_calls": 2}
+    assert memo.current() is None
+
+
+def test_steps_of_a_dag_share_the_scope_of_the_caller():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return "value"
+
+    with memo.scope() as scope:
+        dag.run(
+            {
+                "first": (lambda: memo.lookup(("entity", "a"), fetch), []),
+                "second": (lambda: memo.lookup(("entity", "a"), fetch), ["first"]),
+            }
+        )
+
+    assert calls == [1]
+    assert scope.stats()["hits"] == 1
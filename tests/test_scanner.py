@@ -0,0 +1,27 @@
+import os
+import time
+
+from hubmapbags import scanner
+
+
+def test_size_of_a_file_rewritten_in_place_is_current(tmp_path):
+    dataset = tmp_path / "dataset"
+    (dataset / "raw").mkdir(parents=True)
+    file = dataset / "raw" / "reads.fastq"
+    file.write_bytes(b"A" * 100)
+    (dataset / "metadata.tsv").write_bytes(b"a\tb\n")
+
+    past = time.time() - 3600
+    for directory in [dataset / "raw", dataset]:
+        os.utime(directory, (past, past))
+
+    assert scanner.get_size(str(dataset), use_snapshots=True) == 104
+    assert scanner.count_files(str(dataset)) == 2
+
+    # rewriting a file keeps the mtime of its directory
+    with open(file, "r+b") as handle:
+        handle.write(b"C" * 300)
+    os.utime(dataset / "raw", (past, past))
+
+    assert scanner.get_size(str(dataset)) == 304
+    assert scanner.get_size(str(dataset), use_snapshots=True) == 104
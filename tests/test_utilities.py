@@ -0,0 +1,33 @@
+import os
+import stat
+
+from hubmapbags import utilities
+
+
+def mode(file) -> int:
+    return stat.S_IMODE(os.stat(file).st_mode)
+
+
+def test_atomic_write_keeps_the_permissions_of_the_file(tmp_path):
+    file = tmp_path / "file.tsv"
+    file.write_text("old\n")
+    os.chmod(file, 0o644)
+
+    with utilities.atomic_write(file) as temp_file:
+        with open(temp_file, "w") as handle:
+            handle.write("new\n")
+
+    assert file.read_text() == "new\n"
+    assert mode(file) == 0o644
+
+
+def test_atomic_write_gives_new_files_the_permissions_of_the_umask(tmp_path):
+    file = tmp_path / "file.tsv"
+    with utilities.atomic_write(file) as temp_file:
+        with open(temp_file, "w") as handle:
+            handle.write("new\n")
+
+    reference = tmp_path / "reference.tsv"
+    reference.write_text("new\n")
+
+    assert mode(file) == mode(reference)